@@ -0,0 +1,48 @@
+"""
+Micro-benchmark for the transcript field extractor (core_agent.TranscriptExtractor).
+
+Every final STT transcript goes through the extractor on the event loop, so its cost
+per transcript has to stay in the microsecond range.
+
+Usage:
+    python bench_extraction.py --iterations 20000
+"""
+import argparse
+import statistics
+import time
+
+from core_agent import TranscriptExtractor
+
+TRANSCRIPTS = [
+    "Hi there, I was wondering what your opening hours are on Saturdays.",
+    "Do you do emergency callouts for burst pipes?",
+    "Yes please, my name is John Smith and I'd like a quote for a new boiler.",
+    "My email is j o h n dot smith at gmail dot com",
+    "and my number is oh seven seven double nine, one two three four five six",
+    "It's for the kitchen sink, it has been leaking under the cabinet for about a week now.",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-transcript extraction cost.")
+    parser.add_argument("--iterations", type=int, default=20000, help="Transcripts to feed in total.")
+    args = parser.parse_args()
+
+    extractor = TranscriptExtractor()
+    samples = []
+    for index in range(args.iterations):
+        transcript = TRANSCRIPTS[index % len(TRANSCRIPTS)]
+        started_at = time.perf_counter_ns()
+        extractor.feed(transcript)
+        samples.append((time.perf_counter_ns() - started_at) / 1000)
+
+    samples.sort()
+    print(f"transcripts: {len(samples)}")
+    print(f"mean:  {statistics.fmean(samples):8.1f} us")
+    print(f"p50:   {samples[len(samples) // 2]:8.1f} us")
+    print(f"p99:   {samples[int(len(samples) * 0.99)]:8.1f} us")
+    print(f"max:   {samples[-1]:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
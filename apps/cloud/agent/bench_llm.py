@@ -0,0 +1,264 @@
+"""
+Streaming LLM benchmark for the agent's providers.
+
+Runs a set of prompts against one or more models at a given concurrency and reports,
+per model and prompt:
+  * time to first token (TTFT),
+  * output tokens per second once the first token arrived,
+  * total request time,
+with p50/p95/p99 for each. The default prompt set includes the agent's real instructions
+(main.build_instructions, as sent in production) with a large generated knowledge base,
+since prompt size is what dominates TTFT in production. The client keeps as many
+connections alive as `--concurrency`, so every request after warm-up reuses one.
+
+Custom prompts can be given as JSONL, one per line:
+
+    {"name": "hours", "system": "...", "user": "what are your opening hours?"}
+
+`--mock` starts a local OpenAI-compatible streaming server and points the client at it,
+so the tool (and its JSON output) can be exercised offline.
+
+Usage:
+    python bench_llm.py --model llama-3.3-70b-versatile --model llama-3.1-8b-instant \\
+        --concurrency 4 --requests 20 --json results.json
+    python bench_llm.py --mock --requests 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+
+from dotenv import load_dotenv
+from livekit.agents.llm import ChatContext
+from livekit.plugins import groq
+
+from core_agent import pooled_openai_client
+from main import build_instructions
+
+# Load environment variables from our .env file
+load_dotenv()
+
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+
+KB_SECTIONS = [
+    "Services: {n}. We handle kitchen and bathroom remodels, roofing repairs, deck building, "
+    "window replacement and general carpentry across the metro area.",
+    "Pricing {n}: Free estimates for jobs over $500. Hourly rate is $85 for general work, "
+    "emergency callouts after 6pm are $140 per hour with a two hour minimum.",
+    "Hours {n}: Monday to Friday 8am to 6pm, Saturday 9am to 2pm, closed Sundays and public holidays.",
+    "Warranty {n}: All workmanship carries a 5 year warranty. Materials are covered by the manufacturer.",
+    "Service area {n}: Downtown, Northside, Riverside, Eastgate and anywhere within 30 miles of the office.",
+]
+
+
+def build_knowledge_base(chars: int) -> str:
+    parts, index = [], 0
+    while sum(len(part) for part in parts) < chars:
+        parts.append(KB_SECTIONS[index % len(KB_SECTIONS)].format(n=index + 1))
+        index += 1
+    return "\n".join(parts)[:chars]
+
+
+def default_prompts(kb_chars: int) -> list[dict]:
+    instructions = build_instructions(
+        {"business_name": "Bob the Builder", "knowledge_base": build_knowledge_base(kb_chars)}
+    )
+    return [
+        {"name": "ping", "system": None, "user": "Hello, are you working?"},
+        {"name": "faq", "system": instructions, "user": "What are your opening hours on Saturday?"},
+        {"name": "quote", "system": instructions,
+         "user": "I'd like a quote for a bathroom remodel, can someone call me back?"},
+    ]
+
+
+def load_prompts(path: str) -> list[dict]:
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 2)
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "mean": round(statistics.fmean(ordered), 2)}
+
+
+async def run_request(llm: groq.LLM, prompt: dict) -> dict:
+    chat_ctx = ChatContext()
+    if prompt.get("system"):
+        chat_ctx.add_message(role="system", content=prompt["system"])
+    chat_ctx.add_message(role="user", content=prompt["user"])
+
+    started = time.perf_counter()
+    first_token_at = None
+    chars = 0
+    completion_tokens = None
+    async with llm.chat(chat_ctx=chat_ctx) as stream:
+        async for chunk in stream:
+            if chunk.delta and chunk.delta.content:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                chars += len(chunk.delta.content)
+            if chunk.usage is not None:
+                completion_tokens = chunk.usage.completion_tokens
+    finished = time.perf_counter()
+
+    if first_token_at is None:
+        raise RuntimeError("stream ended without any content")
+    # Fall back to ~4 characters per token if the provider sent no usage.
+    tokens = completion_tokens if completion_tokens is not None else max(1, chars // 4)
+    generation_s = finished - first_token_at
+    return {
+        "ttft_ms": (first_token_at - started) * 1000,
+        "total_ms": (finished - started) * 1000,
+        "tokens": tokens,
+        "tokens_per_s": tokens / generation_s if generation_s > 0 else None,
+    }
+
+
+async def bench_model(model: str, prompts: list[dict], args: argparse.Namespace, base_url: str, api_key: str) -> list[dict]:
+    client = pooled_openai_client(base_url, api_key, max_keepalive_connections=args.concurrency)
+    llm = groq.LLM(model=model, api_key=api_key, client=client)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results = {prompt["name"]: [] for prompt in prompts}
+    errors = {prompt["name"]: [] for prompt in prompts}
+
+    async def one(prompt: dict) -> None:
+        async with semaphore:
+            try:
+                results[prompt["name"]].append(await run_request(llm, prompt))
+            except Exception as e:
+                errors[prompt["name"]].append(f"{type(e).__name__}: {e}")
+
+    # Warm the connection so the first sample does not include the TLS handshake.
+    await run_request(llm, prompts[0])
+    jobs = [prompt for prompt in prompts for _ in range(args.requests)]
+    random.shuffle(jobs)
+    await asyncio.gather(*(one(prompt) for prompt in jobs))
+    await llm.aclose()
+
+    report = []
+    for prompt in prompts:
+        samples = results[prompt["name"]]
+        report.append({
+            "model": model,
+            "prompt": prompt["name"],
+            "prompt_chars": len(prompt.get("system") or "") + len(prompt["user"]),
+            "requests": len(samples) + len(errors[prompt["name"]]),
+            "errors": len(errors[prompt["name"]]),
+            "error_samples": errors[prompt["name"]][:3],
+            "ttft_ms": percentiles([s["ttft_ms"] for s in samples]),
+            "tokens_per_s": percentiles([s["tokens_per_s"] for s in samples if s["tokens_per_s"] is not None]),
+            "total_ms": percentiles([s["total_ms"] for s in samples]),
+        })
+    return report
+
+
+# --- Mock OpenAI-compatible server ---
+
+async def start_mock_server(ttft_ms: float, tokens_per_s: float, reply_tokens: int):
+    """Serves /chat/completions as an SSE stream with the given TTFT and token rate."""
+    from aiohttp import web
+
+    async def completions(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        prompt_chars = sum(len(str(m.get("content") or "")) for m in body.get("messages", []))
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        def event(payload: dict) -> bytes:
+            return f"data: {json.dumps(payload)}\n\n".encode()
+
+        base = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": body["model"]}
+        # Like real providers, a longer prompt takes longer to prefill.
+        await asyncio.sleep((ttft_ms + prompt_chars / 4 * 0.01) / 1000 * random.uniform(0.8, 1.3))
+        for index in range(reply_tokens):
+            delta = {"content": "word "} if index else {"role": "assistant", "content": "word "}
+            await response.write(event({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}))
+            await asyncio.sleep(1 / tokens_per_s)
+        await response.write(event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+        await response.write(event({**base, "choices": [], "usage": {
+            "prompt_tokens": prompt_chars // 4, "completion_tokens": reply_tokens,
+            "total_tokens": prompt_chars // 4 + reply_tokens,
+        }}))
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    app = web.Application()
+    app.router.add_post("/chat/completions", completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+
+def print_report(report: list[dict]) -> None:
+    print(f"{'model':<28}{'prompt':<8}{'chars':>8}{'ok/err':>9}"
+          f"{'ttft p50':>10}{'p95':>8}{'p99':>8}{'tok/s p50':>11}{'total p95':>11}")
+    for row in report:
+        ttft, tps, total = row["ttft_ms"], row["tokens_per_s"], row["total_ms"]
+        fmt = lambda value: "-" if value is None else f"{value:.0f}"
+        print(f"{row['model']:<28}{row['prompt']:<8}{row['prompt_chars']:>8}"
+              f"{row['requests'] - row['errors']:>5}/{row['errors']:<3}"
+              f"{fmt(ttft['p50']):>10}{fmt(ttft['p95']):>8}{fmt(ttft['p99']):>8}"
+              f"{fmt(tps['p50']):>11}{fmt(total['p95']):>11}")
+        for error in row["error_samples"]:
+            print(f"    error: {error}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    prompts = load_prompts(args.prompts) if args.prompts else default_prompts(args.kb_chars)
+
+    mock_runner = None
+    if args.mock:
+        mock_runner, base_url = await start_mock_server(args.mock_ttft_ms, args.mock_tokens_per_s, args.mock_reply_tokens)
+        api_key = "mock"
+    else:
+        base_url, api_key = args.base_url, os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise SystemExit("ERROR: GROQ_API_KEY is not set in the .env file (or use --mock).")
+
+    report = []
+    try:
+        for model in args.model or ["llama-3.3-70b-versatile"]:
+            print(f"Benchmarking {model}: {len(prompts)} prompts x {args.requests} requests, concurrency {args.concurrency}...")
+            report += await bench_model(model, prompts, args, base_url, api_key)
+    finally:
+        if mock_runner is not None:
+            await mock_runner.cleanup()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "base_url": "mock" if args.mock else base_url,
+                "concurrency": args.concurrency,
+                "requests_per_prompt": args.requests,
+                "results": report,
+            }, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark streaming LLM latency and throughput.")
+    parser.add_argument("--model", action="append", help="Model to benchmark (repeatable).")
+    parser.add_argument("--prompts", help="JSONL prompt set (default: built-in set with the agent's instructions).")
+    parser.add_argument("--kb-chars", type=int, default=20000, help="Size of the generated knowledge base.")
+    parser.add_argument("--requests", type=int, default=10, help="Requests per prompt and model.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight at once.")
+    parser.add_argument("--base-url", default=GROQ_BASE_URL, help="OpenAI-compatible endpoint.")
+    parser.add_argument("--json", help="Write the results to this file.")
+    parser.add_argument("--mock", action="store_true", help="Run against a local mock server instead of the provider.")
+    parser.add_argument("--mock-ttft-ms", type=float, default=150.0)
+    parser.add_argument("--mock-tokens-per-s", type=float, default=300.0)
+    parser.add_argument("--mock-reply-tokens", type=int, default=40)
+    asyncio.run(main(parser.parse_args()))
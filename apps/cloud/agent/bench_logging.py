@@ -0,0 +1,131 @@
+"""
+Logging overhead per session, before and after structured_logging.
+
+Replays the log calls of a typical session (form-field extraction and answer-cache
+hits every turn; one verification form, one submit_lead_form RPC and one lead at the
+end) on an event loop, and reports the time spent inside log calls on the loop:
+
+  * before: basicConfig-style StreamHandler, f-string messages with full payloads,
+  * after:  setup_logging() with the hot-path call sites as they are now (lazy
+            arguments, `event` extras, sampling and redaction).
+
+The sink can be slowed down to mimic a blocking stderr pipe to a log collector:
+
+    python bench_logging.py --sessions 200 --turns 20 --sink-latency-us 50
+    python bench_logging.py --sample form.extracted=0.25 --rate-limit 20
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import statistics
+import time
+
+from structured_logging import TEXT_FORMAT, parse_sample_rates, setup_logging
+
+LEAD = {
+    "name": "Jordan Example",
+    "inquiry": "Quote for replacing a leaking water heater in the basement",
+    "email": "jordan@example.com",
+    "phone": "+1 555 010 4477",
+}
+
+
+class SlowSink(io.TextIOBase):
+    """Discards writes after busy-waiting `latency` seconds, like a full pipe would block."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        if self.latency:
+            deadline = time.perf_counter() + self.latency
+            while time.perf_counter() < deadline:
+                pass
+        return len(text)
+
+
+def before_turn(turn: int) -> None:
+    logging.info(f"Extracted form fields from transcript: {sorted(LEAD)[:turn % 4 + 1]}")
+    logging.info("Answered from the answer cache.")
+
+
+def before_lead() -> None:
+    logging.info(f"LLM triggered present_verification_form with: name='{LEAD['name']}', inquiry='{LEAD['inquiry']}', email='{LEAD['email']}', phone='{LEAD['phone']}'")
+    logging.info(f"Successfully sent RPC to visitor-1234")
+    logging.info(f"Agent received submit_lead_form RPC with payload: {json.dumps(LEAD)}")
+    logging.info(f"Received request to create lead: {dict(LEAD, business_id='acme-plumbing')}")
+
+
+def after_turn(turn: int) -> None:
+    logging.info("Extracted form fields from transcript: %s", sorted(LEAD)[:turn % 4 + 1], extra={"event": "form.extracted"})
+    logging.info("Answered from the answer cache.", extra={"event": "answer_cache.hit"})
+
+
+def after_lead() -> None:
+    logging.info("LLM triggered present_verification_form.", extra={"event": "tool.present_verification_form", "fields": LEAD})
+    logging.info("Successfully sent RPC to %s", "visitor-1234", extra={"event": "rpc.display_lead_form"})
+    logging.info("Agent received submit_lead_form RPC (%d bytes).", len(json.dumps(LEAD)), extra={"event": "rpc.submit_lead_form"})
+    logging.info("Received request to create lead for business %s.", "acme-plumbing", extra={"event": "api.create_lead"})
+
+
+async def run_sessions(args: argparse.Namespace, turn_fnc, lead_fnc) -> list[float]:
+    """Returns the time each session spent inside log calls, in milliseconds."""
+    per_session = []
+    for _ in range(args.sessions):
+        spent = 0.0
+        for turn in range(args.turns):
+            started = time.perf_counter()
+            turn_fnc(turn)
+            spent += time.perf_counter() - started
+            await asyncio.sleep(0)
+        started = time.perf_counter()
+        lead_fnc()
+        spent += time.perf_counter() - started
+        per_session.append(spent * 1000)
+    return per_session
+
+
+def report(label: str, per_session: list[float], drain_ms: float, sink: SlowSink) -> None:
+    per_session = sorted(per_session)
+    p99 = per_session[min(len(per_session) - 1, int(len(per_session) * 0.99))]
+    print(f"{label:<7} on-loop per session: mean {statistics.mean(per_session):7.3f} ms  p99 {p99:7.3f} ms   "
+          f"lines written {sink.writes:>6}   background drain {drain_ms:7.1f} ms")
+
+
+def main(args: argparse.Namespace) -> None:
+    root = logging.getLogger()
+
+    sink = SlowSink(args.sink_latency_us / 1e6)
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    report("before", asyncio.run(run_sessions(args, before_turn, before_lead)), 0.0, sink)
+    root.removeHandler(handler)
+
+    sink = SlowSink(args.sink_latency_us / 1e6)
+    listener = setup_logging(
+        level="INFO",
+        json_output=True,
+        sample_rates=parse_sample_rates(args.sample),
+        rate_limit=args.rate_limit,
+        stream=sink,
+    )
+    per_session = asyncio.run(run_sessions(args, after_turn, after_lead))
+    started = time.perf_counter()
+    listener.stop()
+    report("after", per_session, (time.perf_counter() - started) * 1000, sink)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-session logging overhead on the event loop.")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=20, help="Conversation turns per session.")
+    parser.add_argument("--sink-latency-us", type=float, default=0.0, help="Time each write to the log sink blocks for.")
+    parser.add_argument("--sample", default="", help='Sample rates for the "after" run, e.g. "form.extracted=0.25".')
+    parser.add_argument("--rate-limit", type=float, help='Records per second per message type for the "after" run.')
+    main(parser.parse_args())
@@ -0,0 +1,90 @@
+"""
+Startup benchmark for the cloud agent worker.
+
+Measures, each in a fresh interpreter so nothing is served from sys.modules:
+  * how long the worker's own module takes to import (what the supervisor pays),
+  * how long each livekit plugin takes to import,
+  * how long prewarm() takes end to end (what each new job process pays).
+
+Usage:
+    python bench_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PLUGINS = ["deepgram", "groq", "silero", "cartesia"]
+AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_SNIPPET = """
+import time
+t = time.perf_counter()
+import {module}
+print(time.perf_counter() - t)
+"""
+
+PREWARM_SNIPPET = """
+import time
+import main
+
+class _Proc:
+    userdata = {}
+
+t = time.perf_counter()
+main.prewarm(_Proc())
+print(time.perf_counter() - t)
+"""
+
+
+def _time_snippet(snippet: str) -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", snippet], capture_output=True, text=True, check=True, cwd=AGENT_DIR
+    )
+    # The timing is always the last line; logging goes to stderr.
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def _measure(snippet: str, runs: int) -> dict | None:
+    try:
+        samples = [_time_snippet(snippet) for _ in range(runs)]
+    except subprocess.CalledProcessError as e:
+        # e.g. a plugin that is not installed in this environment; report the rest.
+        print(f"skipped: {e.stderr.strip().splitlines()[-1] if e.stderr else e}", file=sys.stderr)
+        return None
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark agent worker import and prewarm time.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters per measurement.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    results = {"worker_module_import": _measure(IMPORT_SNIPPET.format(module="main"), args.runs)}
+    for plugin in PLUGINS:
+        results[f"plugin_import.{plugin}"] = _measure(
+            IMPORT_SNIPPET.format(module=f"livekit.plugins.{plugin}"), args.runs
+        )
+    results["prewarm"] = _measure(PREWARM_SNIPPET, args.runs)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'measurement':<32}{'median':>10}{'min':>10}{'max':>10}")
+    for name, stats in results.items():
+        if stats is None:
+            print(f"{name:<32}{'failed':>10}")
+            continue
+        print(f"{name:<32}{stats['median_s']:>9.3f}s{stats['min_s']:>9.3f}s{stats['max_s']:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Offline check that core_agent.ContextManager keeps the prompt flat over a long session.
+
+Plays `--turns` visitor/assistant exchanges against a fake agent, with a fake summarizer
+in place of the LLM, running compaction the way BusinessAgent does after every user
+turn. The verification form is shown part way through and submitted later, to check
+that the form state message follows it instead of going stale.
+
+Fails if the prompt at the end is more than `--max-growth` times its size once
+compaction first kicked in, or if the form state message is out of date at any turn.
+
+Usage:
+    python check_context.py --turns 100
+"""
+import argparse
+import asyncio
+import sys
+
+from livekit.agents import llm
+
+from core_agent.context import FORM_STATE_MESSAGE_ID, ContextManager, _item_text, estimate_tokens
+
+
+class FakeSummaryStream:
+    def __init__(self, text: str):
+        self._text = text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        await asyncio.sleep(0)
+        yield llm.ChatChunk(id="summary", delta=llm.ChoiceDelta(role="assistant", content=self._text))
+
+
+class FakeSummarizer:
+    """Returns a summary of fixed size, like a model following the word limit."""
+
+    def chat(self, *, chat_ctx: llm.ChatContext):
+        return FakeSummaryStream("The visitor asked about services, hours and pricing. " * 8)
+
+
+class FakeAgent:
+    def __init__(self, instructions: str):
+        self._chat_ctx = llm.ChatContext()
+        self._chat_ctx.add_message(role="system", content=instructions)
+        self.form_fields: dict | None = None
+
+    @property
+    def chat_ctx(self) -> llm.ChatContext:
+        return self._chat_ctx
+
+    async def update_chat_ctx(self, chat_ctx: llm.ChatContext) -> None:
+        self._chat_ctx = chat_ctx.copy()
+
+    def form_state_text(self) -> str | None:
+        if not self.form_fields:
+            return None
+        return f"The verification form is currently displayed to the user with: {self.form_fields}."
+
+
+def prompt_tokens(chat_ctx: llm.ChatContext) -> int:
+    return sum(estimate_tokens(_item_text(item)) for item in chat_ctx.items)
+
+
+def form_state_message(chat_ctx: llm.ChatContext) -> str | None:
+    item = next((item for item in chat_ctx.items if item.id == FORM_STATE_MESSAGE_ID), None)
+    return item.text_content if item is not None else None
+
+
+async def main(args: argparse.Namespace) -> int:
+    agent = FakeAgent("You are a helpful receptionist. " * 40)
+    manager = ContextManager(FakeSummarizer(), keep_turns=args.keep_turns)
+    show_form_at, submit_at = args.turns // 3, 2 * args.turns // 3
+
+    failures = []
+    sizes = []
+    baseline = None
+    carried = 0
+    for turn in range(1, args.turns + 1):
+        if turn == show_form_at:
+            agent.form_fields = {"name": "Jane Doe", "email": "jane@example.com"}
+        elif turn == submit_at:
+            agent.form_fields = None
+
+        agent.chat_ctx.add_message(role="user", content=f"Question {turn}: do you also handle job number {turn}?")
+        turn_ctx = agent.chat_ctx.copy()
+        await manager.refresh_form_state(agent, turn_ctx, agent.form_state_text())
+        manager.maybe_compact(agent, agent.form_state_text)
+
+        stale = form_state_message(turn_ctx)
+        carried += stale is not None
+        if stale is not None and stale != agent.form_state_text():
+            failures.append(f"turn {turn}: form state message is stale: {stale!r}")
+
+        agent.chat_ctx.add_message(role="assistant", content=f"Yes, we handle job {turn}. " * 4)
+        if manager._task is not None:
+            await manager._task
+        sizes.append(prompt_tokens(agent.chat_ctx))
+        if baseline is None and manager.summary:
+            baseline = sizes[-1]
+
+    stale = form_state_message(agent.chat_ctx)
+    if stale is not None:
+        failures.append(f"form state message still present after submission: {stale!r}")
+
+    for turn in (1, 10, 25, 50, 75, args.turns):
+        if turn <= len(sizes):
+            print(f"turn {turn:>4}: ~{sizes[turn - 1]:>5} prompt tokens")
+    if not carried:
+        failures.append("the form state was never carried across a compaction")
+    if baseline is None:
+        failures.append("compaction never ran")
+    elif max(sizes[-args.keep_turns:]) > baseline * args.max_growth:
+        failures.append(f"prompt grew from ~{baseline} to ~{max(sizes[-args.keep_turns:])} tokens")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print(f"OK: prompt stayed within {args.max_growth:g}x of ~{baseline} tokens over {args.turns} turns.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the compacted chat context stays bounded.")
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--keep-turns", type=int, default=8, help="ContextManager.keep_turns.")
+    parser.add_argument("--max-growth", type=float, default=1.5, help="Allowed growth over the first compacted size.")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,71 @@
+"""
+Offline check for core_agent.AdaptiveEndpointing against the installed livekit-agents.
+
+Builds a real (not started) AgentSession, attaches the tuner and plays VAD and agent
+state events on it:
+  * where AgentSession.update_options() takes `min_endpointing_delay` (1.2.7+), the
+    session's delay follows the visitor's pauses and drops after a direct question,
+  * where it does not (the pinned 1.2.5), attaching and _apply() must not raise and
+    the session keeps its configured delay.
+
+Run it under the agent's pinned requirements, and again after any livekit-agents bump:
+    python check_endpointing.py
+"""
+import asyncio
+import sys
+
+from livekit.agents import AgentSession, __version__, llm
+from livekit.agents.voice.events import AgentStateChangedEvent, ConversationItemAddedEvent, UserStateChangedEvent
+
+from core_agent import AdaptiveEndpointing
+
+
+def user_state(session: AgentSession, old: str, new: str) -> None:
+    session.emit("user_state_changed", UserStateChangedEvent(old_state=old, new_state=new))
+
+
+async def speak_with_pauses(session: AgentSession, pause: float, count: int) -> None:
+    user_state(session, "listening", "speaking")
+    for _ in range(count):
+        user_state(session, "speaking", "listening")
+        await asyncio.sleep(pause)
+        user_state(session, "listening", "speaking")
+    user_state(session, "speaking", "listening")
+
+
+async def main() -> int:
+    session = AgentSession(min_endpointing_delay=0.5)
+    configured = session.options.min_endpointing_delay
+    endpointing = AdaptiveEndpointing(session, base_delay=0.5)
+    failures = []
+
+    try:
+        endpointing.attach()
+        endpointing._apply()
+        await speak_with_pauses(session, pause=0.3, count=3)
+        session.emit("agent_state_changed", AgentStateChangedEvent(old_state="listening", new_state="thinking"))
+        session.emit("conversation_item_added", ConversationItemAddedEvent(
+            item=llm.ChatMessage(role="assistant", content=["Great, and what's your email address?"]),
+        ))
+    except Exception as e:
+        failures.append(f"attaching or applying raised {e!r}")
+
+    delay = session.options.min_endpointing_delay
+    print(f"livekit-agents {__version__}: supported={endpointing.supported}, "
+          f"delay {configured:.2f}s -> {delay:.2f}s, {endpointing.summary()}")
+    if endpointing.supported:
+        expected = endpointing._clamp(endpointing.pause_estimate * endpointing.pause_margin) * endpointing.question_factor
+        if endpointing.pause_estimate is None or abs(delay - endpointing._clamp(expected)) > 0.02:
+            failures.append(f"the session delay is {delay:.2f}s, expected about {endpointing._clamp(expected):.2f}s")
+    elif delay != configured:
+        failures.append(f"the session delay changed to {delay:.2f}s although update_options() is unsupported")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,46 @@
+"""
+Offline checks for core_agent.TranscriptExtractor on transcripts as STT produces them.
+
+Each case feeds one or more final transcripts to a fresh extractor and compares the
+fields found after the last one, including cases where nothing may be extracted
+(a street number is not a phone number, "I'm Sorry" is not a name).
+
+Usage:
+    python check_extraction.py
+"""
+import sys
+
+from core_agent import TranscriptExtractor
+
+CASES = [
+    (["my number is oh seven seven double nine one two three four five six"], {"phone": "07799123456"}),
+    (["you can call me on 555 010 4477"], {"phone": "5550104477"}),
+    (["it's +44 7799 123456"], {"phone": "+447799123456"}),
+    (["my phone is 5 5 5 0 1 0 4"], {"phone": "5550104"}),
+    (["my address is 1 2 3 4 5 6 7 Main St"], {}),
+    (["the order reference is 4 4 1 9 2 8 3 and it arrived broken"], {}),
+    (["I live at 1234567 Main Street"], {}),
+    (["My email is j o h n dot smith", "at gmail dot com"], {"email": "john.smith@gmail.com"}),
+    (["the house at 5 dot com"], {}),
+    (["Hi, my name is Jane Doe"], {"name": "Jane Doe"}),
+    (["I'm Sorry, could you repeat that"], {}),
+    (["This is Friday's job we talked about"], {}),
+]
+
+
+def main() -> int:
+    failed = 0
+    for transcripts, expected in CASES:
+        extractor = TranscriptExtractor()
+        for transcript in transcripts:
+            fields = extractor.feed(transcript)
+        ok = fields == expected
+        failed += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {' / '.join(transcripts)!r}")
+        if not ok:
+            print(f"       got {fields}, expected {expected}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
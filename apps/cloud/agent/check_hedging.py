@@ -0,0 +1,151 @@
+"""
+Offline checks for core_agent.hedged_stream, using fake LLM streams.
+
+Covers:
+  * a primary that answers within the budget is used and no hedge is sent,
+  * a slow primary loses to the secondary and is closed,
+  * a loser that is measured records the latency saved and is then closed,
+  * a primary that fails early is hedged immediately,
+  * when both streams fail, both are closed and the first error is raised.
+
+Usage:
+    python check_hedging.py
+"""
+import asyncio
+import sys
+
+from core_agent.hedging import HedgeStats, hedged_stream
+
+
+class FakeStream:
+    """Yields `chunks` after waiting `delay` seconds, or raises `error` at that point."""
+
+    def __init__(self, name: str, delay: float, chunks: tuple[str, ...] = ("hello", " world"), error: Exception | None = None):
+        self.name = name
+        self.delay = delay
+        self.chunks = chunks
+        self.error = error
+        self.started = False
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        self.started = True
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        for chunk in self.chunks:
+            yield chunk
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+async def collect(primary: FakeStream, secondary: FakeStream, budget: float, stats: HedgeStats, measure_loser: float = 0.0) -> str:
+    chunks = hedged_stream(primary, lambda: secondary, budget=budget, stats=stats, measure_loser=measure_loser)
+    try:
+        return "".join([chunk async for chunk in chunks])
+    finally:
+        await chunks.aclose()
+
+
+async def check_primary_within_budget() -> list[str]:
+    stats = HedgeStats()
+    primary = FakeStream("primary", 0.01, ("fast",))
+    secondary = FakeStream("secondary", 0.0, ("unused",))
+    text = await collect(primary, secondary, budget=0.1, stats=stats)
+    failures = []
+    if text != "fast":
+        failures.append(f"expected the primary's answer, got {text!r}")
+    if stats.hedged or secondary.started:
+        failures.append("a hedge was sent although the primary answered within the budget")
+    if not primary.closed:
+        failures.append("the winning stream was not closed after it was consumed")
+    return failures
+
+
+async def check_secondary_wins() -> list[str]:
+    stats = HedgeStats()
+    primary = FakeStream("primary", 1.0, ("slow",))
+    secondary = FakeStream("secondary", 0.01, ("quick",))
+    text = await collect(primary, secondary, budget=0.05, stats=stats)
+    failures = []
+    if text != "quick":
+        failures.append(f"expected the secondary's answer, got {text!r}")
+    if (stats.hedged, stats.secondary_wins) != (1, 1):
+        failures.append(f"expected one hedge won by the secondary, got {stats.summary()}")
+    if not primary.closed:
+        failures.append("the losing primary was not closed")
+    return failures
+
+
+async def check_loser_measured() -> list[str]:
+    stats = HedgeStats()
+    primary = FakeStream("primary", 0.15, ("slow",))
+    secondary = FakeStream("secondary", 0.01, ("quick",))
+    text = await collect(primary, secondary, budget=0.05, stats=stats, measure_loser=1.0)
+    await asyncio.sleep(0.2)
+    failures = []
+    if text != "quick":
+        failures.append(f"expected the secondary's answer, got {text!r}")
+    if len(stats.latency_saved_ms) != 1 or stats.latency_saved_ms[0] <= 0:
+        failures.append(f"latency saved was not recorded: {stats.latency_saved_ms}")
+    if not primary.closed:
+        failures.append("the measured loser was not closed afterwards")
+    return failures
+
+
+async def check_primary_fails_fast() -> list[str]:
+    stats = HedgeStats()
+    primary = FakeStream("primary", 0.0, error=ConnectionError("primary down"))
+    secondary = FakeStream("secondary", 0.01, ("fallback",))
+    text = await collect(primary, secondary, budget=1.0, stats=stats)
+    failures = []
+    if text != "fallback":
+        failures.append(f"expected the secondary's answer, got {text!r}")
+    if stats.hedged != 1:
+        failures.append("a failing primary did not trigger the hedge")
+    if not primary.closed:
+        failures.append("the failed primary was not closed")
+    return failures
+
+
+async def check_both_fail() -> list[str]:
+    stats = HedgeStats()
+    primary = FakeStream("primary", 0.1, error=ConnectionError("primary down"))
+    secondary = FakeStream("secondary", 0.01, error=TimeoutError("secondary down"))
+    failures = []
+    try:
+        await collect(primary, secondary, budget=0.05, stats=stats, measure_loser=1.0)
+        failures.append("no error was raised although both streams failed")
+    except TimeoutError:
+        pass
+    except Exception as e:
+        failures.append(f"expected the first error (TimeoutError), got {e!r}")
+    if not (primary.closed and secondary.closed):
+        failures.append(f"streams left open: primary closed={primary.closed}, secondary closed={secondary.closed}")
+    return failures
+
+
+async def main() -> int:
+    checks = [
+        check_primary_within_budget,
+        check_secondary_wins,
+        check_loser_measured,
+        check_primary_fails_fast,
+        check_both_fail,
+    ]
+    failed = 0
+    for check in checks:
+        failures = await check()
+        print(f"{'FAIL' if failures else 'ok  '} {check.__name__}")
+        for failure in failures:
+            print(f"       {failure}")
+        failed += bool(failures)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,130 @@
+"""
+Offline checks for structured_logging.
+
+Covers:
+  * phone numbers and emails are redacted in every usual written form, while epoch
+    timestamps, numeric IDs, decimals, dates and UUIDs are left alone,
+  * PII extras are redacted by key, also inside nested payloads,
+  * sampling keeps the first record then 1 in round(1 / rate), the rate limit caps a
+    burst, warnings always pass, and the dropped count reaches the next record,
+  * through setup_logging(), a mutable argument changed right after the log call is
+    logged as it was at the call.
+
+Usage:
+    python check_logging.py
+"""
+import io
+import json
+import logging
+import sys
+
+from structured_logging import SamplingFilter, redact_text, redact_value, setup_logging
+
+REDACTED = {
+    "call me on +1 555 010 4477": "call me on [phone]",
+    "call me on +15550104477": "call me on [phone]",
+    "call me on (555) 010-4477 please": "call me on [phone] please",
+    "call me on 555.010.4477.": "call me on [phone].",
+    "call me on 555-010-4477": "call me on [phone]",
+    "call me on 5550104477": "call me on [phone]",
+    "call me on 07799 123456": "call me on [phone]",
+    "call me on 020 7946 0958": "call me on [phone]",
+    "write to jane.doe+leads@example.co.uk": "write to [email]",
+}
+
+UNCHANGED = [
+    "created at 1760900000000",
+    "created at 1760900000",
+    "lead 98765432101234 stored",
+    "order 123456789012345678 stored",
+    "took 1234567.891 ms",
+    "at 2026-10-19 12:00:00.123456",
+    "session 123e4567-e89b-12d3-a456-426614174000",
+    "extension 555-0104",
+    "attempt 3 of 5 after 250 ms",
+]
+
+
+def record(msg: str, *args, level: int = logging.INFO, event: str | None = None) -> logging.LogRecord:
+    record = logging.LogRecord("check", level, __file__, 0, msg, args or None, None)
+    if event is not None:
+        record.event = event
+    return record
+
+
+def check_redaction() -> list[str]:
+    failures = []
+    for text, expected in REDACTED.items():
+        if redact_text(text) != expected:
+            failures.append(f"{text!r} became {redact_text(text)!r}, expected {expected!r}")
+    for text in UNCHANGED:
+        if redact_text(text) != text:
+            failures.append(f"{text!r} was changed to {redact_text(text)!r}")
+    payload = redact_value({"lead_id": 7, "payload": {"phone": "555"}, "fields": {"email": "a@b.co", "inquiry": "x"}})
+    if payload != {"lead_id": 7, "payload": "[redacted]", "fields": {"email": "[redacted]", "inquiry": "[redacted]"}}:
+        failures.append(f"PII keys were not redacted: {payload}")
+    return failures
+
+
+def check_sampling() -> list[str]:
+    failures = []
+    sampler = SamplingFilter({"form.extracted": 0.25})
+    kept = [sampler.filter(record("Extracted %s", index, event="form.extracted")) for index in range(8)]
+    if kept != [True, False, False, False, True, False, False, False]:
+        failures.append(f"rate 0.25 kept {kept}")
+
+    passed = [rec for rec in (record("Extracted %s", index, event="form.extracted") for index in range(8, 12)) if sampler.filter(rec)]
+    if len(passed) != 1 or getattr(passed[0], "suppressed", None) != 3:
+        failures.append(f"the next kept record should report 3 suppressed, got {[getattr(rec, 'suppressed', None) for rec in passed]}")
+
+    if not all(sampler.filter(record("Extracted %s", index, level=logging.WARNING, event="form.extracted")) for index in range(4)):
+        failures.append("a warning was sampled out")
+
+    limiter = SamplingFilter(rate_limit=5)
+    burst = sum(limiter.filter(record("Cache hit %s", index)) for index in range(100))
+    if not 5 <= burst <= 6:
+        failures.append(f"a rate limit of 5/s let {burst} of a 100-record burst through")
+    if limiter.filter(record("Other message %s", 1)) is not True:
+        failures.append("the rate limit of one message type held back another")
+    return failures
+
+
+def check_pipeline() -> list[str]:
+    stream = io.StringIO()
+    listener = setup_logging(level="INFO", json_output=True, sample_rates={"check.sampled": 0.5}, redact=True, stream=stream)
+    logger = logging.getLogger("check")
+
+    fields = {"status": "shown"}
+    logger.info("Form state %s", fields)
+    fields["status"] = "changed after the call"
+    logger.info("Lead from %s", "+1 555 010 4477", extra={"event": "lead.stored", "email": "jane@example.com", "lead_id": 7})
+    for index in range(3):
+        logger.info("Sampled %s", index, extra={"event": "check.sampled"})
+    listener.stop()
+
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    messages = [entry["message"] for entry in entries]
+    failures = []
+    if messages[:2] != ["Form state {'status': 'shown'}", "Lead from [phone]"]:
+        failures.append(f"unexpected messages: {messages[:2]}")
+    if len(entries) > 1 and (entries[1].get("email"), entries[1].get("lead_id")) != ("[redacted]", 7):
+        failures.append(f"extras were not redacted by key: {entries[1]}")
+    if [entry.get("suppressed") for entry in entries[2:]] != [None, 1]:
+        failures.append(f"sampled records: {entries[2:]}")
+    return failures
+
+
+def main() -> int:
+    checks = [check_redaction, check_sampling, check_pipeline]
+    failed = 0
+    for check in checks:
+        failures = check()
+        print(f"{'FAIL' if failures else 'ok  '} {check.__name__}")
+        for failure in failures:
+            print(f"       {failure}")
+        failed += bool(failures)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
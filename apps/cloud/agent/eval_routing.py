@@ -0,0 +1,131 @@
+"""
+Offline evaluation of the per-turn model cascade (core_agent.RoutedLLM).
+
+Replays recorded transcripts through `route_turn` and estimates the latency and cost
+of every turn if it had been answered by the model it was routed to, compared with
+sending every turn to the large model.
+
+Transcripts are JSONL, one conversation per line:
+
+    {"business_id": "bob-the-builder-123",
+     "routing_policy": {"enabled": true},            # optional, defaults to enabled
+     "instructions_chars": 6000,                     # optional, size of the system prompt
+     "turns": [{"role": "user", "text": "what are your hours?"},
+               {"role": "assistant", "text": "We're open 9 to 5.", "tool_call": null}]}
+
+An assistant turn with `"tool_call": "present_verification_form"` marks a turn that
+must reach the large model. Routing any of those to the small model is reported
+as a misroute.
+
+Usage:
+    python eval_routing.py transcripts.jsonl
+"""
+import argparse
+import json
+from dataclasses import dataclass
+
+from core_agent import RoutingPolicy, route_turn
+
+
+@dataclass
+class ModelProfile:
+    ttft_s: float
+    tokens_per_s: float
+    usd_per_m_input: float
+    usd_per_m_output: float
+
+    def latency(self, output_tokens: int) -> float:
+        return self.ttft_s + output_tokens / self.tokens_per_s
+
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        return (input_tokens * self.usd_per_m_input + output_tokens * self.usd_per_m_output) / 1_000_000
+
+
+def _tokens(chars: int) -> int:
+    # Close enough for Llama tokenizers on English text.
+    return max(1, chars // 4)
+
+
+def evaluate(conversations: list[dict], small: ModelProfile, large: ModelProfile) -> dict:
+    totals = {
+        "turns": 0, "small_turns": 0, "misroutes": 0,
+        "baseline_latency_s": 0.0, "routed_latency_s": 0.0,
+        "baseline_cost_usd": 0.0, "routed_cost_usd": 0.0,
+    }
+
+    for conversation in conversations:
+        policy = RoutingPolicy.from_dict({"enabled": True, **(conversation.get("routing_policy") or {})})
+        context_chars = conversation.get("instructions_chars", 4000)
+        last_assistant_text = ""
+        lead_in_progress = False
+        turns = conversation["turns"]
+
+        for index, turn in enumerate(turns):
+            context_chars += len(turn.get("text") or "")
+            if turn["role"] == "assistant":
+                last_assistant_text = turn.get("text") or ""
+                if turn.get("tool_call") == "present_verification_form":
+                    lead_in_progress = True
+                continue
+
+            reply = turns[index + 1] if index + 1 < len(turns) and turns[index + 1]["role"] == "assistant" else {}
+            output_tokens = _tokens(len(reply.get("text") or ""))
+            input_tokens = _tokens(context_chars)
+
+            route = route_turn(turn.get("text") or "", last_assistant_text, lead_in_progress, policy)
+            model = small if route == "small" else large
+
+            totals["turns"] += 1
+            totals["small_turns"] += route == "small"
+            totals["misroutes"] += route == "small" and reply.get("tool_call") is not None
+            totals["baseline_latency_s"] += large.latency(output_tokens)
+            totals["routed_latency_s"] += model.latency(output_tokens)
+            totals["baseline_cost_usd"] += large.cost(input_tokens, output_tokens)
+            totals["routed_cost_usd"] += model.cost(input_tokens, output_tokens)
+
+    turns = totals["turns"] or 1
+    totals["small_share"] = totals["small_turns"] / turns
+    totals["latency_saved_per_turn_ms"] = (totals["baseline_latency_s"] - totals["routed_latency_s"]) / turns * 1000
+    totals["cost_saved_usd"] = totals["baseline_cost_usd"] - totals["routed_cost_usd"]
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate latency and cost saved by the model cascade.")
+    parser.add_argument("transcripts", help="JSONL file of recorded conversations.")
+    parser.add_argument("--small-ttft", type=float, default=0.15, help="Small model time to first token (s).")
+    parser.add_argument("--small-tps", type=float, default=750.0, help="Small model output tokens per second.")
+    parser.add_argument("--small-price", type=float, nargs=2, default=(0.05, 0.08), metavar=("IN", "OUT"),
+                        help="Small model USD per million input/output tokens.")
+    parser.add_argument("--large-ttft", type=float, default=0.35, help="Large model time to first token (s).")
+    parser.add_argument("--large-tps", type=float, default=275.0, help="Large model output tokens per second.")
+    parser.add_argument("--large-price", type=float, nargs=2, default=(0.59, 0.79), metavar=("IN", "OUT"),
+                        help="Large model USD per million input/output tokens.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    with open(args.transcripts, "r") as f:
+        conversations = [json.loads(line) for line in f if line.strip()]
+
+    results = evaluate(
+        conversations,
+        small=ModelProfile(args.small_ttft, args.small_tps, *args.small_price),
+        large=ModelProfile(args.large_ttft, args.large_tps, *args.large_price),
+    )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"Conversations:            {len(conversations)}")
+    print(f"User turns:               {results['turns']}")
+    print(f"Routed to small model:    {results['small_turns']} ({results['small_share']:.0%})")
+    print(f"Misroutes (tool turns):   {results['misroutes']}")
+    print(f"Latency saved per turn:   {results['latency_saved_per_turn_ms']:.0f} ms")
+    print(f"Cost, all large:          ${results['baseline_cost_usd']:.4f}")
+    print(f"Cost, routed:             ${results['routed_cost_usd']:.4f}")
+    print(f"Cost saved:               ${results['cost_saved_usd']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
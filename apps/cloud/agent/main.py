@@ -1,12 +1,17 @@
 import asyncio
 import logging
 import os
+import time
 import aiohttp
 import json
 
 
-from core_agent import BusinessAgent
+from core_agent import (
+    AdaptiveEndpointing, AnswerCache, BusinessAgent, ContextManager, HedgedLLM, ProviderPool, RoutedLLM, RoutingPolicy,
+    SessionStore, TaskSupervisor, local_embedder, pooled_openai_client, session_id_from_room, start_loop_monitor,
+)
 from string import Template
+from structured_logging import setup_logging
 from dotenv import load_dotenv
 
 # Load environment variables *before* they are used
@@ -16,14 +21,79 @@ from livekit import agents
 # This is the corrected import path for the event and state enum
 from livekit.agents import JobRequest, function_tool, get_job_context, UserStateChangedEvent
 from livekit import rtc
-from livekit.plugins import deepgram, groq, silero, cartesia
+# NOTE: livekit.plugins (deepgram, groq, silero, cartesia) are imported lazily in
+# prewarm(). The supervisor process never needs them, and importing them here would
+# add their import cost to every process the worker starts before it can register.
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Logging: LiveKit installs the root handlers (JSON in production, forwarded from job
+# processes to the worker). prewarm() puts them behind a queue with setup_logging(), so
+# job processes never format or write logs on the event loop. See LOG_* in structured_logging.
 
 INTERNAL_API_URL = os.getenv("INTERNAL_API_URL")
 INTERNAL_API_KEY = os.getenv("INTERNAL_API_KEY")
 
+# Number of prewarmed processes kept idle so a new job never waits for imports or
+# the VAD model to load. Leave unset to use the LiveKit default for dev/prod.
+NUM_IDLE_PROCESSES = os.getenv("AGENT_NUM_IDLE_PROCESSES")
+
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+# Seconds between keep-alive pings that stop provider connections going cold mid-session.
+PROVIDER_KEEPALIVE_INTERVAL = float(os.getenv("PROVIDER_KEEPALIVE_INTERVAL", "30"))
+# Seconds the job-start warm-up may take; it runs beside the setup and never delays it.
+PROVIDER_WARMUP_TIMEOUT = float(os.getenv("PROVIDER_WARMUP_TIMEOUT", "2"))
+
+# Hedged LLM requests: if the primary model has not produced a first token within
+# LLM_HEDGE_BUDGET_MS, the same request is sent to LLM_HEDGE_MODEL and the first
+# stream to answer wins. Disabled unless LLM_HEDGE_MODEL is set.
+LLM_MODEL = "llama-3.3-70b-versatile"
+LLM_HEDGE_MODEL = os.getenv("LLM_HEDGE_MODEL")
+LLM_HEDGE_BUDGET_MS = float(os.getenv("LLM_HEDGE_BUDGET_MS", "800"))
+# How long a losing stream may keep running (never spoken) so the latency the hedge
+# saved can be measured; 0 closes it as soon as the winner is known.
+LLM_HEDGE_MEASURE_LOSER_MS = float(os.getenv("LLM_HEDGE_MEASURE_LOSER_MS", "2000"))
+
+# Local SQLite file shared by all job processes on this host that caches answers to
+# repeated visitor questions per business. Set to an empty string to disable.
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "answer_cache.sqlite3")
+# Also match near-duplicate questions using local embeddings (requires fastembed).
+ANSWER_CACHE_EMBEDDINGS = os.getenv("ANSWER_CACHE_EMBEDDINGS", "false").lower() == "true"
+
+# Chat context budget: the last CONTEXT_KEEP_TURNS user turns are kept verbatim and
+# older ones are summarized, so long sessions do not grow every turn's prompt.
+CONTEXT_KEEP_TURNS = int(os.getenv("CONTEXT_KEEP_TURNS", "8"))
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "3000"))
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "300"))
+
+# RPC method on the frontend that receives name/email/phone as soon as they are heard,
+# before the LLM presents the verification form. Unset to disable the early push.
+PREFILL_RPC_METHOD = os.getenv("PREFILL_RPC_METHOD")
+
+# Silence the VAD needs before it reports the user stopped speaking, and whether the
+# extra end-of-turn delay on top of it adapts to each visitor's pauses.
+# Adapting needs livekit-agents 1.2.7+; with the pinned 1.2.5 the delay stays fixed (a warning is logged).
+VAD_MIN_SILENCE_DURATION = float(os.getenv("VAD_MIN_SILENCE_DURATION", "0.55"))
+ADAPTIVE_ENDPOINTING = os.getenv("ADAPTIVE_ENDPOINTING", "true").lower() == "true"
+
+# Opt-in event loop diagnostics: logs loop lag and the stack of anything blocking the
+# loop longer than LOOP_STALL_THRESHOLD_MS. Send SIGUSR1 to a job process to log a
+# sampling profile; DIAGNOSTICS_HTTP_PORT also serves /lag and /profile on localhost
+# (use 0 for a random port per process, logged at startup).
+LOOP_DIAGNOSTICS = os.getenv("LOOP_DIAGNOSTICS", "false").lower() == "true"
+LOOP_STALL_THRESHOLD_MS = float(os.getenv("LOOP_STALL_THRESHOLD_MS", "100"))
+DIAGNOSTICS_HTTP_PORT = os.getenv("DIAGNOSTICS_HTTP_PORT")
+
+# Background work per session (lead submissions, form pre-fill pushes): how many tasks may
+# run at once, how long a submit_lead_form RPC waits for a free slot before failing so the
+# visitor can retry, and how long running tasks get to finish when the session ends.
+SESSION_MAX_TASKS = int(os.getenv("SESSION_MAX_TASKS", "4"))
+SUBMIT_SLOT_TIMEOUT = float(os.getenv("SUBMIT_SLOT_TIMEOUT", "3"))
+TASK_DRAIN_TIMEOUT = float(os.getenv("TASK_DRAIN_TIMEOUT", "5"))
+
+# Local SQLite file holding the state of sessions whose visitor dropped off, so a reconnect
+# within SESSION_RESUME_GRACE seconds continues the conversation. Empty string disables it.
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "session_store.sqlite3")
+SESSION_RESUME_GRACE = float(os.getenv("SESSION_RESUME_GRACE", "120"))
+
 
 async def fetch_business_profile(session: aiohttp.ClientSession, business_id: str) -> dict:
     url = f"{INTERNAL_API_URL}/api/internal/businesses/{business_id}"
@@ -34,11 +104,49 @@ async def fetch_business_profile(session: aiohttp.ClientSession, business_id: st
             raise Exception(f"Business not found: {business_id}")
         return await response.json()
 
+def build_instructions(profile: dict) -> str:
+    """The agent's system prompt for a business profile from the internal API (also used by bench_llm.py)."""
+    return (
+        f"You are a friendly and helpful digital receptionist for {profile['business_name']}. "
+        f"Your primary goal is to answer the user's questions based on the business information provided. "
+        f"Your secondary goal is to capture new customer leads, but ONLY if the user expresses a desire to be contacted. "
+        f"If the user asks for a quote, a callback, or a service visit, that is your cue to collect their information. "
+        f"You must collect their name, their specific inquiry, and their email address. A phone number is optional, but you can ask for it if it seems appropriate. "
+        f"Once you have naturally collected the user's name, their inquiry, and their email address, "
+        f"you MUST call the `present_verification_form` tool. "
+        f"After you call the tool and receive the confirmation message 'The verification form was successfully displayed to the user.', "
+        f"your next response MUST be to instruct the user to check the details on the form and click the send button if they are correct. "
+        f"Also, let them know they can either edit the form directly or tell you if they want to make any changes. "
+        f"If the user asks you to change any of the details while the form is displayed, you MUST call the `present_verification_form` tool again with the updated information. "
+        f"If the user is just asking questions, simply answer them and remain helpful. Do not push to capture their details. "
+        f"Business Information: {profile['knowledge_base']}"
+    )
+
 async def entrypoint(ctx: agents.JobContext):
     logging.info(f"Agent received job: {ctx.job.id} for room {ctx.room.name}")
+    job_started_at = time.perf_counter()
+    if LOOP_DIAGNOSTICS:
+        start_loop_monitor(
+            stall_threshold=LOOP_STALL_THRESHOLD_MS / 1000,
+            http_port=int(DIAGNOSTICS_HTTP_PORT) if DIAGNOSTICS_HTTP_PORT else None,
+        )
+
+    # Start opening the provider connections straight away, in parallel with
+    # fetching the profile and joining the room, instead of on the first utterance.
+    providers: ProviderPool = ctx.proc.userdata["providers"]
+    warmup_task = asyncio.create_task(providers.warm_up(timeout=PROVIDER_WARMUP_TIMEOUT))
     
     session_ended = asyncio.Event()
     greeting_allowed = asyncio.Event()
+    visitor_disconnected = False
+
+    # The frontend keeps its session id across reconnects (and forgets it on hang-up);
+    # pick up where an earlier job left off.
+    session_store = await SessionStore.open(SESSION_STORE_PATH, grace_period=SESSION_RESUME_GRACE) if SESSION_STORE_PATH else None
+    session_id = session_id_from_room(ctx.room.name)
+    resume_state = await session_store.aclaim(session_id) if session_store is not None and session_id else None
+    if resume_state:
+        logging.info("AGENT: Resuming session %s for job %s.", session_id, ctx.job.id, extra={"event": "resume.resumed"})
 
     # Set up event listeners before connecting to the room to avoid missing initial events.
     @ctx.room.on("track_subscribed")
@@ -50,7 +158,9 @@ async def entrypoint(ctx: agents.JobContext):
 
     @ctx.room.on("participant_disconnected")
     def on_participant_disconnected(participant):
+        nonlocal visitor_disconnected
         logging.info(f"Participant disconnected: {participant.identity}, closing session.")
+        visitor_disconnected = True
         session_ended.set()
 
     async with aiohttp.ClientSession() as http_session:
@@ -61,7 +171,10 @@ async def entrypoint(ctx: agents.JobContext):
             # The room name is now "contractor_id_conversation_id".
             # We can reliably split by the first underscore.
             business_id = ctx.room.name.split('_')[0]
-            profile = await fetch_business_profile(http_session, business_id)
+            if resume_state and resume_state.get("profile"):
+                profile = resume_state["profile"]
+            else:
+                profile = await fetch_business_profile(http_session, business_id)
 
             # Now, connect to the room
             await ctx.connect()
@@ -69,45 +182,73 @@ async def entrypoint(ctx: agents.JobContext):
 
         except Exception as e:
             logging.error(f"Could not start agent session during setup: {e}")
+            warmup_task.cancel()
+            if session_store is not None:
+                if resume_state:
+                    # Let the visitor's next attempt resume it instead.
+                    await session_store.arelease(session_id)
+                await session_store.aclose()
             ctx.shutdown()
             return
 
-                # This is the application-specific logic for the Cloud version.
+        # This is the application-specific logic for the Cloud version.
         # It constructs the prompt from the database profile.
-        instructions = (
-            f"You are a friendly and helpful digital receptionist for {profile['business_name']}. "
-            f"Your primary goal is to answer the user's questions based on the business information provided. "
-            f"Your secondary goal is to capture new customer leads, but ONLY if the user expresses a desire to be contacted. "
-            f"If the user asks for a quote, a callback, or a service visit, that is your cue to collect their information. "
-            f"You must collect their name, their specific inquiry, and their email address. A phone number is optional, but you can ask for it if it seems appropriate. "
-            f"Once you have naturally collected the user's name, their inquiry, and their email address, "
-            f"you MUST call the `present_verification_form` tool. "
-            f"After you call the tool and receive the confirmation message 'The verification form was successfully displayed to the user.', "
-            f"your next response MUST be to instruct the user to check the details on the form and click the send button if they are correct. "
-            f"Also, let them know they can either edit the form directly or tell you if they want to make any changes. "
-            f"If the user asks you to change any of the details while the form is displayed, you MUST call the `present_verification_form` tool again with the updated information. "
-            f"If the user is just asking questions, simply answer them and remain helpful. Do not push to capture their details. "
-            f"Business Information: {profile['knowledge_base']}"
-        )
+        instructions = build_instructions(profile)
 
-                        stt = deepgram.STT()
-        llm = groq.LLM(model="llama-3.3-70b-versatile")
-        
         # Use the pre-warmed clients and models from userdata
-        tts = ctx.proc.userdata["tts"]
         vad = ctx.proc.userdata["vad"]
 
+        # Businesses can opt in to sending simple FAQ turns to a smaller, faster model.
+        llm = providers.llm
+        routing_policy = RoutingPolicy.from_dict(profile.get("routing_policy"))
+        if routing_policy.enabled:
+            from livekit.plugins import groq  # already imported by prewarm()
+            small_llm = groq.LLM(model=routing_policy.small_model, client=providers.llm_client)
+            llm = RoutedLLM(small=small_llm, large=providers.llm, policy=routing_policy, owned=(small_llm,))
+
         session = agents.AgentSession(
-            stt=stt,
+            stt=providers.stt,
             llm=llm,
-            tts=tts,
+            tts=providers.tts,
             vad=vad,
             turn_detection="vad",  # Use the simpler, faster, and stable VAD-based turn detection
             user_away_timeout=60
         )
+        endpointing = None
+        if ADAPTIVE_ENDPOINTING:
+            endpointing = AdaptiveEndpointing(session)
+            endpointing.attach()
         
+        answer_cache = None
+        if ANSWER_CACHE_PATH:
+            answer_cache = await AnswerCache.open(
+                ANSWER_CACHE_PATH,
+                business_id=business_id,
+                knowledge_base=profile.get("knowledge_base"),
+                embedder=ctx.proc.userdata.get("embedder"),
+            )
+
+        context_manager = ContextManager(
+            summarizer=providers.llm,
+            keep_turns=CONTEXT_KEEP_TURNS,
+            max_tokens=CONTEXT_MAX_TOKENS,
+            summary_max_tokens=CONTEXT_SUMMARY_MAX_TOKENS,
+        )
+
+        # Owns the session's background work so none of it outlives the session.
+        tasks = TaskSupervisor(
+            name=f"job {ctx.job.id}", max_in_flight=SESSION_MAX_TASKS, drain_timeout=TASK_DRAIN_TIMEOUT,
+        )
+
         # Initialize our shared BusinessAgent with the instructions we just built
-        agent = BusinessAgent(instructions=instructions)
+        agent = BusinessAgent(
+            instructions=instructions,
+            answer_cache=answer_cache,
+            context_manager=context_manager,
+            prefill_rpc_method=PREFILL_RPC_METHOD,
+            tasks=tasks,
+            resume_state=resume_state,
+        )
 
         @session.on("user_state_changed")
         def on_user_state_changed(ev: UserStateChangedEvent):
@@ -126,7 +267,7 @@ async def entrypoint(ctx: agents.JobContext):
             """
             # 1. Immediately interrupt any ongoing speech for a responsive feel.
             session.interrupt()
-            logging.info(f"Agent received submit_lead_form RPC with payload: {data.payload}")
+            logging.info("Agent received submit_lead_form RPC (%d bytes).", len(data.payload), extra={"event": "rpc.submit_lead_form"})
 
             async def _process_submission():
                 """Inner function to handle the actual logic in the background."""
@@ -147,44 +288,87 @@ async def entrypoint(ctx: agents.JobContext):
                     headers = {"Authorization": INTERNAL_API_KEY}
                     async with http_session.post(url, headers=headers, json=backend_payload) as response:
                         if response.status == 201:
-                            logging.info("Successfully saved lead to the database.")
+                            logging.info("Successfully saved lead to the database.", extra={"event": "lead.saved"})
                             await session.say(
                                 "Thank you. Your information has been sent. Was there anything else I can help you with today?",
                                 allow_interruptions=True
                             )
                         else:
-                            logging.error(f"Failed to save lead. Status: {response.status}, Body: {await response.text()}")
+                            logging.error("Failed to save lead. Status: %s, Body: %s", response.status, await response.text())
                             await session.say("I'm sorry, there was an error saving your information. Please try again in a moment.")
                 except Exception as e:
-                    logging.error(f"Error processing submit_lead_form RPC in background: {e}")
+                    logging.error("Error processing submit_lead_form RPC in background: %s", e)
                     await session.say("I'm sorry, a technical error occurred. Please try again.")
 
-            # 2. Start the submission processing in the background.
-            asyncio.create_task(_process_submission())
+            # 2. Start the submission processing in the background. If earlier submissions
+            #    are still running, wait briefly for a slot, then fail so the visitor can retry.
+            task = await tasks.submit(_process_submission(), name="submit_lead_form", timeout=SUBMIT_SLOT_TIMEOUT)
+            if task is None:
+                raise rtc.RpcError(rtc.RpcError.ErrorCode.APPLICATION_ERROR, "Too many submissions in progress.")
 
             # 3. Immediately return a success message to the frontend to prevent timeout.
             return "SUCCESS"
 
         logging.info("AGENT: Attempting to start AgentSession...")
         await session.start(room=ctx.room, agent=agent)
-        logging.info("AGENT: AgentSession started.")
+        if resume_state:
+            # Resumed for good; it is saved again if this connection drops too.
+            await session_store.adiscard(session_id)
+        logging.info("AGENT: AgentSession started. Job ready in %.3fs.", time.perf_counter() - job_started_at, extra={"event": "job.ready"})
 
         ctx.room.local_participant.register_rpc_method(
             "submit_lead_form", submit_lead_form_handler
         )
 
+        def on_warmup_done(task: asyncio.Task) -> None:
+            # The warm-up never holds up the RPC handler or the greeting; it is reported when it ends.
+            if task.cancelled() or task.exception() is not None or session_ended.is_set():
+                return
+            logging.info("AGENT: Provider handshake times (ms) for job %s: %s", ctx.job.id, task.result(), extra={"event": "providers.warmed"})
+            providers.start_keepalive()
+
+        warmup_task.add_done_callback(on_warmup_done)
+
         try:
             logging.info("AGENT: Waiting for a user to connect with an audio track...")
             await asyncio.wait_for(greeting_allowed.wait(), timeout=20.0)
-            logging.info("AGENT: Greeting is allowed. Attempting to say initial greeting...")
-            await session.say(f"Thank you for calling {profile['business_name']}. How can I help you today?", allow_interruptions=True)
-            logging.info("AGENT: Finished saying initial greeting.")
+            if resume_state:
+                # A resumed visitor is mid-conversation: no greeting, just put the form back if it was up.
+                await agent.redisplay_form()
+            else:
+                logging.info("AGENT: Greeting is allowed. Attempting to say initial greeting...")
+                await session.say(f"Thank you for calling {profile['business_name']}. How can I help you today?", allow_interruptions=True)
+                logging.info("AGENT: Finished saying initial greeting.")
         except asyncio.TimeoutError:
             logging.warning("AGENT: Timed out waiting for user audio track. Not sending greeting.")
             session_ended.set()
 
         await session_ended.wait()
+        warmup_task.cancel()
+        # Let in-flight submissions finish (they may still speak) before closing the session.
+        await tasks.aclose()
+        logging.info("AGENT: Background tasks for job %s: %s", ctx.job.id, tasks.summary(), extra={"event": "job.tasks"})
+        if session_store is not None and session_id:
+            if visitor_disconnected:
+                await session_store.asave(session_id, {**agent.snapshot(), "profile": profile})
+            else:
+                await session_store.adiscard(session_id)
+            await session_store.aclose()
         await session.aclose()
+        await context_manager.aclose()
+        if isinstance(llm, RoutedLLM):
+            # Detaches it from the shared providers.llm; closing providers is the pool's job.
+            await llm.aclose()
+        await providers.aclose()
+        if endpointing is not None:
+            logging.info("AGENT: Adaptive endpointing for job %s: %s", ctx.job.id, endpointing.summary(), extra={"event": "job.endpointing"})
+        if answer_cache is not None:
+            logging.info("AGENT: Answer cache for job %s: %s", ctx.job.id, answer_cache.summary(), extra={"event": "job.answer_cache"})
+            await answer_cache.aclose()
+        if isinstance(llm, RoutedLLM):
+            logging.info("AGENT: Model routing for job %s: %s", ctx.job.id, dict(llm.routes), extra={"event": "job.routing"})
+        if isinstance(providers.llm, HedgedLLM):
+            logging.info("AGENT: LLM hedging stats for job %s: %s", ctx.job.id, providers.llm.stats.summary(), extra={"event": "job.hedging"})
 
     ctx.shutdown()
 
@@ -196,21 +380,61 @@ async def request_fnc(req: JobRequest):
 def prewarm(proc: agents.JobProcess):
     # This function is called once when a new job process starts.
     # We load environment variables and initialize our stable clients and models here.
+    started_at = time.perf_counter()
     load_dotenv()
+    setup_logging()
     logging.info("Prewarm: Environment variables loaded into child process.")
-    
-    proc.userdata["vad"] = silero.VAD.load()
-    proc.userdata["tts"] = cartesia.TTS(model="sonic-english")
-    logging.info("Prewarm complete for cloud agent: VAD model and TTS client initialized.")
+
+    # Plugins are imported here rather than at module level so that only job
+    # processes pay for them. Plugins must register on the main thread, which
+    # is where LiveKit runs the prewarm function.
+    from livekit.plugins import deepgram, groq, silero, cartesia
+    imported_at = time.perf_counter()
+
+    proc.userdata["vad"] = silero.VAD.load(min_silence_duration=VAD_MIN_SILENCE_DURATION)
+    if ANSWER_CACHE_EMBEDDINGS:
+        proc.userdata["embedder"] = local_embedder()
+
+    # Provider clients are built once here and reused by the job. Their
+    # connections are opened at job start by ProviderPool.warm_up().
+    llm_client = pooled_openai_client(GROQ_BASE_URL, os.getenv("GROQ_API_KEY"))
+    llm = groq.LLM(model=LLM_MODEL, client=llm_client)
+    if LLM_HEDGE_MODEL:
+        llm = HedgedLLM(
+            primary=llm,
+            secondary=groq.LLM(model=LLM_HEDGE_MODEL, client=llm_client),
+            budget=LLM_HEDGE_BUDGET_MS / 1000,
+            measure_loser=LLM_HEDGE_MEASURE_LOSER_MS / 1000,
+        )
+
+    proc.userdata["providers"] = ProviderPool(
+        stt=deepgram.STT(),
+        llm=llm,
+        tts=cartesia.TTS(model="sonic-english"),
+        llm_client=llm_client,
+        keepalive_interval=PROVIDER_KEEPALIVE_INTERVAL,
+    )
+    proc.userdata["prewarm_seconds"] = time.perf_counter() - started_at
+    logging.info(
+        "Prewarm complete for cloud agent: VAD model and provider clients initialized "
+        "(imports %.3fs, total %.3fs).",
+        imported_at - started_at, proc.userdata["prewarm_seconds"],
+        extra={"event": "prewarm.done"},
+    )
 # ^-- THIS ENTIRE FUNCTION IS NEW --^
 
 if __name__ == "__main__":
     logging.info("Starting Contractor Leads Bot Agent Worker...")
 
+    worker_options = {}
+    if NUM_IDLE_PROCESSES:
+        worker_options["num_idle_processes"] = int(NUM_IDLE_PROCESSES)
+
     agents.cli.run_app(
     agents.WorkerOptions(
         request_fnc=request_fnc,
         entrypoint_fnc=entrypoint,
-        prewarm_fnc=prewarm  # <-- THIS LINE IS ADDED
+        prewarm_fnc=prewarm,  # <-- THIS LINE IS ADDED
+        **worker_options
     )
 )
\ No newline at end of file
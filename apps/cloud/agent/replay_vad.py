@@ -0,0 +1,149 @@
+"""
+Offline replay of recorded conversations through the Silero VAD.
+
+For every parameter set, each WAV file is streamed through the VAD and an end of turn
+is declared `delay` seconds after each end-of-speech event, unless speech starts again
+first (the same rule AgentSession applies with turn_detection="vad"). The detections are
+compared with hand-labelled turn ends stored next to each recording:
+
+    call-001.wav
+    call-001.json   ->  {"turn_ends": [3.42, 9.10, 15.77]}
+
+Reported per parameter set:
+  * end-of-turn latency: time from a labelled turn end to the detection (mean / p95),
+  * missed turns: labelled turn ends with no detection within --max-wait seconds,
+  * false-cutoff rate: share of detections that fired while the visitor was mid-turn.
+
+Usage:
+    python replay_vad.py recordings/ --min-silence 0.3 0.55 --delay 0.3 0.5 0.8
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import statistics
+import wave
+
+from livekit import rtc
+from livekit.agents import vad as agents_vad
+from livekit.plugins import silero
+
+FRAME_MS = 10
+
+
+async def speech_events(path: str, vad: silero.VAD) -> list[tuple[str, float]]:
+    """Returns [("start" | "end", audio time in seconds)] for one recording."""
+    stream = vad.stream()
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+        sample_rate = wav.getframerate()
+        num_channels = wav.getnchannels()
+        samples_per_frame = sample_rate * FRAME_MS // 1000
+        while True:
+            data = wav.readframes(samples_per_frame)
+            if not data:
+                break
+            stream.push_frame(rtc.AudioFrame(
+                data=data,
+                sample_rate=sample_rate,
+                num_channels=num_channels,
+                samples_per_channel=len(data) // (2 * num_channels),
+            ))
+    stream.end_input()
+
+    events = []
+    async for event in stream:
+        if event.type == agents_vad.VADEventType.START_OF_SPEECH:
+            events.append(("start", event.timestamp))
+        elif event.type == agents_vad.VADEventType.END_OF_SPEECH:
+            events.append(("end", event.timestamp))
+    await stream.aclose()
+    return events
+
+
+def detect_turn_ends(events: list[tuple[str, float]], delay: float) -> list[float]:
+    detections = []
+    for index, (kind, timestamp) in enumerate(events):
+        if kind != "end":
+            continue
+        next_start = next((t for k, t in events[index + 1:] if k == "start"), None)
+        if next_start is None or next_start > timestamp + delay:
+            detections.append(timestamp + delay)
+    return detections
+
+
+def score(detections: list[float], turn_ends: list[float], max_wait: float) -> dict:
+    latencies = []
+    matched = set()
+    for turn_end in turn_ends:
+        candidate = next((d for d in detections if turn_end <= d <= turn_end + max_wait and d not in matched), None)
+        if candidate is not None:
+            matched.add(candidate)
+            latencies.append(candidate - turn_end)
+    return {
+        "latencies": latencies,
+        "missed": len(turn_ends) - len(latencies),
+        "false_cutoffs": len([d for d in detections if d not in matched]),
+        "detections": len(detections),
+    }
+
+
+async def replay(recordings: list[str], min_silences: list[float], delays: list[float], max_wait: float) -> list[dict]:
+    results = []
+    for min_silence in min_silences:
+        vad = silero.VAD.load(min_silence_duration=min_silence)
+        events_by_file = {path: await speech_events(path, vad) for path in recordings}
+
+        for delay in delays:
+            latencies, missed, false_cutoffs, detections = [], 0, 0, 0
+            for path, events in events_by_file.items():
+                with open(os.path.splitext(path)[0] + ".json", "r") as f:
+                    turn_ends = json.load(f)["turn_ends"]
+                scored = score(detect_turn_ends(events, delay), turn_ends, max_wait)
+                latencies += scored["latencies"]
+                missed += scored["missed"]
+                false_cutoffs += scored["false_cutoffs"]
+                detections += scored["detections"]
+
+            latencies.sort()
+            results.append({
+                "min_silence": min_silence,
+                "delay": delay,
+                "mean_latency_ms": statistics.fmean(latencies) * 1000 if latencies else None,
+                "p95_latency_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+                "missed_turns": missed,
+                "false_cutoff_rate": false_cutoffs / detections if detections else 0.0,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay WAV conversations through the VAD and score endpointing.")
+    parser.add_argument("directory", help="Directory of .wav recordings with .json turn-end labels.")
+    parser.add_argument("--min-silence", type=float, nargs="+", default=[0.55], help="Silero min_silence_duration values (s).")
+    parser.add_argument("--delay", type=float, nargs="+", default=[0.5], help="End-of-turn delays after end of speech (s).")
+    parser.add_argument("--max-wait", type=float, default=3.0, help="Max seconds after a labelled turn end to count a detection.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    recordings = sorted(glob.glob(os.path.join(args.directory, "*.wav")))
+    if not recordings:
+        raise SystemExit(f"No .wav files found in {args.directory}")
+
+    results = asyncio.run(replay(recordings, args.min_silence, args.delay, args.max_wait))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'min_silence':>12}{'delay':>8}{'mean ms':>10}{'p95 ms':>10}{'missed':>8}{'false cutoffs':>15}")
+    for row in results:
+        mean = f"{row['mean_latency_ms']:.0f}" if row["mean_latency_ms"] is not None else "-"
+        p95 = f"{row['p95_latency_ms']:.0f}" if row["p95_latency_ms"] is not None else "-"
+        print(f"{row['min_silence']:>12.2f}{row['delay']:>8.2f}{mean:>10}{p95:>10}{row['missed_turns']:>8}{row['false_cutoff_rate']:>15.1%}")
+
+
+if __name__ == "__main__":
+    main()
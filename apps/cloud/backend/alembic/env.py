@@ -28,9 +28,16 @@ sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), '..'
 
 from app.models import metadata as target_metadata
 from app.models import DATABASE_URL
+from app.online_migrations import DEFAULT_LOCK_TIMEOUT, DEFAULT_STATEMENT_TIMEOUT, set_session_timeouts
 
 # Set the sqlalchemy.url in the config object
 config.set_main_option('sqlalchemy.url', DATABASE_URL)
+
+# Migrations run against a live database, so every statement gets a lock and
+# statement timeout. Override with e.g. `alembic -x lock_timeout=2s upgrade head`.
+x_args = context.get_x_argument(as_dictionary=True)
+LOCK_TIMEOUT = x_args.get("lock_timeout", DEFAULT_LOCK_TIMEOUT)
+STATEMENT_TIMEOUT = x_args.get("statement_timeout", DEFAULT_STATEMENT_TIMEOUT)
 # --- END OF OUR CHANGES ---
 
 
@@ -52,9 +59,11 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        transaction_per_migration=True,
     )
 
     with context.begin_transaction():
+        set_session_timeouts(context, LOCK_TIMEOUT, STATEMENT_TIMEOUT)
         context.run_migrations()
 
 
@@ -72,8 +81,16 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        # Session-level settings survive the per-migration commits below.
+        set_session_timeouts(connection, LOCK_TIMEOUT, STATEMENT_TIMEOUT)
+        connection.commit()
+
+        # One transaction per revision, so `autocommit_block()` in the
+        # online_migrations helpers only commits the revision being applied.
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            transaction_per_migration=True,
         )
 
         with context.begin_transaction():
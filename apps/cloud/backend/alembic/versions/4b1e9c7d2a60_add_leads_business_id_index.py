@@ -0,0 +1,31 @@
+"""Add index on leads.business_id
+
+Revision ID: 4b1e9c7d2a60
+Revises: d7aa47ee743c
+Create Date: 2026-10-19 09:12:40.118532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.online_migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b1e9c7d2a60'
+down_revision: Union[str, Sequence[str], None] = 'd7aa47ee743c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so the agents can keep inserting leads during the deploy.
+    create_index_concurrently('ix_leads_business_id', 'leads', ['business_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently('ix_leads_business_id', 'leads')
@@ -0,0 +1,36 @@
+"""Add per-channel delivery timestamps to lead_events
+
+Revision ID: 6f3a9d2c8b14
+Revises: b84d2f6c1a97
+Create Date: 2026-10-19 18:41:09.226103
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.online_migrations import lock_guard
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f3a9d2c8b14'
+down_revision: Union[str, Sequence[str], None] = 'b84d2f6c1a97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable columns without a default only touch the catalog, but the exclusive lock
+    # still queues behind the dispatchers' transactions; keep that wait short.
+    with lock_guard(lock_timeout="2s"):
+        op.add_column('lead_events', sa.Column('webhook_delivered_at', sa.DateTime(), nullable=True))
+        op.add_column('lead_events', sa.Column('email_delivered_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with lock_guard(lock_timeout="2s"):
+        op.drop_column('lead_events', 'email_delivered_at')
+        op.drop_column('lead_events', 'webhook_delivered_at')
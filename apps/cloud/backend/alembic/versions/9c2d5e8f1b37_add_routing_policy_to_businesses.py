@@ -0,0 +1,34 @@
+"""Add routing_policy to businesses
+
+Revision ID: 9c2d5e8f1b37
+Revises: 4b1e9c7d2a60
+Create Date: 2026-10-19 11:40:02.553190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.online_migrations import lock_guard
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c2d5e8f1b37'
+down_revision: Union[str, Sequence[str], None] = '4b1e9c7d2a60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A nullable column without a default is a catalog-only change, so the
+    # short lock timeout is all that is needed to keep it from queueing traffic.
+    with lock_guard(lock_timeout="2s"):
+        op.add_column('businesses', sa.Column('routing_policy', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with lock_guard(lock_timeout="2s"):
+        op.drop_column('businesses', 'routing_policy')
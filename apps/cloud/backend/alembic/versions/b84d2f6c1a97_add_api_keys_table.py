@@ -0,0 +1,45 @@
+"""Add api_keys table for hashed internal API keys
+
+Revision ID: b84d2f6c1a97
+Revises: e3f7a1c9b254
+Create Date: 2026-10-19 16:02:17.530941
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.online_migrations import lock_guard
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b84d2f6c1a97'
+down_revision: Union[str, Sequence[str], None] = 'e3f7a1c9b254'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The foreign key briefly locks businesses; keep that wait short.
+    with lock_guard(lock_timeout="2s"):
+        op.create_table('api_keys',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('prefix', sa.String(length=32), nullable=False),
+        sa.Column('key_hash', sa.String(length=255), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('business_id', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.Column('revoked_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('prefix')
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with lock_guard(lock_timeout="2s"):
+        op.drop_table('api_keys')
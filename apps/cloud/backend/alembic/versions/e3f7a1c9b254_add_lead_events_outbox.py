@@ -0,0 +1,54 @@
+"""Add lead_events outbox and businesses.webhook_url
+
+Revision ID: e3f7a1c9b254
+Revises: 9c2d5e8f1b37
+Create Date: 2026-10-19 14:05:31.804417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.online_migrations import lock_guard
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3f7a1c9b254'
+down_revision: Union[str, Sequence[str], None] = '9c2d5e8f1b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The foreign keys briefly lock leads and businesses; keep that wait short.
+    with lock_guard(lock_timeout="2s"):
+        op.add_column('businesses', sa.Column('webhook_url', sa.String(length=2048), nullable=True))
+        op.create_table('lead_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('lead_id', sa.Integer(), nullable=False),
+        sa.Column('business_id', sa.String(length=255), nullable=False),
+        sa.Column('event_type', sa.String(length=50), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('delivered_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['lead_id'], ['leads.id'], ),
+        sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    # The table is new and empty, so a plain index build does not block anyone.
+    op.create_index('ix_lead_events_pending', 'lead_events', ['next_attempt_at'],
+                    postgresql_where=sa.text("status = 'pending'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with lock_guard(lock_timeout="2s"):
+        op.drop_index('ix_lead_events_pending', table_name='lead_events')
+        op.drop_table('lead_events')
+        op.drop_column('businesses', 'webhook_url')
@@ -1,8 +1,12 @@
+import asyncio
+import dataclasses
 import logging
 
 import os
 import uuid
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from livekit import api
 from dotenv import load_dotenv
@@ -12,7 +16,8 @@ from sqlalchemy import select, insert
 
 from . import security
 from . import db
-from .models import businesses, leads, BusinessCreate, LeadCreate, Business, Lead
+from .bulk_import import bulk_upsert, parse_records
+from .models import businesses, leads, lead_events, BusinessCreate, LeadCreate, Business, Lead
 
 # Load environment variables
 load_dotenv()
@@ -22,6 +27,15 @@ LIVEKIT_API_SECRET = os.getenv("LIVEKIT_API_SECRET")
 
 router = APIRouter()
 
+# Every visitor token carries the same grants except the room, so the grants are built
+# once and only the room is filled in per request.
+VISITOR_GRANTS = api.VideoGrants(
+    room_join=True,
+    can_publish=True,
+    can_subscribe=True,
+    can_publish_data=True,
+)
+
 # --- Public Token Endpoint ---
 
 class TokenRequest(BaseModel):
@@ -40,23 +54,20 @@ async def get_token(request: TokenRequest):
     token = api.AccessToken(LIVEKIT_API_KEY, LIVEKIT_API_SECRET) \
         .with_identity(participant_identity) \
         .with_name("Website Visitor") \
-        .with_grants(api.VideoGrants(
-            room_join=True,
-            room=room_name,
-            can_publish=True,
-            can_subscribe=True,
-            can_publish_data=True,
-        )).to_jwt()
+        .with_grants(dataclasses.replace(VISITOR_GRANTS, room=room_name)).to_jwt()
 
     return {"token": token}
 
 # --- Internal Secure Endpoints ---
+# These are called by the agents on every session and lead, so their
+# responses are serialized with orjson.
 
 @router.post(
     "/api/internal/businesses",
     status_code=status.HTTP_201_CREATED,
     response_model=Business,
-    dependencies=[Depends(security.get_api_key)]
+    response_class=ORJSONResponse,
+    dependencies=[Depends(security.get_platform_api_key)]
 )
 async def create_business(
     business: BusinessCreate,
@@ -83,16 +94,46 @@ async def create_business(
 
     return dict(db_business._mapping)
 
+@router.post(
+    "/api/internal/businesses/bulk",
+    response_class=ORJSONResponse,
+    dependencies=[Depends(security.get_platform_api_key)]
+)
+async def bulk_import_businesses(request: Request, format: str | None = None):
+    """
+    Creates or updates many businesses at once from a CSV (with a header row) or NDJSON
+    body of BusinessCreate records. The format comes from `?format=csv|ndjson` or the
+    Content-Type. Valid rows are imported; invalid rows are reported with their errors.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="Format must be 'csv' or 'ndjson'.")
+
+    # Validating thousands of rows is CPU work; keep it off the event loop.
+    records, errors = await asyncio.to_thread(parse_records, await request.body(), fmt)
+    try:
+        async with db.engine.connect() as connection:
+            raw_connection = await connection.get_raw_connection()
+            result = await bulk_upsert(raw_connection.driver_connection, records)
+    except Exception as e:
+        logging.error("DATABASE ERROR during bulk business import: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal Server Error importing businesses.")
+
+    logging.info("Bulk business import: %s, %d invalid rows.", result, len(errors), extra={"event": "api.bulk_import"})
+    return {"valid": len(records), "invalid": len(errors), **result, "errors": errors}
+
 @router.get(
     "/api/internal/businesses/{business_id}",
     response_model=Business,
-    dependencies=[Depends(security.get_api_key)]
+    response_class=ORJSONResponse,
 )
 async def get_business_profile(
     business_id: str,
-    database: AsyncSession = Depends(db.get_db)
+    database: AsyncSession = Depends(db.get_db),
+    api_key: security.ApiKey = Depends(security.get_api_key)
 ):
     """Fetches business-specific data from the database."""
+    security.check_business_access(api_key, business_id)
     query = select(businesses).where(businesses.c.id == business_id)
     result = await database.execute(query)
     db_business = result.first()
@@ -106,35 +147,39 @@ async def get_business_profile(
     "/api/internal/leads",
     status_code=status.HTTP_201_CREATED,
     response_model=Lead,
-    dependencies=[Depends(security.get_api_key)]
+    response_class=ORJSONResponse,
 )
 async def create_lead(
     lead: LeadCreate,
-    database: AsyncSession = Depends(db.get_db)
+    database: AsyncSession = Depends(db.get_db),
+    api_key: security.ApiKey = Depends(security.get_api_key)
 ):
     """Creates a new lead in the database."""
-    logging.info(f"Received request to create lead: {lead.model_dump()}")
+    security.check_business_access(api_key, lead.business_id)
+    logging.info("Received request to create lead for business %s.", lead.business_id, extra={"event": "api.create_lead"})
     
     # Use .model_dump() for Pydantic v2
-    query = insert(leads).values(**lead.model_dump())
-    
+    query = insert(leads).values(**lead.model_dump()).returning(leads)
+
     try:
         result = await database.execute(query)
+        db_lead = result.first()
+        # The notification is queued in the same transaction as the lead, so a lead
+        # is never stored without its event. Delivery happens in app.outbox, which
+        # keeps email/webhook latency off this request.
+        await database.execute(insert(lead_events).values(
+            lead_id=db_lead.id,
+            business_id=db_lead.business_id,
+            event_type="lead.created",
+            payload=jsonable_encoder(dict(db_lead._mapping)),
+        ))
         await database.commit()
-        logging.info(f"Successfully inserted lead with ID: {result.inserted_primary_key[0]}")
+        logging.info("Successfully inserted lead with ID: %s", db_lead.id, extra={"event": "api.lead_created"})
     except Exception as e:
         # THIS IS THE CRITICAL LOGGING WE NEED
-        logging.error(f"DATABASE ERROR during lead creation: {e}", exc_info=True)
+        logging.error("DATABASE ERROR during lead creation: %s", e, exc_info=True)
         await database.rollback()
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
-    # Fetch the newly created lead to return the full object
-    select_query = select(leads).where(leads.c.id == result.inserted_primary_key[0])
-    new_lead_record = await database.execute(select_query)
-    db_lead = new_lead_record.first()
-
-    if not db_lead:
-         raise HTTPException(status_code=500, detail="Could not retrieve newly created lead.")
-
     # Manually convert the SQLAlchemy Row object to a dictionary before returning
-    return dict(db_lead._mapping)
\ No newline at end of file
+    return dict(db_lead._mapping)
@@ -0,0 +1,252 @@
+"""
+Hashed API keys for the internal endpoints.
+
+A key looks like "clb_<prefix>_<secret>". The prefix is stored in clear and finds the
+row; only a salted scrypt hash of the secret is stored. Keys with a business_id belong
+to that tenant; keys without one are platform keys.
+
+Verifying a key from scratch costs a database query and a deliberately slow hash, so
+ApiKeyVerifier does it once per key per process and caches the result. A cached key is
+re-checked for revocation and expiry (a primary-key lookup, no hashing) at most every
+`recheck_after` seconds. That bounds how long a revoked key keeps working in any worker.
+
+Rejections are cheap to repeat as well: a rejected key is remembered for a few seconds,
+and once a client has tried `max_failures` wrong secrets for a prefix within
+`failure_window` seconds, its further secrets for that prefix are rejected without
+hashing until the window ends. Hammering an endpoint with guesses therefore cannot keep
+the worker's threads busy with scrypt, and since the budget belongs to the guessing
+client, it cannot lock the key's real owner out either.
+"""
+import asyncio
+import datetime
+import hashlib
+import hmac
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import select
+
+from .models import api_keys
+
+KEY_TYPE = "clb"
+
+# scrypt cost parameters; stored with each hash, so they can be raised for new keys.
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+@dataclass(frozen=True)
+class ApiKey:
+    id: int | None
+    name: str
+    business_id: str | None = None
+    expires_at: datetime.datetime | None = None
+
+    @property
+    def is_platform_key(self) -> bool:
+        return self.business_id is None
+
+
+def generate_key() -> tuple[str, str, str]:
+    """Returns (full key to hand out once, prefix to store, hash to store)."""
+    prefix = secrets.token_hex(6)
+    secret = secrets.token_urlsafe(32)
+    return f"{KEY_TYPE}_{prefix}_{secret}", prefix, hash_secret(secret)
+
+
+def parse_key(key: str) -> tuple[str, str] | None:
+    """Splits a presented key into (prefix, secret), or returns None if it is not one of ours."""
+    key_type, _, rest = key.partition("_")
+    prefix, _, secret = rest.partition("_")
+    if key_type != KEY_TYPE or not prefix or not secret:
+        return None
+    return prefix, secret
+
+
+def hash_secret(secret: str) -> str:
+    salt = secrets.token_bytes(16)
+    digest = hashlib.scrypt(secret.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, dklen=32)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${digest.hex()}"
+
+
+def verify_secret(secret: str, stored_hash: str) -> bool:
+    try:
+        algorithm, n, r, p, salt, expected = stored_hash.split("$")
+    except ValueError:
+        return False
+    if algorithm != "scrypt":
+        return False
+    digest = hashlib.scrypt(
+        secret.encode(), salt=bytes.fromhex(salt), n=int(n), r=int(r), p=int(p), dklen=len(expected) // 2
+    )
+    return hmac.compare_digest(digest, bytes.fromhex(expected))
+
+
+def is_active(revoked_at: datetime.datetime | None, expires_at: datetime.datetime | None) -> bool:
+    return revoked_at is None and (expires_at is None or expires_at > datetime.datetime.utcnow())
+
+
+class ApiKeyVerifier:
+    def __init__(
+        self,
+        sessionmaker,
+        recheck_after: float = 5.0,
+        max_cached: int = 1024,
+        reject_for: float = 10.0,
+        max_failures: int = 10,
+        failure_window: float = 60.0,
+    ):
+        """
+        Verifies presented keys against the api_keys table, with an in-process LRU of
+        verified keys and a shorter-lived one of rejected keys.
+
+        Cache entries are keyed by the SHA-256 of the presented key, so the plaintext is
+        never kept. A hit younger than `recheck_after` seconds costs one dict lookup.
+        Older hits re-read the row's revoked_at and expires_at. A rejected key is
+        rejected from the cache for `reject_for` seconds. Concurrent requests with the
+        same key share one verification or re-check.
+
+        Each (prefix, client) pair gets `max_failures` scrypt checks that fail (or are
+        still running) per `failure_window` seconds, where the client is whatever the
+        caller passes to verify(), normally the request's IP address. Past that, that
+        client's keys with the prefix are rejected unhashed; other clients, including
+        the one holding the real key, keep their own budget.
+        """
+        self._sessionmaker = sessionmaker
+        self.recheck_after = recheck_after
+        self.max_cached = max_cached
+        self.reject_for = reject_for
+        self.max_failures = max_failures
+        self.failure_window = failure_window
+        # SHA-256 of the presented key -> (ApiKey, monotonic time it was last checked)
+        self._cache: OrderedDict[bytes, tuple[ApiKey, float]] = OrderedDict()
+        # SHA-256 of a rejected key -> monotonic time until which it stays rejected
+        self._rejected: OrderedDict[bytes, float] = OrderedDict()
+        # (prefix, client) -> (failed or running scrypt checks, monotonic start of the window)
+        self._failures: OrderedDict[tuple[str, str | None], tuple[int, float]] = OrderedDict()
+        self._pending: dict[bytes, asyncio.Future] = {}
+
+        self.hits = 0
+        self.rechecks = 0
+        self.misses = 0
+        self.rejected = 0
+        self.locked_out = 0
+
+    async def verify(self, presented: str, client: str | None = None) -> ApiKey | None:
+        """
+        Returns the ApiKey for `presented`, or None if it is unknown, wrong, revoked or
+        expired. `client` identifies the caller (e.g. its IP address) for the failure
+        budget; calls without one share a single budget per prefix.
+        """
+        digest = hashlib.sha256(presented.encode()).digest()
+        entry = self._cache.get(digest)
+        if entry is not None:
+            key, checked_at = entry
+            if key.expires_at is not None and key.expires_at <= datetime.datetime.utcnow():
+                self._cache.pop(digest, None)
+                return None
+            self._cache.move_to_end(digest)
+            if time.monotonic() - checked_at < self.recheck_after:
+                self.hits += 1
+                return key
+        elif self._is_rejected(digest):
+            self.rejected += 1
+            return None
+
+        pending = self._pending.get(digest)
+        if pending is None:
+            if entry is not None:
+                self.rechecks += 1
+                work = self._recheck(digest, entry[0])
+            else:
+                self.misses += 1
+                work = self._verify_uncached(digest, presented, client)
+            pending = self._pending[digest] = asyncio.ensure_future(work)
+            pending.add_done_callback(lambda _: self._pending.pop(digest, None))
+        return await asyncio.shield(pending)
+
+    async def _recheck(self, digest: bytes, key: ApiKey) -> ApiKey | None:
+        if not await self._still_active(key.id):
+            self._cache.pop(digest, None)
+            self._reject(digest)
+            return None
+        self._cache[digest] = (key, time.monotonic())
+        return key
+
+    async def _verify_uncached(self, digest: bytes, presented: str, client: str | None) -> ApiKey | None:
+        parsed = parse_key(presented)
+        if parsed is None:
+            self._reject(digest)
+            return None
+        prefix, secret = parsed
+
+        async with self._sessionmaker() as session:
+            row = (await session.execute(select(api_keys).where(api_keys.c.prefix == prefix))).first()
+        if row is None or not is_active(row.revoked_at, row.expires_at):
+            self._reject(digest)
+            return None
+        if not self._start_attempt((prefix, client)):
+            # Not remembered as rejected: the secret was never checked, and the same key
+            # may come from another client with budget left.
+            self.locked_out += 1
+            return None
+        # The slow hash runs in a thread so it does not stall other requests.
+        if not await asyncio.to_thread(verify_secret, secret, row.key_hash):
+            self._reject(digest)
+            return None
+        self._failures.pop((prefix, client), None)
+
+        key = ApiKey(id=row.id, name=row.name, business_id=row.business_id, expires_at=row.expires_at)
+        self._cache[digest] = (key, time.monotonic())
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+        return key
+
+    def _is_rejected(self, digest: bytes) -> bool:
+        until = self._rejected.get(digest)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._rejected[digest]
+            return False
+        return True
+
+    def _reject(self, digest: bytes) -> None:
+        self._rejected[digest] = time.monotonic() + self.reject_for
+        self._rejected.move_to_end(digest)
+        while len(self._rejected) > self.max_cached:
+            self._rejected.popitem(last=False)
+
+    def _start_attempt(self, budget: tuple[str, str | None]) -> bool:
+        """
+        Counts a scrypt check against a (prefix, client) budget, or returns False if it
+        is spent for the window. Checks are counted before they run, so a burst of concurrent
+        guesses cannot start more than the budget; a success clears the count.
+        """
+        now = time.monotonic()
+        count, started_at = self._failures.get(budget, (0, now))
+        if now - started_at >= self.failure_window:
+            count, started_at = 0, now
+        if count >= self.max_failures:
+            return False
+        self._failures[budget] = (count + 1, started_at)
+        self._failures.move_to_end(budget)
+        while len(self._failures) > self.max_cached:
+            self._failures.popitem(last=False)
+        return True
+
+    async def _still_active(self, key_id: int) -> bool:
+        async with self._sessionmaker() as session:
+            row = (await session.execute(
+                select(api_keys.c.revoked_at, api_keys.c.expires_at).where(api_keys.c.id == key_id)
+            )).first()
+        return row is not None and is_active(row.revoked_at, row.expires_at)
+
+    def summary(self) -> dict:
+        return {
+            "cached": len(self._cache), "hits": self.hits, "rechecks": self.rechecks, "misses": self.misses,
+            "rejected": self.rejected, "locked_out": self.locked_out,
+        }
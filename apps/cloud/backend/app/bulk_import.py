@@ -0,0 +1,112 @@
+"""
+Bulk onboarding of businesses.
+
+Records are validated one by one against `BusinessCreate`, then the valid ones are
+streamed into a temporary staging table with asyncpg's binary COPY and merged into
+`businesses` with a single `INSERT ... ON CONFLICT DO UPDATE`. Thousands of businesses
+take one round trip for the data and one statement for the upsert, instead of an
+INSERT plus a SELECT per business.
+"""
+import csv
+import datetime
+import io
+import json
+
+import asyncpg
+from pydantic import ValidationError
+
+from .models import BusinessCreate
+
+# Columns loaded from the import file, in COPY order. created_at is added on top.
+IMPORT_COLUMNS = list(BusinessCreate.model_fields)
+# A re-import updates everything except the primary key; created_at keeps its original value.
+UPDATE_COLUMNS = [column for column in IMPORT_COLUMNS if column != "id"]
+
+
+def _csv_rows(text: str):
+    for row in csv.DictReader(io.StringIO(text)):
+        # Empty cells mean "not provided", and routing_policy is a JSON object in a cell.
+        record = {key: (value if value != "" else None) for key, value in row.items() if key is not None}
+        if record.get("routing_policy"):
+            try:
+                record["routing_policy"] = json.loads(record["routing_policy"])
+            except json.JSONDecodeError:
+                pass  # Left as a string, so validation reports it against the right field.
+        yield record
+
+
+def _ndjson_rows(text: str):
+    for line in text.splitlines():
+        if not line.strip():
+            yield None  # Keeps row numbers aligned with line numbers.
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield e
+
+
+def parse_records(content: bytes, fmt: str) -> tuple[list[BusinessCreate], list[dict]]:
+    """
+    Parses and validates a CSV (with a header row) or NDJSON import.
+
+    Returns the valid records and one error entry per invalid row, with 1-based row
+    numbers (data rows for CSV, lines for NDJSON). If the same id appears more than
+    once, the last occurrence wins, as the upsert can only touch each row once.
+    """
+    text = content.decode("utf-8-sig")
+    rows = _csv_rows(text) if fmt == "csv" else _ndjson_rows(text)
+
+    valid: dict[str, BusinessCreate] = {}
+    errors = []
+    for number, row in enumerate(rows, start=1):
+        if row is None:
+            continue
+        if isinstance(row, Exception):
+            errors.append({"row": number, "errors": [{"loc": [], "msg": f"Invalid JSON: {row}"}]})
+            continue
+        try:
+            record = BusinessCreate.model_validate(row)
+        except ValidationError as e:
+            errors.append({
+                "row": number,
+                "id": row.get("id") if isinstance(row, dict) else None,
+                "errors": [{"loc": list(error["loc"]), "msg": error["msg"]} for error in e.errors()],
+            })
+            continue
+        valid.pop(record.id, None)
+        valid[record.id] = record
+    return list(valid.values()), errors
+
+
+def _copy_record(business: BusinessCreate, now: datetime.datetime) -> tuple:
+    values = business.model_dump()
+    if values["routing_policy"] is not None:
+        # asyncpg's json codec takes the serialized text.
+        values["routing_policy"] = json.dumps(values["routing_policy"])
+    return tuple(values[column] for column in IMPORT_COLUMNS) + (now,)
+
+
+async def bulk_upsert(connection: asyncpg.Connection, records: list[BusinessCreate]) -> dict:
+    """COPYs the records into a staging table and upserts them into businesses in one statement."""
+    if not records:
+        return {"inserted": 0, "updated": 0}
+
+    now = datetime.datetime.utcnow()
+    columns = IMPORT_COLUMNS + ["created_at"]
+    async with connection.transaction():
+        await connection.execute(
+            "CREATE TEMP TABLE businesses_staging (LIKE businesses INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+        await connection.copy_records_to_table(
+            "businesses_staging", records=[_copy_record(record, now) for record in records], columns=columns,
+        )
+        column_list = ", ".join(columns)
+        updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in UPDATE_COLUMNS)
+        # xmax is 0 for freshly inserted rows and set for rows that were updated.
+        rows = await connection.fetch(
+            f"INSERT INTO businesses ({column_list}) SELECT {column_list} FROM businesses_staging "
+            f"ON CONFLICT (id) DO UPDATE SET {updates} RETURNING (xmax = 0) AS inserted"
+        )
+    inserted = sum(1 for row in rows if row["inserted"])
+    return {"inserted": inserted, "updated": len(rows) - inserted}
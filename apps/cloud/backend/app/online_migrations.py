@@ -0,0 +1,216 @@
+"""
+Helpers for writing migrations that are safe to run against a live database.
+
+Plain `op` calls take ACCESS EXCLUSIVE locks and build indexes in a single
+blocking pass, which stalls lead inserts from the agents while a deploy runs.
+The helpers in this module are meant to be imported from Alembic revision files:
+
+    from app.online_migrations import create_index_concurrently, lock_guard
+
+They rely on `alembic/env.py` running each revision in its own transaction
+(`transaction_per_migration=True`) so that autocommit blocks only commit the
+revision that is currently being applied.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# Defaults used by env.py and by the helpers below. They can be overridden
+# per run with `alembic -x lock_timeout=2s -x statement_timeout=5min upgrade head`.
+DEFAULT_LOCK_TIMEOUT = "5s"
+DEFAULT_STATEMENT_TIMEOUT = "60s"
+
+logger = logging.getLogger("alembic.online")
+
+# The session-wide timeouts env.py applied. A generated SQL script cannot SHOW the
+# current values, so an offline lock_guard restores these (or RESETs) on exit.
+_session_timeouts: tuple[str | None, str | None] = (None, None)
+
+
+def _is_offline() -> bool:
+    return op.get_context().as_sql
+
+
+def set_timeouts(connection, lock_timeout: str | None, statement_timeout: str | None) -> None:
+    """
+    Applies session-level `lock_timeout` / `statement_timeout` on a connection.
+    Used by env.py so every migration fails fast instead of queueing behind
+    (and blocking) application traffic.
+    """
+    if lock_timeout:
+        connection.execute(sa.text(f"SET lock_timeout = '{lock_timeout}'"))
+    if statement_timeout:
+        connection.execute(sa.text(f"SET statement_timeout = '{statement_timeout}'"))
+
+
+def set_session_timeouts(connection, lock_timeout: str | None, statement_timeout: str | None) -> None:
+    """`set_timeouts` for the whole migration run; env.py calls this once per run."""
+    global _session_timeouts
+    _session_timeouts = (lock_timeout, statement_timeout)
+    set_timeouts(connection, lock_timeout, statement_timeout)
+
+
+def _restore_session_timeouts() -> None:
+    for setting, value in zip(("lock_timeout", "statement_timeout"), _session_timeouts):
+        op.execute(sa.text(f"SET {setting} = '{value}'" if value else f"RESET {setting}"))
+
+
+@contextmanager
+def lock_guard(lock_timeout: str = DEFAULT_LOCK_TIMEOUT, statement_timeout: str | None = None):
+    """
+    Temporarily tightens (or relaxes) the timeouts for the statements in the block.
+
+    A DDL statement waiting for a lock blocks every query queued behind it, so a
+    short `lock_timeout` turns a potential outage into a failed (and retryable)
+    migration. The previous values are restored when the block exits.
+    """
+    if _is_offline():
+        set_timeouts(op, lock_timeout, statement_timeout)
+        try:
+            yield
+        finally:
+            _restore_session_timeouts()
+        return
+
+    bind = op.get_bind()
+    previous_lock = bind.execute(sa.text("SHOW lock_timeout")).scalar()
+    previous_statement = bind.execute(sa.text("SHOW statement_timeout")).scalar()
+    set_timeouts(bind, lock_timeout, statement_timeout)
+    try:
+        yield
+    finally:
+        set_timeouts(bind, previous_lock, previous_statement)
+
+
+def create_index_concurrently(
+    index_name: str,
+    table_name: str,
+    columns: Sequence[str],
+    unique: bool = False,
+    statement_timeout: str = "0",
+) -> None:
+    """
+    Builds an index with `CREATE INDEX CONCURRENTLY` so writes keep flowing.
+
+    Postgres refuses to run CONCURRENTLY inside a transaction, so the statement is
+    issued from an autocommit block. A concurrent build can legitimately take longer
+    than the migration-wide statement timeout, so that is lifted by default.
+
+    A failed concurrent build leaves an INVALID index behind that is not used for
+    queries (but still maintained on writes). Re-running the migration drops such an
+    index and builds it again; a valid index of the same name is kept as is.
+    """
+    if _is_offline():
+        # The script cannot check for an INVALID index; IF NOT EXISTS keeps a re-run safe.
+        with op.get_context().autocommit_block(), lock_guard(statement_timeout=statement_timeout):
+            op.create_index(
+                index_name, table_name, list(columns), unique=unique, postgresql_concurrently=True, if_not_exists=True
+            )
+        return
+
+    with op.get_context().autocommit_block():
+        valid = _index_is_valid(index_name)
+        if valid:
+            logger.info("Index '%s' already exists and is valid, skipping", index_name)
+            return
+        if valid is False:
+            logger.warning("Index '%s' is INVALID (an earlier build failed), rebuilding it", index_name)
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True)
+
+        with lock_guard(statement_timeout=statement_timeout):
+            op.create_index(
+                index_name,
+                table_name,
+                list(columns),
+                unique=unique,
+                postgresql_concurrently=True,
+            )
+        if not _index_is_valid(index_name):
+            raise RuntimeError(f"Concurrent build of index '{index_name}' finished but the index is not valid")
+
+
+def _index_is_valid(index_name: str) -> bool | None:
+    """True/False for an existing valid/invalid index, None if there is no such index."""
+    return op.get_bind().execute(
+        sa.text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+        {"name": index_name},
+    ).scalar()
+
+
+def drop_index_concurrently(index_name: str, table_name: str) -> None:
+    """Drops an index with `DROP INDEX CONCURRENTLY` from an autocommit block."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            index_name,
+            table_name=table_name,
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def batched_backfill(
+    table_name: str,
+    set_clause: str,
+    where_clause: str,
+    batch_size: int = 1000,
+    sleep_seconds: float = 0.1,
+    key_column: str = "id",
+) -> int:
+    """
+    Runs `UPDATE <table> SET <set_clause> WHERE <where_clause>` in small batches.
+
+    Each batch commits on its own, so row locks are held for milliseconds instead of
+    for the whole migration, and rows already locked by the application are skipped
+    and picked up by a later batch. `where_clause` must stop matching a row once it
+    has been updated, otherwise the loop never finishes. A batch that updates nothing
+    does not end the backfill on its own: it only ends once no row matches
+    `where_clause` any more, so rows that were locked get retried.
+
+    Returns the number of rows updated.
+    """
+    update = sa.text(
+        f"UPDATE {table_name} SET {set_clause} "
+        f"WHERE {key_column} IN ("
+        f"SELECT {key_column} FROM {table_name} WHERE {where_clause} "
+        f"LIMIT :batch_size FOR UPDATE SKIP LOCKED)"
+    )
+
+    if _is_offline():
+        # There is no way to loop on a row count in a generated SQL script.
+        op.execute(sa.text(f"UPDATE {table_name} SET {set_clause} WHERE {where_clause}"))
+        return 0
+
+    total_updated = 0
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        remaining = bind.execute(
+            sa.text(f"SELECT count(*) FROM {table_name} WHERE {where_clause}")
+        ).scalar()
+        any_left = sa.text(f"SELECT 1 FROM {table_name} WHERE {where_clause} LIMIT 1")
+        logger.info("Backfilling %s rows in '%s' in batches of %s", remaining, table_name, batch_size)
+
+        started = time.monotonic()
+        while True:
+            updated = bind.execute(update, {"batch_size": batch_size}).rowcount
+            if not updated:
+                # Either we are done, or every remaining row is locked by the application
+                # right now (SKIP LOCKED). Only the former ends the backfill.
+                if bind.execute(any_left).first() is None:
+                    break
+                logger.info("Backfill '%s': remaining rows are locked, retrying", table_name)
+                time.sleep(max(sleep_seconds, 0.1))
+                continue
+            total_updated += updated
+            elapsed = max(time.monotonic() - started, 1e-6)
+            logger.info(
+                "Backfill '%s': %s/%s rows (%.0f rows/s)",
+                table_name, total_updated, remaining, total_updated / elapsed,
+            )
+            if sleep_seconds:
+                time.sleep(sleep_seconds)
+
+    return total_updated
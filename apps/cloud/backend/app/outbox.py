@@ -0,0 +1,277 @@
+"""
+Dispatcher for the `lead_events` outbox.
+
+`create_lead` only inserts a row into `lead_events` in the same transaction as the
+lead. This worker, run as a separate process, delivers those events to the business
+(webhook and/or email) so slow or failing destinations never add latency to lead
+submissions:
+
+    python -m app.outbox --concurrency 20
+
+Events are claimed with `FOR UPDATE SKIP LOCKED`, so any number of dispatchers can run
+side by side. Claiming pushes `next_attempt_at` forward by a lease: if a dispatcher dies
+mid-delivery, the event becomes claimable again once the lease expires. Delivery is
+therefore at-least-once; webhooks carry an `X-Event-Id` header so receivers can dedupe.
+
+Each channel's success is recorded on the event (`webhook_delivered_at`,
+`email_delivered_at`), so a retry only repeats the channels that failed. Events for a
+business with no channel configured are marked `skipped`.
+"""
+import argparse
+import asyncio
+import datetime
+import logging
+import os
+import random
+import signal
+import smtplib
+from email.message import EmailMessage
+
+import aiohttp
+from dotenv import load_dotenv
+from sqlalchemy import select, update
+from structured_logging import setup_logging
+
+from .db import engine
+from .models import businesses, lead_events
+
+load_dotenv()
+
+SMTP_HOST = os.getenv("SMTP_HOST")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "25"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "false").lower() == "true"
+NOTIFY_FROM_EMAIL = os.getenv("NOTIFY_FROM_EMAIL", "leads@localhost")
+
+logger = logging.getLogger("outbox")
+
+
+def _format_email(event: dict, to_address: str) -> EmailMessage:
+    lead = event["payload"]
+    message = EmailMessage()
+    message["Subject"] = f"New lead: {lead.get('visitor_name') or lead.get('visitor_email')}"
+    message["From"] = NOTIFY_FROM_EMAIL
+    message["To"] = to_address
+    message.set_content(
+        f"Name: {lead.get('visitor_name') or '-'}\n"
+        f"Email: {lead.get('visitor_email') or '-'}\n"
+        f"Phone: {lead.get('visitor_phone') or '-'}\n\n"
+        f"{lead.get('inquiry') or ''}\n"
+    )
+    return message
+
+
+def _send_email(message: EmailMessage) -> None:
+    with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=10) as smtp:
+        if SMTP_STARTTLS:
+            smtp.starttls()
+        if SMTP_USERNAME:
+            smtp.login(SMTP_USERNAME, SMTP_PASSWORD)
+        smtp.send_message(message)
+
+
+class Dispatcher:
+    def __init__(
+        self,
+        concurrency: int = 10,
+        batch_size: int = 50,
+        poll_interval: float = 1.0,
+        lease_seconds: int = 60,
+        max_attempts: int = 8,
+        backoff_base: float = 2.0,
+        backoff_max: float = 3600.0,
+        webhook_timeout: float = 10.0,
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        # Must outlast one delivery (webhook timeout plus the SMTP exchange).
+        self.lease = datetime.timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.webhook_timeout = aiohttp.ClientTimeout(total=webhook_timeout)
+
+        self.concurrency = concurrency
+        self._stopping = asyncio.Event()
+        self._http: aiohttp.ClientSession | None = None
+
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def _backoff(self, attempts: int) -> datetime.timedelta:
+        delay = min(self.backoff_max, self.backoff_base ** attempts)
+        # Jitter spreads retries out when a destination comes back up.
+        return datetime.timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+    async def claim(self, limit: int) -> list[dict]:
+        """Claims up to `limit` due events and returns them with their destinations."""
+        now = datetime.datetime.utcnow()
+        due = (
+            select(lead_events.c.id)
+            .where(lead_events.c.status == "pending", lead_events.c.next_attempt_at <= now)
+            .order_by(lead_events.c.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        claim = (
+            update(lead_events)
+            .where(lead_events.c.id.in_(due))
+            .values(attempts=lead_events.c.attempts + 1, next_attempt_at=now + self.lease)
+            .returning(
+                lead_events.c.id, lead_events.c.business_id, lead_events.c.event_type,
+                lead_events.c.payload, lead_events.c.attempts,
+                lead_events.c.webhook_delivered_at, lead_events.c.email_delivered_at,
+            )
+        )
+        async with engine.begin() as connection:
+            events = [dict(row._mapping) for row in await connection.execute(claim)]
+            if not events:
+                return []
+            destinations = await connection.execute(
+                select(businesses.c.id, businesses.c.email, businesses.c.webhook_url)
+                .where(businesses.c.id.in_({event["business_id"] for event in events}))
+            )
+            by_business = {row.id: row for row in destinations}
+
+        for event in events:
+            business = by_business.get(event["business_id"])
+            event["email"] = business.email if business else None
+            event["webhook_url"] = business.webhook_url if business else None
+        return events
+
+    async def _post_webhook(self, event: dict) -> None:
+        body = {"id": event["id"], "type": event["event_type"], "business_id": event["business_id"], "lead": event["payload"]}
+        async with self._http.post(
+            event["webhook_url"], json=body, headers={"X-Event-Id": str(event["id"])}, timeout=self.webhook_timeout,
+        ) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"webhook returned HTTP {response.status}")
+
+    async def _send_email(self, event: dict) -> None:
+        await asyncio.to_thread(_send_email, _format_email(event, event["email"]))
+
+    async def deliver(self, event: dict) -> None:
+        channels = {}
+        if event["webhook_url"]:
+            channels["webhook"] = self._post_webhook
+        if event["email"] and SMTP_HOST:
+            channels["email"] = self._send_email
+        if not channels:
+            await self._finish(event, {}, [], skipped=True)
+            return
+
+        delivered = {}
+        errors = []
+        for channel, send in channels.items():
+            if event[f"{channel}_delivered_at"] is not None:
+                continue  # Sent on an earlier attempt.
+            try:
+                await send(event)
+                delivered[f"{channel}_delivered_at"] = datetime.datetime.utcnow()
+            except Exception as e:
+                errors.append(f"{channel}: {type(e).__name__}: {e}")
+        await self._finish(event, delivered, errors)
+
+    async def _finish(self, event: dict, delivered: dict, errors: list[str], skipped: bool = False) -> None:
+        now = datetime.datetime.utcnow()
+        error = "; ".join(errors) or None
+        if skipped:
+            values = {"status": "skipped", "last_error": None}
+            self.skipped += 1
+            logger.warning("Lead event %s skipped: business %s has no webhook or email configured",
+                           event["id"], event["business_id"], extra={"event": "outbox.skipped"})
+        elif error is None:
+            values = {"status": "done", "delivered_at": now, "last_error": None}
+            self.delivered += 1
+        elif event["attempts"] >= self.max_attempts:
+            values = {"status": "failed", "last_error": error}
+            self.failed += 1
+            logger.error("Giving up on lead event %s after %s attempts: %s", event["id"], event["attempts"], error,
+                         extra={"event": "outbox.failed"})
+        else:
+            values = {"next_attempt_at": now + self._backoff(event["attempts"]), "last_error": error}
+            self.retried += 1
+            logger.warning("Lead event %s failed (attempt %s), will retry: %s", event["id"], event["attempts"], error,
+                           extra={"event": "outbox.retry"})
+
+        try:
+            async with engine.begin() as connection:
+                await connection.execute(
+                    update(lead_events).where(lead_events.c.id == event["id"]).values(**values, **delivered)
+                )
+        except Exception as e:
+            # The lease expires and the event is picked up again; channels that just
+            # succeeded are then sent a second time.
+            logger.error("Could not record the result for lead event %s: %s", event["id"], e)
+
+    async def run(self) -> None:
+        self._http = aiohttp.ClientSession()
+        in_flight: set[asyncio.Task] = set()
+        try:
+            while not self._stopping.is_set():
+                # Only claim what can be delivered right away, so no lease runs out
+                # while its event is still waiting for a free slot.
+                free = self.concurrency - len(in_flight)
+                if free <= 0:
+                    await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+
+                limit = min(free, self.batch_size)
+                try:
+                    events = await self.claim(limit)
+                except Exception as e:
+                    logger.error("Could not claim lead events: %s", e)
+                    events = []
+
+                for event in events:
+                    task = asyncio.create_task(self.deliver(event))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+
+                # A full claim means more is likely waiting; otherwise wait for new work.
+                if len(events) < limit:
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+
+            if in_flight:
+                logger.info("Waiting for %d deliveries to finish...", len(in_flight))
+                await asyncio.gather(*in_flight, return_exceptions=True)
+        finally:
+            await self._http.close()
+            await engine.dispose()
+            logger.info(
+                "Outbox dispatcher stopped: delivered=%d retried=%d failed=%d skipped=%d",
+                self.delivered, self.retried, self.failed, self.skipped,
+            )
+
+
+async def main(args: argparse.Namespace) -> None:
+    dispatcher = Dispatcher(
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        poll_interval=args.poll_interval,
+        max_attempts=args.max_attempts,
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, dispatcher.stop)
+    await dispatcher.run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deliver queued lead notifications.")
+    parser.add_argument("--concurrency", type=int, default=10, help="Max deliveries in flight.")
+    parser.add_argument("--batch-size", type=int, default=50, help="Events claimed per query.")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to wait when the outbox is empty.")
+    parser.add_argument("--max-attempts", type=int, default=8, help="Attempts before an event is marked failed.")
+    setup_logging()
+    asyncio.run(main(parser.parse_args()))
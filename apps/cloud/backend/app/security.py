@@ -1,35 +1,74 @@
 import os
-from fastapi import Security, HTTPException, status
+import secrets
+from fastapi import Depends, Request, Security, HTTPException, status
 from fastapi.security import APIKeyHeader
 
+from . import db
+from .api_keys import ApiKey, ApiKeyVerifier
+
 # Load the static API key from environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
+# Optional platform-wide key from the environment, accepted alongside the keys in the
+# api_keys table (see manage_api_keys.py).
 INTERNAL_API_KEY = os.getenv("INTERNAL_API_KEY")
 
+# How stale a cached key's revocation status may get, i.e. how long a revoked key can
+# keep working in a worker that has already verified it.
+API_KEY_RECHECK_SECONDS = float(os.getenv("API_KEY_RECHECK_SECONDS", "5"))
+API_KEY_CACHE_SIZE = int(os.getenv("API_KEY_CACHE_SIZE", "1024"))
+# How long a rejected key is rejected without a database query, and how many wrong
+# secrets one client IP may try for a key prefix (each costs an scrypt hash) per window.
+API_KEY_REJECT_SECONDS = float(os.getenv("API_KEY_REJECT_SECONDS", "10"))
+API_KEY_MAX_FAILURES = int(os.getenv("API_KEY_MAX_FAILURES", "10"))
+API_KEY_FAILURE_WINDOW_SECONDS = float(os.getenv("API_KEY_FAILURE_WINDOW_SECONDS", "60"))
+
+ENV_KEY = ApiKey(id=None, name="INTERNAL_API_KEY")
+
+verifier = ApiKeyVerifier(
+    db.AsyncSessionLocal,
+    recheck_after=API_KEY_RECHECK_SECONDS,
+    max_cached=API_KEY_CACHE_SIZE,
+    reject_for=API_KEY_REJECT_SECONDS,
+    max_failures=API_KEY_MAX_FAILURES,
+    failure_window=API_KEY_FAILURE_WINDOW_SECONDS,
+)
+
 # Define the header where the API key is expected
 api_key_header = APIKeyHeader(name="Authorization", auto_error=False)
 
-async def get_api_key(api_key: str = Security(api_key_header)):
+async def get_api_key(request: Request, api_key: str = Security(api_key_header)) -> ApiKey:
     """
     Dependency to validate the API key.
     The key is expected in the 'Authorization' header.
     Example: Authorization: your_secret_api_key_here
     """
-    if not INTERNAL_API_KEY:
+    if api_key:
+        if INTERNAL_API_KEY and secrets.compare_digest(api_key.encode(), INTERNAL_API_KEY.encode()):
+            return ENV_KEY
+        client = request.client.host if request.client else None
+        key = await verifier.verify(api_key, client)
+        if key is not None:
+            return key
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Could not validate credentials.",
+    )
+
+async def get_platform_api_key(api_key: ApiKey = Depends(get_api_key)) -> ApiKey:
+    """Dependency for endpoints that act across businesses, which tenant keys may not use."""
+    if not api_key.is_platform_key:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Internal API Key not configured on the server.",
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="This endpoint requires a platform API key.",
         )
-    
-    # Note: In a real production system, you would use a more secure
-    # comparison method like `secrets.compare_digest` to prevent timing attacks.
-    # For our use case, direct comparison is sufficient.
-    if api_key == INTERNAL_API_KEY:
-        return api_key
-    else:
+    return api_key
+
+def check_business_access(api_key: ApiKey, business_id: str) -> None:
+    """Tenant keys may only act on their own business."""
+    if not api_key.is_platform_key and api_key.business_id != business_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials.",
-        )
\ No newline at end of file
+            detail="This API key does not have access to this business.",
+        )
@@ -0,0 +1,113 @@
+"""
+Per-request cost of API key authentication, against the configured database.
+
+Times security.get_api_key (the dependency every internal endpoint runs) for:
+  * the INTERNAL_API_KEY environment key (constant-time compare),
+  * a hashed database key already in the verified-key cache (the steady state),
+  * a cached key whose revocation status is due for a re-check (one primary-key query),
+  * a key seen for the first time (prefix query + scrypt), with an empty cache,
+  * a wrong key that was just rejected (negative cache, no query),
+  * wrong secrets for the key's prefix once the client's failure budget for it is spent
+    (prefix query, no scrypt).
+It then revokes the key and reports how long the cached copy keeps being accepted.
+
+A throwaway platform key is created for the run and deleted afterwards.
+
+Usage:
+    python bench_auth.py --requests 20000
+"""
+import argparse
+import asyncio
+import datetime
+import time
+import uuid
+
+from sqlalchemy import delete, insert, update
+from starlette.requests import Request
+
+from app import security
+from app.api_keys import ApiKeyVerifier, generate_key
+from app.db import AsyncSessionLocal, engine
+from app.models import api_keys
+
+# get_api_key only reads the client address from the request.
+BENCH_REQUEST = Request({"type": "http", "client": ("127.0.0.1", 0), "headers": []})
+
+
+async def time_calls(fnc, presented: str | list[str], count: int) -> list[float]:
+    """Times `count` calls with `presented`, or with each of a list of keys in turn."""
+    durations = []
+    for index in range(count):
+        started = time.perf_counter()
+        await fnc(presented if isinstance(presented, str) else presented[index % len(presented)])
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+async def get_api_key(presented: str) -> security.ApiKey:
+    return await security.get_api_key(BENCH_REQUEST, presented)
+
+
+def report(label: str, durations: list[float]) -> None:
+    durations = sorted(durations)
+    p50 = durations[len(durations) // 2] * 1e6
+    p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))] * 1e6
+    print(f"{label:<28} n={len(durations):>6}   p50 {p50:10.1f} us   p99 {p99:10.1f} us")
+
+
+async def main(args: argparse.Namespace) -> None:
+    key, prefix, key_hash = generate_key()
+    async with engine.begin() as connection:
+        result = await connection.execute(
+            insert(api_keys).values(prefix=prefix, key_hash=key_hash, name=f"bench-{uuid.uuid4().hex[:8]}").returning(api_keys.c.id)
+        )
+        key_id = result.scalar_one()
+
+    try:
+        if security.INTERNAL_API_KEY:
+            report("env key", await time_calls(get_api_key, security.INTERNAL_API_KEY, args.requests))
+
+        await get_api_key(key)
+        report("db key, cached", await time_calls(get_api_key, key, args.requests))
+
+        rechecking = ApiKeyVerifier(AsyncSessionLocal, recheck_after=0)
+        await rechecking.verify(key)
+        report("db key, re-check due", await time_calls(rechecking.verify, key, args.rechecks))
+
+        cold = []
+        for _ in range(args.cold):
+            started = time.perf_counter()
+            await ApiKeyVerifier(AsyncSessionLocal).verify(key)
+            cold.append(time.perf_counter() - started)
+        report("db key, first sight", cold)
+
+        wrong = key.rsplit("_", 1)[0] + "_wrong"
+        rejecting = ApiKeyVerifier(AsyncSessionLocal)
+        await rejecting.verify(wrong)
+        report("wrong key, rejected", await time_calls(rejecting.verify, wrong, args.requests))
+
+        locked = ApiKeyVerifier(AsyncSessionLocal, max_failures=1)
+        await locked.verify(wrong)
+        guesses = [f"{wrong}{index}" for index in range(args.rechecks)]
+        report("wrong secret, locked out", await time_calls(locked.verify, guesses, len(guesses)))
+
+        async with engine.begin() as connection:
+            await connection.execute(update(api_keys).where(api_keys.c.id == key_id).values(revoked_at=datetime.datetime.utcnow()))
+        revoked_at = time.perf_counter()
+        while await security.verifier.verify(key) is not None:
+            await asyncio.sleep(0.01)
+        print(f"revoked key rejected after {time.perf_counter() - revoked_at:.2f}s "
+              f"(API_KEY_RECHECK_SECONDS={security.API_KEY_RECHECK_SECONDS:g})")
+        print(f"verifier: {security.verifier.summary()}")
+    finally:
+        async with engine.begin() as connection:
+            await connection.execute(delete(api_keys).where(api_keys.c.id == key_id))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-request API key authentication overhead.")
+    parser.add_argument("--requests", type=int, default=20000, help="Calls for the cached paths.")
+    parser.add_argument("--rechecks", type=int, default=500, help="Calls for the re-check path.")
+    parser.add_argument("--cold", type=int, default=20, help="First-sight verifications (each runs scrypt).")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,86 @@
+"""
+Throughput benchmark for business onboarding (businesses/sec).
+
+Compares, against the configured database:
+  * row by row: one INSERT plus a read-back per business, as POST /api/internal/businesses does,
+  * bulk: parse + validate + COPY into staging + one upsert, as the bulk import does,
+  * bulk re-import of the same records (all updates).
+
+Synthetic businesses get a unique id prefix and are deleted afterwards.
+
+Usage:
+    python bench_bulk_import.py --count 5000 --row-count 500
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from sqlalchemy import delete, insert, select
+
+from app.bulk_import import bulk_upsert, parse_records
+from app.db import engine
+from app.models import businesses
+
+
+def synthetic_ndjson(prefix: str, count: int) -> bytes:
+    lines = [
+        json.dumps({
+            "id": f"{prefix}{index}",
+            "business_name": f"Franchise Location {index}",
+            "contact_name": "Owner",
+            "phone_number": f"+1555{index:07d}",
+            "email": f"location{index}@example.com",
+            "knowledge_base": "Open 9-5 Monday to Friday. Free estimates. " * 10,
+            "routing_policy": {"enabled": index % 2 == 0},
+        })
+        for index in range(count)
+    ]
+    return "\n".join(lines).encode()
+
+
+async def bench_row_by_row(records) -> float:
+    started = time.perf_counter()
+    async with engine.connect() as connection:
+        for record in records:
+            await connection.execute(insert(businesses).values(**record.model_dump()))
+            await connection.commit()
+            (await connection.execute(select(businesses).where(businesses.c.id == record.id))).first()
+    return time.perf_counter() - started
+
+
+async def bench_bulk(content: bytes) -> tuple[float, dict]:
+    started = time.perf_counter()
+    records, errors = parse_records(content, "ndjson")
+    assert not errors, errors[:3]
+    async with engine.connect() as connection:
+        raw_connection = await connection.get_raw_connection()
+        result = await bulk_upsert(raw_connection.driver_connection, records)
+    return time.perf_counter() - started, result
+
+
+async def main(args: argparse.Namespace) -> None:
+    prefix = f"bench-{uuid.uuid4().hex[:8]}-"
+    try:
+        row_records, _ = parse_records(synthetic_ndjson(prefix + "row-", args.row_count), "ndjson")
+        elapsed = await bench_row_by_row(row_records)
+        print(f"row by row: {args.row_count:>6} businesses in {elapsed:6.2f}s = {args.row_count / elapsed:8.0f} businesses/s")
+
+        content = synthetic_ndjson(prefix + "bulk-", args.count)
+        elapsed, result = await bench_bulk(content)
+        print(f"bulk:       {args.count:>6} businesses in {elapsed:6.2f}s = {args.count / elapsed:8.0f} businesses/s {result}")
+
+        elapsed, result = await bench_bulk(content)
+        print(f"re-import:  {args.count:>6} businesses in {elapsed:6.2f}s = {args.count / elapsed:8.0f} businesses/s {result}")
+    finally:
+        async with engine.begin() as connection:
+            await connection.execute(delete(businesses).where(businesses.c.id.startswith(prefix)))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bulk business import throughput.")
+    parser.add_argument("--count", type=int, default=5000, help="Businesses per bulk import.")
+    parser.add_argument("--row-count", type=int, default=500, help="Businesses for the row-by-row baseline.")
+    asyncio.run(main(parser.parse_args()))
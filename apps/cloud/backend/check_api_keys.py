@@ -0,0 +1,211 @@
+"""
+Offline checks for app.api_keys.ApiKeyVerifier, with an in-memory api_keys table in
+place of the database (each query waits `--query-ms`, like a round trip would).
+
+Covers:
+  * a cached key is accepted without a query, in well under a millisecond,
+  * concurrent first requests and concurrent due re-checks each share one query,
+  * a revoked key is rejected at its next re-check,
+  * a rejected key is rejected again without a query until `reject_for` passes,
+  * one client's wrong secrets for a prefix stop being hashed after `max_failures`,
+    even when they arrive at once, and its budget comes back after `failure_window`,
+  * the real key still verifies from another client while the guesser is locked out.
+
+bench_auth.py measures the same paths through get_api_key against a real database.
+
+Usage:
+    python check_api_keys.py
+"""
+import argparse
+import asyncio
+import datetime
+import sys
+import time
+
+from app import api_keys
+from app.api_keys import ApiKeyVerifier, generate_key
+
+
+class FakeRow:
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+
+class FakeResult:
+    def __init__(self, row: FakeRow | None):
+        self._row = row
+
+    def first(self) -> FakeRow | None:
+        return self._row
+
+
+class FakeTable:
+    """Answers the verifier's two queries (by prefix, by id) from a dict of rows."""
+
+    def __init__(self, query_delay: float):
+        self.query_delay = query_delay
+        self.rows: dict[int, FakeRow] = {}
+        self.queries = 0
+
+    def add(self, key_id: int) -> str:
+        key, prefix, key_hash = generate_key()
+        self.rows[key_id] = FakeRow(
+            id=key_id, prefix=prefix, key_hash=key_hash, name=f"check-{key_id}",
+            business_id=None, revoked_at=None, expires_at=None,
+        )
+        return key
+
+    async def execute(self, statement) -> FakeResult:
+        self.queries += 1
+        await asyncio.sleep(self.query_delay)
+        params = statement.compile().params
+        if "prefix_1" in params:
+            row = next((row for row in self.rows.values() if row.prefix == params["prefix_1"]), None)
+        else:
+            row = self.rows.get(params["id_1"])
+        return FakeResult(row)
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class CountingHash:
+    """Wraps api_keys.verify_secret to count scrypt runs."""
+
+    def __init__(self):
+        self.calls = 0
+        self._verify_secret = api_keys.verify_secret
+
+    def __call__(self, secret: str, stored_hash: str) -> bool:
+        self.calls += 1
+        return self._verify_secret(secret, stored_hash)
+
+
+def wrong_secret(key: str, index: int) -> str:
+    return key.rsplit("_", 1)[0] + f"_guess{index}"
+
+
+async def check_cached(args: argparse.Namespace) -> list[str]:
+    table = FakeTable(args.query_ms / 1000)
+    key = table.add(1)
+    verifier = ApiKeyVerifier(table, recheck_after=60)
+    await verifier.verify(key)
+    queries = table.queries
+
+    durations = []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        await verifier.verify(key)
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+    p50, p99 = durations[len(durations) // 2] * 1e6, durations[int(len(durations) * 0.99)] * 1e6
+    print(f"       cached key: p50 {p50:.1f} us, p99 {p99:.1f} us over {args.requests} calls")
+
+    failures = []
+    if table.queries != queries:
+        failures.append(f"cached hits ran {table.queries - queries} queries")
+    if p99 >= 1000:
+        failures.append(f"cached hits took {p99:.0f} us at p99")
+    return failures
+
+
+async def check_shared_work(args: argparse.Namespace) -> list[str]:
+    table = FakeTable(args.query_ms / 1000)
+    key = table.add(1)
+    verifier = ApiKeyVerifier(table, recheck_after=0.05)
+    failures = []
+
+    results = await asyncio.gather(*(verifier.verify(key) for _ in range(50)))
+    if table.queries != 1 or not all(results):
+        failures.append(f"50 concurrent first requests ran {table.queries} queries, {results.count(None)} rejected")
+
+    await asyncio.sleep(0.06)
+    results = await asyncio.gather(*(verifier.verify(key) for _ in range(50)))
+    if table.queries != 2 or not all(results):
+        failures.append(f"50 concurrent due re-checks ran {table.queries - 1} queries, {results.count(None)} rejected")
+
+    table.rows[1].revoked_at = datetime.datetime.utcnow()
+    await asyncio.sleep(0.06)
+    if await verifier.verify(key) is not None:
+        failures.append("a revoked key was accepted after its re-check")
+    return failures
+
+
+async def check_negative_cache(args: argparse.Namespace) -> list[str]:
+    table = FakeTable(args.query_ms / 1000)
+    key = table.add(1)
+    verifier = ApiKeyVerifier(table, reject_for=0.2)
+    unknown = "clb_000000000000_nosuchkey"
+    failures = []
+
+    for presented in (unknown, "not-a-key", wrong_secret(key, 0)):
+        await verifier.verify(presented)
+        queries = table.queries
+        if any(await asyncio.gather(*(verifier.verify(presented) for _ in range(100)))):
+            failures.append(f"{presented!r} was accepted")
+        if table.queries != queries:
+            failures.append(f"repeating the rejected key {presented!r} ran {table.queries - queries} more queries")
+
+    await asyncio.sleep(0.25)
+    queries = table.queries
+    await verifier.verify(unknown)
+    if table.queries != queries + 1:
+        failures.append("a rejected key was not looked up again after reject_for")
+    return failures
+
+
+async def check_failure_limit(args: argparse.Namespace) -> list[str]:
+    table = FakeTable(args.query_ms / 1000)
+    key = table.add(1)
+    verifier = ApiKeyVerifier(table, max_failures=5, failure_window=0.5)
+    hashing = api_keys.verify_secret = CountingHash()
+    failures = []
+    try:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(verifier.verify(wrong_secret(key, index), "203.0.113.9") for index in range(100)))
+        elapsed = time.perf_counter() - started
+        print(f"       100 concurrent wrong secrets: {hashing.calls} hashed, {elapsed * 1000:.0f} ms")
+        if any(results):
+            failures.append("a wrong secret was accepted")
+        if hashing.calls != 5:
+            failures.append(f"{hashing.calls} wrong secrets were hashed, expected max_failures=5")
+
+        if await verifier.verify(wrong_secret(key, 100), "203.0.113.9") is not None or hashing.calls != 5:
+            failures.append("the guessing client got another secret hashed after its budget was spent")
+        if await verifier.verify(key, "198.51.100.7") is None:
+            failures.append("the real key was rejected from another client after the budget was spent")
+
+        await asyncio.sleep(0.55)
+        verifier._cache.clear()
+        if await verifier.verify(key, "203.0.113.9") is None:
+            failures.append("the real key was still rejected from the guessing client after the failure window")
+        if (api_keys.parse_key(key)[0], "203.0.113.9") in verifier._failures:
+            failures.append("a successful verification did not clear the client's failures")
+    finally:
+        api_keys.verify_secret = hashing._verify_secret
+    return failures
+
+
+async def main(args: argparse.Namespace) -> int:
+    checks = [check_cached, check_shared_work, check_negative_cache, check_failure_limit]
+    failed = 0
+    for check in checks:
+        failures = await check(args)
+        print(f"{'FAIL' if failures else 'ok  '} {check.__name__}")
+        for failure in failures:
+            print(f"       {failure}")
+        failed += bool(failures)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check ApiKeyVerifier's caching and rate limiting without a database.")
+    parser.add_argument("--requests", type=int, default=20000, help="Calls for the cached path.")
+    parser.add_argument("--query-ms", type=float, default=2.0, help="Simulated database round trip.")
+    sys.exit(asyncio.run(main(parser.parse_args())))
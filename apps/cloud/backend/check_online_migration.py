@@ -0,0 +1,145 @@
+"""
+Checks that the online migration helpers do not stall application writes.
+
+Against the configured database, on a scratch table:
+  1. seeds `--rows` rows and measures single-row insert latency while idle,
+  2. keeps inserting from `--writers` threads (as the agents insert leads) while
+     create_index_concurrently() and batched_backfill() run, with another thread
+     holding row locks on not-yet-backfilled rows to exercise SKIP LOCKED,
+  3. fails if any insert took longer than `--max-stall-ms`, if the index is not
+     valid or if the backfill left rows behind.
+
+The scratch table is dropped afterwards.
+
+Usage:
+    python check_online_migration.py --rows 200000 --writers 4
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+import uuid
+
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from app.models import DATABASE_URL
+from app.online_migrations import batched_backfill, create_index_concurrently
+
+
+def insert_loop(engine, table: str, stop: threading.Event, latencies: list[float], interval: float) -> None:
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        statement = sa.text(f"INSERT INTO {table} (business_id, backfilled) VALUES (:business_id, true)")
+        while not stop.is_set():
+            started = time.perf_counter()
+            connection.execute(statement, {"business_id": f"biz-{random.randrange(500)}"})
+            latencies.append(time.perf_counter() - started)
+            time.sleep(interval)
+
+
+def lock_loop(engine, table: str, stop: threading.Event, max_id: int) -> None:
+    # Holds short row locks on rows the backfill still has to update, like application
+    # transactions touching old rows would.
+    with engine.connect() as connection:
+        while not stop.is_set():
+            with connection.begin():
+                start = random.randrange(1, max_id)
+                connection.execute(sa.text(
+                    f"SELECT id FROM {table} WHERE id BETWEEN :start AND :end AND backfilled IS NULL FOR UPDATE"
+                ), {"start": start, "end": start + 2000})
+                time.sleep(0.05)
+
+
+def summarize(latencies: list[float]) -> str:
+    latencies = sorted(latencies)
+    if not latencies:
+        return "no inserts"
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return (f"{len(latencies)} inserts, p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+            f"p99 {p99 * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+
+
+def run_writers(engine, table: str, args: argparse.Namespace, seconds: float | None, work=None) -> list[float]:
+    stop = threading.Event()
+    latencies: list[float] = []
+    threads = [
+        threading.Thread(target=insert_loop, args=(engine, table, stop, latencies, args.insert_interval))
+        for _ in range(args.writers)
+    ]
+    if work is not None:
+        threads.append(threading.Thread(target=lock_loop, args=(engine, table, stop, args.rows)))
+    for thread in threads:
+        thread.start()
+    try:
+        if work is None:
+            time.sleep(seconds)
+        else:
+            work()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    return latencies
+
+
+def main(args: argparse.Namespace) -> int:
+    table = f"online_migration_check_{uuid.uuid4().hex[:8]}"
+    engine = sa.create_engine(DATABASE_URL, pool_size=args.writers + 2)
+    with engine.begin() as connection:
+        connection.execute(sa.text(
+            f"CREATE TABLE {table} (id serial PRIMARY KEY, business_id varchar(255), backfilled boolean)"
+        ))
+        connection.execute(sa.text(
+            f"INSERT INTO {table} (business_id) SELECT 'biz-' || (n % 500) FROM generate_series(1, :rows) AS n"
+        ), {"rows": args.rows})
+
+    try:
+        print(f"idle:      {summarize(run_writers(engine, table, args, seconds=2.0))}")
+
+        def migrate():
+            with engine.connect() as connection:
+                with Operations.context(MigrationContext.configure(connection)):
+                    started = time.perf_counter()
+                    create_index_concurrently(f"ix_{table}_business_id", table, ["business_id"])
+                    indexed = time.perf_counter()
+                    batched_backfill(table, "backfilled = true", "backfilled IS NULL", batch_size=args.batch_size)
+                    print(f"index built in {indexed - started:.1f}s, backfill took {time.perf_counter() - indexed:.1f}s")
+
+        latencies = run_writers(engine, table, args, seconds=None, work=migrate)
+        print(f"migrating: {summarize(latencies)}")
+
+        with engine.connect() as connection:
+            valid = connection.execute(
+                sa.text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+                {"name": f"ix_{table}_business_id"},
+            ).scalar()
+            left = connection.execute(sa.text(f"SELECT count(*) FROM {table} WHERE backfilled IS NULL")).scalar()
+
+        failures = []
+        if latencies and max(latencies) * 1000 > args.max_stall_ms:
+            failures.append(f"an insert stalled for {max(latencies) * 1000:.0f} ms (limit {args.max_stall_ms:g} ms)")
+        if not valid:
+            failures.append("the index is missing or invalid")
+        if left:
+            failures.append(f"{left} rows were not backfilled")
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if not failures:
+            print("OK: writes kept flowing during the migration.")
+        return 1 if failures else 0
+    finally:
+        with engine.begin() as connection:
+            connection.execute(sa.text(f"DROP TABLE IF EXISTS {table}"))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that online migrations do not stall concurrent inserts.")
+    parser.add_argument("--rows", type=int, default=200000, help="Rows seeded into the scratch table.")
+    parser.add_argument("--writers", type=int, default=4, help="Threads inserting during the migration.")
+    parser.add_argument("--insert-interval", type=float, default=0.005, help="Seconds between inserts per writer.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Backfill batch size.")
+    parser.add_argument("--max-stall-ms", type=float, default=500.0, help="Slowest acceptable insert.")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,214 @@
+"""
+Checks the lead outbox dispatcher (app.outbox) against the configured database.
+
+With throwaway businesses, leads and events:
+  1. two concurrent claims never hand out the same event, and claiming bumps
+     `attempts` and leases the event,
+  2. a leased event is not claimed again until the lease expires, then it is,
+  3. a failed delivery is scheduled within the backoff window, and the retry only
+     repeats the channel that failed (email succeeds, the webhook fails once),
+  4. an event whose business has no channel is marked `skipped`,
+  5. an event that keeps failing is marked `failed` after `max_attempts`.
+
+The webhook is served locally and email sending is replaced by a recorder, so
+nothing leaves the machine. Run it against a scratch database: it refuses to start
+if other events are waiting, since the dispatcher would claim those too.
+
+Usage:
+    python check_outbox.py
+"""
+import argparse
+import asyncio
+import datetime
+import sys
+import uuid
+from collections import Counter
+
+import aiohttp
+from aiohttp import web
+from sqlalchemy import delete, func, insert, select, update
+
+from app import outbox
+from app.db import engine
+from app.models import businesses, lead_events, leads
+
+
+class FakeDestinations:
+    """A webhook that fails each event's first delivery (or every one under /fail), and an email recorder."""
+
+    def __init__(self):
+        self.webhook_calls: Counter = Counter()
+        self.emails: Counter = Counter()
+
+    async def handle_webhook(self, request: web.Request) -> web.Response:
+        event_id = request.headers["X-Event-Id"]
+        self.webhook_calls[event_id] += 1
+        if request.path == "/fail" or self.webhook_calls[event_id] == 1:
+            return web.Response(status=503)
+        return web.json_response({"ok": True})
+
+    def send_email(self, message) -> None:
+        self.emails[message["To"]] += 1
+
+
+async def create_business(connection, run_id: str, label: str, webhook_url: str | None, email: str | None) -> str:
+    business_id = f"outbox-check-{run_id}-{label}"
+    await connection.execute(insert(businesses).values(
+        id=business_id, business_name=f"Outbox check {label}", webhook_url=webhook_url, email=email,
+    ))
+    return business_id
+
+
+async def create_events(connection, business_id: str, count: int) -> list[int]:
+    ids = []
+    for index in range(count):
+        lead_id = (await connection.execute(
+            insert(leads).values(business_id=business_id, visitor_name=f"Visitor {index}", inquiry="check")
+            .returning(leads.c.id)
+        )).scalar_one()
+        ids.append((await connection.execute(
+            insert(lead_events).values(
+                lead_id=lead_id, business_id=business_id, event_type="lead.created",
+                payload={"visitor_name": f"Visitor {index}"}, status="pending", attempts=0,
+                next_attempt_at=datetime.datetime.utcnow(),
+            ).returning(lead_events.c.id)
+        )).scalar_one())
+    return ids
+
+
+async def fetch(ids: list[int]) -> dict[int, dict]:
+    async with engine.connect() as connection:
+        rows = await connection.execute(select(lead_events).where(lead_events.c.id.in_(ids)))
+        return {row.id: dict(row._mapping) for row in rows}
+
+
+async def make_due(ids: list[int]) -> None:
+    async with engine.begin() as connection:
+        await connection.execute(
+            update(lead_events).where(lead_events.c.id.in_(ids)).values(next_attempt_at=datetime.datetime.utcnow())
+        )
+
+
+def check_backoff(dispatcher: outbox.Dispatcher) -> list[str]:
+    failures = []
+    for attempts in range(1, 20):
+        ceiling = min(dispatcher.backoff_max, dispatcher.backoff_base ** attempts)
+        for _ in range(50):
+            delay = dispatcher._backoff(attempts).total_seconds()
+            if not 0.5 * ceiling <= delay <= ceiling:
+                failures.append(f"backoff after {attempts} attempts was {delay:.1f}s, expected {0.5 * ceiling:.1f}-{ceiling:.1f}s")
+                return failures
+    return failures
+
+
+async def main(args: argparse.Namespace) -> int:
+    fake = FakeDestinations()
+    outbox._send_email = fake.send_email
+    outbox.SMTP_HOST = "fake-smtp"
+
+    app = web.Application()
+    app.router.add_post("/hook", fake.handle_webhook)
+    app.router.add_post("/fail", fake.handle_webhook)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+
+    run_id = uuid.uuid4().hex[:8]
+    business_ids: list[str] = []
+    failures: list[str] = []
+    dispatcher = outbox.Dispatcher(lease_seconds=args.lease, max_attempts=3)
+    dispatcher._http = aiohttp.ClientSession()
+    try:
+        async with engine.begin() as connection:
+            waiting = (await connection.execute(
+                select(func.count()).select_from(lead_events).where(lead_events.c.status == "pending")
+            )).scalar_one()
+            if waiting:
+                print(f"Refusing to run: {waiting} other events are pending in this database.")
+                return 2
+            both = await create_business(connection, run_id, "both", f"http://127.0.0.1:{args.port}/hook", "owner@example.com")
+            none = await create_business(connection, run_id, "none", None, None)
+            failing = await create_business(connection, run_id, "failing", f"http://127.0.0.1:{args.port}/fail", None)
+            business_ids = [both, none, failing]
+            event_ids = await create_events(connection, both, args.events)
+            skipped_ids = await create_events(connection, none, 1)
+            failing_ids = await create_events(connection, failing, 1)
+        all_ids = event_ids + skipped_ids + failing_ids
+
+        failures += check_backoff(dispatcher)
+
+        # 1. Concurrent claims are disjoint and lease what they take.
+        first, second = await asyncio.gather(dispatcher.claim(len(all_ids)), dispatcher.claim(len(all_ids)))
+        claimed = [event["id"] for event in first + second]
+        if sorted(claimed) != sorted(all_ids):
+            failures.append(f"concurrent claims returned {len(claimed)} events ({len(set(claimed))} distinct), expected {len(all_ids)}")
+        rows = await fetch(all_ids)
+        if any(row["attempts"] != 1 or row["next_attempt_at"] <= datetime.datetime.utcnow() for row in rows.values()):
+            failures.append("claimed events were not leased with attempts=1")
+
+        # 2. Leased events stay put until the lease runs out.
+        if await dispatcher.claim(len(all_ids)):
+            failures.append("leased events were claimed again before the lease expired")
+        await asyncio.sleep(args.lease + 0.5)
+        reclaimed = await dispatcher.claim(len(all_ids))
+        if sorted(event["id"] for event in reclaimed) != sorted(all_ids):
+            failures.append(f"only {len(reclaimed)} of {len(all_ids)} events were claimable after the lease expired")
+
+        # 3. First delivery: email succeeds, the webhook fails and is retried with backoff.
+        before = datetime.datetime.utcnow()
+        await asyncio.gather(*(dispatcher.deliver(event) for event in reclaimed))
+        rows = await fetch(all_ids)
+        for event_id in event_ids:
+            row = rows[event_id]
+            window = dispatcher.backoff_base ** row["attempts"]
+            if row["status"] != "pending" or row["email_delivered_at"] is None or row["webhook_delivered_at"] is not None:
+                failures.append(f"event {event_id} after a failed webhook: status={row['status']} "
+                                f"email_delivered_at={row['email_delivered_at']} webhook_delivered_at={row['webhook_delivered_at']}")
+            elif not before + datetime.timedelta(seconds=0.5 * window) <= row["next_attempt_at"] <= datetime.datetime.utcnow() + datetime.timedelta(seconds=window):
+                failures.append(f"event {event_id} was scheduled outside the backoff window: {row['next_attempt_at']}")
+
+        # 4. No channel configured.
+        if rows[skipped_ids[0]]["status"] != "skipped":
+            failures.append(f"an event without channels ended as {rows[skipped_ids[0]]['status']!r}, expected 'skipped'")
+
+        # The retry only repeats the webhook.
+        await make_due(event_ids)
+        await asyncio.gather(*(dispatcher.deliver(event) for event in await dispatcher.claim(len(all_ids))))
+        rows = await fetch(all_ids)
+        if fake.emails["owner@example.com"] != args.events:
+            failures.append(f"{fake.emails['owner@example.com']} emails were sent for {args.events} events; a retry resent email")
+        not_done = [event_id for event_id in event_ids if rows[event_id]["status"] != "done"]
+        if not_done:
+            failures.append(f"{len(not_done)} events were not done after the webhook recovered")
+
+        # 5. Retries run out.
+        await make_due(failing_ids)
+        await asyncio.gather(*(dispatcher.deliver(event) for event in await dispatcher.claim(len(all_ids))))
+        status = (await fetch(failing_ids))[failing_ids[0]]["status"]
+        if status != "failed":
+            failures.append(f"an event failing {dispatcher.max_attempts} times ended as {status!r}, expected 'failed'")
+    finally:
+        async with engine.begin() as connection:
+            if business_ids:
+                await connection.execute(delete(lead_events).where(lead_events.c.business_id.in_(business_ids)))
+                await connection.execute(delete(leads).where(leads.c.business_id.in_(business_ids)))
+                await connection.execute(delete(businesses).where(businesses.c.id.in_(business_ids)))
+        await dispatcher._http.close()
+        await runner.cleanup()
+        await engine.dispose()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print(f"OK: claim, lease, backoff, per-channel retry, skip and give-up behave as expected "
+              f"({args.events} events, lease {args.lease:g}s).")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the outbox dispatcher's claim, lease and retry behaviour.")
+    parser.add_argument("--events", type=int, default=20, help="Events for the business with both channels.")
+    parser.add_argument("--lease", type=float, default=2.0, help="Lease used by the dispatcher under test, in seconds.")
+    parser.add_argument("--port", type=int, default=8026, help="Port for the local webhook.")
+    sys.exit(asyncio.run(main(parser.parse_args())))
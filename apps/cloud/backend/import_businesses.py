@@ -0,0 +1,61 @@
+"""
+Bulk-imports businesses from a CSV or NDJSON file straight into the database.
+
+Uses the same validation and COPY-based upsert as POST /api/internal/businesses/bulk,
+without the request size limits of going through the API:
+
+    python import_businesses.py franchise.csv
+    python import_businesses.py resellers.ndjson --errors errors.json
+    python import_businesses.py franchise.csv --dry-run
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.bulk_import import bulk_upsert, parse_records
+from app.db import engine
+
+
+async def main(args: argparse.Namespace) -> None:
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    with open(args.path, "rb") as f:
+        content = f.read()
+
+    started = time.perf_counter()
+    records, errors = parse_records(content, fmt)
+    parsed = time.perf_counter()
+    print(f"Parsed {len(records)} valid and {len(errors)} invalid rows in {parsed - started:.2f}s.")
+
+    if errors:
+        if args.errors:
+            with open(args.errors, "w") as f:
+                json.dump(errors, f, indent=2)
+            print(f"Row errors written to {args.errors}")
+        else:
+            for error in errors[:20]:
+                print(f"  row {error['row']}: {error['errors']}")
+            if len(errors) > 20:
+                print(f"  ... and {len(errors) - 20} more (use --errors to save them all)")
+
+    if args.dry_run or not records:
+        return
+
+    try:
+        async with engine.connect() as connection:
+            raw_connection = await connection.get_raw_connection()
+            result = await bulk_upsert(raw_connection.driver_connection, records)
+    finally:
+        await engine.dispose()
+    elapsed = time.perf_counter() - parsed
+    print(f"Imported {len(records)} businesses ({result['inserted']} new, {result['updated']} updated) "
+          f"in {elapsed:.2f}s, {len(records) / elapsed:.0f} businesses/s.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-import businesses from CSV or NDJSON.")
+    parser.add_argument("path", help="CSV (with a header row) or NDJSON file of BusinessCreate records.")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension.")
+    parser.add_argument("--errors", help="Write per-row validation errors to this JSON file.")
+    parser.add_argument("--dry-run", action="store_true", help="Only validate the file.")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,101 @@
+"""
+Local load test for the token and business profile endpoints.
+
+Runs `--concurrency` clients in a closed loop against each endpoint in turn for
+`--duration` seconds (after a short warm-up) and reports requests/sec and latency
+percentiles. Compare `uvicorn main:app` against `python serve.py`:
+
+    python load_test.py --business-id acme-plumbing --concurrency 64 --duration 20
+    python load_test.py --url http://127.0.0.1:8002 --endpoint token    # open-source token server
+
+The business endpoint needs INTERNAL_API_KEY (or --api-key) and an existing business.
+The client is a single Python process; if it saturates a core before the server does,
+run it from another machine or start several copies and add up their numbers.
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+import aiohttp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def request_fnc(args: argparse.Namespace, endpoint: str):
+    if endpoint == "token":
+        url = f"{args.url}/api/token"
+
+        def request(session: aiohttp.ClientSession):
+            room_name = f"{args.business_id}_{uuid.uuid4().hex[:8]}_{uuid.uuid4().hex[:8]}"
+            return session.post(url, json={"business_id": args.business_id, "room_name": room_name})
+    else:
+        url = f"{args.url}/api/internal/businesses/{args.business_id}"
+        headers = {"Authorization": args.api_key or ""}
+
+        def request(session: aiohttp.ClientSession):
+            return session.get(url, headers=headers)
+    return request
+
+
+async def run_endpoint(args: argparse.Namespace, endpoint: str) -> dict:
+    request = request_fnc(args, endpoint)
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    started = time.perf_counter()
+    measure_from = started + args.warmup
+    stop_at = measure_from + args.duration
+
+    async def client(session: aiohttp.ClientSession) -> None:
+        while (now := time.perf_counter()) < stop_at:
+            try:
+                async with request(session) as response:
+                    await response.read()
+                    error = None if response.status < 400 else f"HTTP {response.status}"
+            except aiohttp.ClientError as e:
+                error = type(e).__name__
+            if now >= measure_from:
+                if error:
+                    errors[error] = errors.get(error, 0) + 1
+                else:
+                    latencies.append(time.perf_counter() - now)
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(client(session) for _ in range(args.concurrency)))
+
+    latencies.sort()
+
+    def percentile(p: float) -> float | None:
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2) if latencies else None
+
+    return {
+        "endpoint": endpoint,
+        "requests": len(latencies),
+        "rps": round(len(latencies) / args.duration, 1),
+        "p50_ms": percentile(0.50),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+        "errors": errors,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    for endpoint in args.endpoint or ["token", "business"]:
+        result = await run_endpoint(args, endpoint)
+        print(f"{result['endpoint']:<9} {result['rps']:>9} req/s   p50 {result['p50_ms']} ms   "
+              f"p99 {result['p99_ms']} ms   max {result['max_ms']} ms   ({result['requests']} ok, errors: {result['errors'] or 'none'})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test /api/token and /api/internal/businesses/{id}.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the backend or token server.")
+    parser.add_argument("--endpoint", action="append", choices=["token", "business"], help="Defaults to both.")
+    parser.add_argument("--business-id", default="demo-business")
+    parser.add_argument("--api-key", default=os.getenv("INTERNAL_API_KEY"), help="Defaults to INTERNAL_API_KEY.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Clients with a request in flight at all times.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per endpoint.")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds per endpoint before measuring starts.")
+    asyncio.run(main(parser.parse_args()))
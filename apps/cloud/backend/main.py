@@ -1,7 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from structured_logging import setup_logging
 from app import api
 
+# Application logs go out as JSON lines from a background thread, never from the event
+# loop, with emails and phone numbers redacted. Uvicorn's own loggers are left as they are.
+setup_logging()
+
 app = FastAPI(title="Contractor Leads Bot API")
 
 # Define the origins that are allowed to make requests to this server.
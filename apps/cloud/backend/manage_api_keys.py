@@ -0,0 +1,91 @@
+"""
+Creates, lists, rotates and revokes API keys for the internal endpoints.
+
+    python manage_api_keys.py create --name "cloud agent"                      # platform key
+    python manage_api_keys.py create --name "acme CRM" --business-id acme-plumbing
+    python manage_api_keys.py list
+    python manage_api_keys.py rotate <prefix> --grace-hours 24
+    python manage_api_keys.py revoke <prefix>
+
+A new key is printed once and only its hash is stored. A revoked key stops working in
+every server worker within API_KEY_RECHECK_SECONDS. Rotating issues a replacement with
+the same name and business and lets the old key expire after the grace period.
+"""
+import argparse
+import asyncio
+import datetime
+
+from sqlalchemy import insert, select, update
+
+from app.api_keys import generate_key
+from app.db import engine
+from app.models import api_keys
+
+
+async def create_key(connection, name: str, business_id: str | None, expires_at: datetime.datetime | None) -> str:
+    key, prefix, key_hash = generate_key()
+    await connection.execute(insert(api_keys).values(
+        prefix=prefix, key_hash=key_hash, name=name, business_id=business_id, expires_at=expires_at,
+    ))
+    return key
+
+
+async def main(args: argparse.Namespace) -> None:
+    now = datetime.datetime.utcnow()
+    try:
+        async with engine.begin() as connection:
+            if args.command == "create":
+                expires_at = now + datetime.timedelta(days=args.expires_in_days) if args.expires_in_days else None
+                key = await create_key(connection, args.name, args.business_id, expires_at)
+                print(f"Created key '{args.name}'. Store it now, it cannot be shown again:\n{key}")
+
+            elif args.command == "list":
+                rows = (await connection.execute(select(api_keys).order_by(api_keys.c.created_at))).all()
+                for row in rows:
+                    state = "revoked" if row.revoked_at else "expired" if row.expires_at and row.expires_at <= now else "active"
+                    print(f"{row.prefix}  {state:<8} {row.name!r:<30} business={row.business_id or '(platform)'}  "
+                          f"created={row.created_at:%Y-%m-%d}  expires={row.expires_at or '-'}")
+
+            elif args.command == "rotate":
+                old = (await connection.execute(select(api_keys).where(api_keys.c.prefix == args.prefix))).first()
+                if old is None or old.revoked_at:
+                    raise SystemExit(f"No active key with prefix {args.prefix}.")
+                key = await create_key(connection, old.name, old.business_id, None)
+                expires_at = now + datetime.timedelta(hours=args.grace_hours)
+                if old.expires_at is None or old.expires_at > expires_at:
+                    await connection.execute(update(api_keys).where(api_keys.c.id == old.id).values(expires_at=expires_at))
+                print(f"Created replacement for '{old.name}'. Store it now, it cannot be shown again:\n{key}\n"
+                      f"The old key ({args.prefix}) expires at {expires_at:%Y-%m-%d %H:%M} UTC.")
+
+            elif args.command == "revoke":
+                result = await connection.execute(
+                    update(api_keys)
+                    .where(api_keys.c.prefix == args.prefix, api_keys.c.revoked_at.is_(None))
+                    .values(revoked_at=now)
+                )
+                if result.rowcount == 0:
+                    raise SystemExit(f"No active key with prefix {args.prefix}.")
+                print(f"Revoked key {args.prefix}.")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage API keys for the internal endpoints.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="Issue a new key.")
+    create.add_argument("--name", required=True, help="Who or what the key is for.")
+    create.add_argument("--business-id", help="Restrict the key to one business. Omit for a platform key.")
+    create.add_argument("--expires-in-days", type=float, help="Defaults to never.")
+
+    commands.add_parser("list", help="List keys (prefixes only).")
+
+    rotate = commands.add_parser("rotate", help="Issue a replacement and expire the old key after a grace period.")
+    rotate.add_argument("prefix")
+    rotate.add_argument("--grace-hours", type=float, default=24.0)
+
+    revoke = commands.add_parser("revoke", help="Revoke a key immediately.")
+    revoke.add_argument("prefix")
+
+    asyncio.run(main(parser.parse_args()))
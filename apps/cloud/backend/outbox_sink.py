@@ -0,0 +1,123 @@
+"""
+Local fake destinations for the lead outbox dispatcher.
+
+Runs a webhook receiver and a minimal SMTP server that log everything they receive.
+Both can be made slow or flaky to check that `create_lead` latency stays flat and
+that the dispatcher retries:
+
+    python outbox_sink.py --delay 5 --fail-rate 0.3
+
+Then point a business at it and start the dispatcher:
+
+    UPDATE businesses SET webhook_url = 'http://localhost:8025/hook' WHERE id = '...';
+    SMTP_HOST=localhost SMTP_PORT=1025 python -m app.outbox
+"""
+import argparse
+import asyncio
+import json
+import random
+from collections import Counter
+
+from aiohttp import web
+
+stats = Counter()
+
+
+async def handle_webhook(request: web.Request) -> web.Response:
+    args = request.app["args"]
+    await asyncio.sleep(args.delay)
+    event_id = request.headers.get("X-Event-Id")
+    if random.random() < args.fail_rate:
+        stats["webhook_failed"] += 1
+        print(f"[webhook] event {event_id}: simulated failure")
+        return web.Response(status=503)
+
+    body = await request.json()
+    stats["webhook"] += 1
+    if event_id in request.app["seen"]:
+        stats["webhook_duplicate"] += 1
+    request.app["seen"].add(event_id)
+    print(f"[webhook] event {event_id}: {json.dumps(body['lead'])}")
+    return web.json_response({"ok": True})
+
+
+class SMTPSink:
+    """Just enough of RFC 5321 for smtplib.send_message()."""
+
+    def __init__(self, delay: float, fail_rate: float):
+        self.delay = delay
+        self.fail_rate = fail_rate
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        async def reply(line: str) -> None:
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        await reply("220 outbox-sink ESMTP")
+        recipients = []
+        try:
+            while line := await reader.readline():
+                command = line.decode(errors="replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb in ("EHLO", "HELO"):
+                    await reply("250 outbox-sink")
+                elif verb == "MAIL":
+                    recipients = []
+                    await reply("250 OK")
+                elif verb == "RCPT":
+                    recipients.append(command.split(":", 1)[-1].strip())
+                    await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    while (data := await reader.readline()) not in (b".\r\n", b".\n", b""):
+                        lines.append(data.decode(errors="replace").rstrip("\r\n"))
+                    await asyncio.sleep(self.delay)
+                    if random.random() < self.fail_rate:
+                        stats["email_failed"] += 1
+                        print(f"[smtp] to {', '.join(recipients)}: simulated failure")
+                        await reply("451 Try again later")
+                        continue
+                    stats["email"] += 1
+                    subject = next((l for l in lines if l.startswith("Subject:")), "Subject: -")
+                    print(f"[smtp] to {', '.join(recipients)}: {subject}")
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("250 OK")
+        finally:
+            writer.close()
+
+
+async def main(args: argparse.Namespace) -> None:
+    app = web.Application()
+    app["args"] = args
+    app["seen"] = set()
+    app.router.add_post("/hook", handle_webhook)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, args.host, args.webhook_port).start()
+
+    smtp = await asyncio.start_server(SMTPSink(args.delay, args.fail_rate).handle, args.host, args.smtp_port)
+    print(f"Webhook sink on http://{args.host}:{args.webhook_port}/hook, SMTP sink on {args.host}:{args.smtp_port}")
+    try:
+        async with smtp:
+            await smtp.serve_forever()
+    finally:
+        await runner.cleanup()
+        print(f"Received: {dict(stats)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake webhook/SMTP destinations for the lead outbox.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--webhook-port", type=int, default=8025)
+    parser.add_argument("--smtp-port", type=int, default=1025)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering.")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of deliveries to reject.")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
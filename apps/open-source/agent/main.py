@@ -10,23 +10,74 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
-from core_agent import BusinessAgent
+from core_agent import (
+    AdaptiveEndpointing, AnswerCache, BusinessAgent, ContextManager, ProviderPool, local_embedder, pooled_openai_client,
+    SessionStore, TaskSupervisor, session_id_from_room, start_loop_monitor,
+)
 from livekit import agents, rtc
 from livekit.agents import JobRequest, UserStateChangedEvent
 from livekit.agents import tts
 from livekit.plugins import deepgram, groq, silero, cartesia
+from structured_logging import setup_logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Logging: LiveKit installs the root handlers; prewarm() puts them behind a queue with
+# setup_logging() so job processes never format or write logs on the event loop.
 
 # Get configuration from environment variables
 WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+PROVIDER_KEEPALIVE_INTERVAL = float(os.getenv("PROVIDER_KEEPALIVE_INTERVAL", "30"))
+# Seconds the job-start warm-up may take; it runs beside the setup and never delays it.
+PROVIDER_WARMUP_TIMEOUT = float(os.getenv("PROVIDER_WARMUP_TIMEOUT", "2"))
+# Local SQLite file that caches answers to repeated visitor questions. Set to an empty string to disable.
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "answer_cache.sqlite3")
+ANSWER_CACHE_EMBEDDINGS = os.getenv("ANSWER_CACHE_EMBEDDINGS", "false").lower() == "true"
+# Chat context budget for long sessions: recent turns verbatim, older ones summarized.
+CONTEXT_KEEP_TURNS = int(os.getenv("CONTEXT_KEEP_TURNS", "8"))
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "3000"))
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "300"))
+# Frontend RPC method that receives extracted lead details early. Unset to disable.
+PREFILL_RPC_METHOD = os.getenv("PREFILL_RPC_METHOD")
+# VAD silence before "stopped speaking", and whether the end-of-turn delay adapts per visitor.
+# Adapting needs livekit-agents 1.2.7+; with the pinned 1.2.5 the delay stays fixed (a warning is logged).
+VAD_MIN_SILENCE_DURATION = float(os.getenv("VAD_MIN_SILENCE_DURATION", "0.55"))
+ADAPTIVE_ENDPOINTING = os.getenv("ADAPTIVE_ENDPOINTING", "true").lower() == "true"
+# Opt-in event loop lag/stall logging; SIGUSR1 logs a profile, DIAGNOSTICS_HTTP_PORT serves /lag and /profile.
+LOOP_DIAGNOSTICS = os.getenv("LOOP_DIAGNOSTICS", "false").lower() == "true"
+LOOP_STALL_THRESHOLD_MS = float(os.getenv("LOOP_STALL_THRESHOLD_MS", "100"))
+DIAGNOSTICS_HTTP_PORT = os.getenv("DIAGNOSTICS_HTTP_PORT")
+# Background tasks per session, how long a lead submission waits for a slot, and the drain time at session end.
+SESSION_MAX_TASKS = int(os.getenv("SESSION_MAX_TASKS", "4"))
+SUBMIT_SLOT_TIMEOUT = float(os.getenv("SUBMIT_SLOT_TIMEOUT", "3"))
+TASK_DRAIN_TIMEOUT = float(os.getenv("TASK_DRAIN_TIMEOUT", "5"))
+# Saved state of dropped sessions, resumed on reconnect within the grace seconds. Empty string disables it.
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "session_store.sqlite3")
+SESSION_RESUME_GRACE = float(os.getenv("SESSION_RESUME_GRACE", "120"))
 
 async def entrypoint(ctx: agents.JobContext):
     logging.info(f"Agent received job: {ctx.job.id} for room {ctx.room.name}")
+    if LOOP_DIAGNOSTICS:
+        start_loop_monitor(
+            stall_threshold=LOOP_STALL_THRESHOLD_MS / 1000,
+            http_port=int(DIAGNOSTICS_HTTP_PORT) if DIAGNOSTICS_HTTP_PORT else None,
+        )
     
     session_ended = asyncio.Event()
     greeting_allowed = asyncio.Event()
+    visitor_disconnected = False
+
+    # The frontend keeps its session id across reconnects (and forgets it on hang-up);
+    # pick up where an earlier job left off.
+    session_store = await SessionStore.open(SESSION_STORE_PATH, grace_period=SESSION_RESUME_GRACE) if SESSION_STORE_PATH else None
+    session_id = session_id_from_room(ctx.room.name)
+    resume_state = await session_store.aclaim(session_id) if session_store is not None and session_id else None
+    resumed = False
+    if resume_state:
+        logging.info("Resuming session %s for job %s.", session_id, ctx.job.id, extra={"event": "resume.resumed"})
+
+    # Open the provider connections while the room connection is being set up.
+    providers: ProviderPool = ctx.proc.userdata["providers"]
+    warmup_task = asyncio.create_task(providers.warm_up(timeout=PROVIDER_WARMUP_TIMEOUT))
 
     @ctx.room.on("track_subscribed")
     def on_track_subscribed(track: rtc.Track, publication: rtc.TrackPublication, participant: rtc.RemoteParticipant):
@@ -36,14 +87,14 @@ async def entrypoint(ctx: agents.JobContext):
 
     @ctx.room.on("participant_disconnected")
     def on_participant_disconnected(participant):
+        nonlocal visitor_disconnected
         logging.info(f"Participant disconnected: {participant.identity}, closing session.")
+        visitor_disconnected = True
         session_ended.set()
 
     try:
-        # 1. Build the instructions from the local prompt.template and .env file
-        with open("prompt.template", "r") as f:
-            prompt_template = Template(f.read())
-        
+        # 1. Build the instructions from the prompt.template (read in prewarm) and .env file
+        prompt_template: Template = ctx.proc.userdata["prompt_template"]
         instructions = prompt_template.substitute(
             business_name=os.getenv("BUSINESS_NAME", "the company"),
             knowledge_base=os.getenv("KNOWLEDGE_BASE", "No information provided.")
@@ -52,25 +103,44 @@ async def entrypoint(ctx: agents.JobContext):
         await ctx.connect()
         logging.info("Agent connected to the room.")
 
-                                                # All model initialization and session logic is now safely inside the try block
-        stt = deepgram.STT()
-        llm = groq.LLM(model="llama-3.3-70b-versatile")
-        
         # Use the pre-warmed VAD model from userdata
         vad = ctx.proc.userdata["vad"]
-        
-        # Use the pre-warmed TTS client from the prewarm function
-        tts = ctx.proc.userdata["tts"]
 
         session = agents.AgentSession(
-            stt=stt,
-            llm=llm,
-            tts=tts,
+            stt=providers.stt,
+            llm=providers.llm,
+            tts=providers.tts,
             vad=vad,
             turn_detection="vad",  # Use the simpler, faster, and stable VAD-based turn detection
             user_away_timeout=60,  # Wait for 60 seconds of silence before ending
         )
-        agent = BusinessAgent(instructions=instructions)
+        if ADAPTIVE_ENDPOINTING:
+            AdaptiveEndpointing(session).attach()
+        answer_cache = None
+        if ANSWER_CACHE_PATH:
+            answer_cache = await AnswerCache.open(
+                ANSWER_CACHE_PATH,
+                business_id=os.getenv("BUSINESS_NAME", "the company"),
+                knowledge_base=os.getenv("KNOWLEDGE_BASE"),
+                embedder=ctx.proc.userdata.get("embedder"),
+            )
+        context_manager = ContextManager(
+            summarizer=providers.llm,
+            keep_turns=CONTEXT_KEEP_TURNS,
+            max_tokens=CONTEXT_MAX_TOKENS,
+            summary_max_tokens=CONTEXT_SUMMARY_MAX_TOKENS,
+        )
+        tasks = TaskSupervisor(
+            name=f"job {ctx.job.id}", max_in_flight=SESSION_MAX_TASKS, drain_timeout=TASK_DRAIN_TIMEOUT,
+        )
+        agent = BusinessAgent(
+            instructions=instructions,
+            answer_cache=answer_cache,
+            context_manager=context_manager,
+            prefill_rpc_method=PREFILL_RPC_METHOD,
+            tasks=tasks,
+            resume_state=resume_state,
+        )
 
         @session.on("user_state_changed")
         def on_user_state_changed(ev: UserStateChangedEvent):
@@ -83,7 +153,7 @@ async def entrypoint(ctx: agents.JobContext):
 
         async def submit_lead_form_handler(data: rtc.RpcInvocationData):
             session.interrupt()
-            logging.info(f"Agent received submit_lead_form RPC with payload: {data.payload}")
+            logging.info("Agent received submit_lead_form RPC (%d bytes).", len(data.payload), extra={"event": "rpc.submit_lead_form"})
 
             async def _process_submission():
                 if not WEBHOOK_URL:
@@ -99,37 +169,75 @@ async def entrypoint(ctx: agents.JobContext):
                         headers = {"Content-Type": "application/json"}
                         async with http_session.post(WEBHOOK_URL, headers=headers, json=lead_data) as response:
                             if 200 <= response.status < 300:
-                                logging.info(f"Successfully sent lead data to webhook: {WEBHOOK_URL}")
+                                logging.info("Successfully sent lead data to webhook.", extra={"event": "lead.saved"})
                                 await session.say(
                                     "Thank you. Your information has been sent. Was there anything else I can help you with today?",
                                     allow_interruptions=True
                                 )
                             else:
-                                logging.error(f"Failed to send lead to webhook. Status: {response.status}")
+                                logging.error("Failed to send lead to webhook. Status: %s", response.status)
                                 await session.say("I'm sorry, there was an error sending your information.")
                 except Exception as e:
-                    logging.error(f"Error processing submit_lead_form RPC for webhook: {e}")
+                    logging.error("Error processing submit_lead_form RPC for webhook: %s", e)
                     await session.say("I'm sorry, a technical error occurred.")
 
-            asyncio.create_task(_process_submission())
+            task = await tasks.submit(_process_submission(), name="submit_lead_form", timeout=SUBMIT_SLOT_TIMEOUT)
+            if task is None:
+                raise rtc.RpcError(rtc.RpcError.ErrorCode.APPLICATION_ERROR, "Too many submissions in progress.")
             return "SUCCESS"
 
         await session.start(room=ctx.room, agent=agent)
+        if resume_state:
+            # Resumed for good; it is saved again if this connection drops too.
+            await session_store.adiscard(session_id)
+            resumed = True
         ctx.room.local_participant.register_rpc_method("submit_lead_form", submit_lead_form_handler)
 
+        def on_warmup_done(task: asyncio.Task) -> None:
+            # The warm-up never holds up the RPC handler or the greeting; it is reported when it ends.
+            if task.cancelled() or task.exception() is not None or session_ended.is_set():
+                return
+            logging.info("Provider handshake times (ms) for job %s: %s", ctx.job.id, task.result(), extra={"event": "providers.warmed"})
+            providers.start_keepalive()
+
+        warmup_task.add_done_callback(on_warmup_done)
+
         try:
             await asyncio.wait_for(greeting_allowed.wait(), timeout=20.0)
-            await session.say(f"Thank you for calling {os.getenv('BUSINESS_NAME', 'the company')}. How can I help you today?", allow_interruptions=True)
+            if resume_state:
+                # A resumed visitor is mid-conversation: no greeting, just put the form back if it was up.
+                await agent.redisplay_form()
+            else:
+                await session.say(f"Thank you for calling {os.getenv('BUSINESS_NAME', 'the company')}. How can I help you today?", allow_interruptions=True)
         except asyncio.TimeoutError:
             logging.warning("Timed out waiting for user audio track. Not sending greeting.")
             session_ended.set()
 
         await session_ended.wait()
+        # Let in-flight submissions finish (they may still speak) before closing the session.
+        await tasks.aclose()
+        logging.info("Background tasks for job %s: %s", ctx.job.id, tasks.summary(), extra={"event": "job.tasks"})
+        if session_store is not None and session_id:
+            if visitor_disconnected:
+                await session_store.asave(session_id, agent.snapshot())
+            else:
+                await session_store.adiscard(session_id)
         await session.aclose()
+        await context_manager.aclose()
+        if answer_cache is not None:
+            logging.info("Answer cache for job %s: %s", ctx.job.id, answer_cache.summary(), extra={"event": "job.answer_cache"})
+            await answer_cache.aclose()
 
     except Exception as e:
         logging.error(f"An unhandled error occurred in the entrypoint: {e}", exc_info=True)
+        if resume_state and not resumed:
+            # Let the visitor's next attempt resume it instead.
+            await session_store.arelease(session_id)
     finally:
+        warmup_task.cancel()
+        if session_store is not None:
+            await session_store.aclose()
+        await providers.aclose()
         ctx.shutdown()
 
 async def request_fnc(req: JobRequest):
@@ -140,13 +248,27 @@ def prewarm(proc: agents.JobProcess):
     # This function is called once when a new job process starts.
     # We load environment variables and our stable, local VAD model here.
     load_dotenv()
+    setup_logging()
     logging.info("Prewarm: Environment variables loaded into child process.")
     
-    proc.userdata["vad"] = silero.VAD.load()
+    # Read once per process here, not with a blocking file read inside the job's event loop.
+    with open("prompt.template", "r") as f:
+        proc.userdata["prompt_template"] = Template(f.read())
+
+    proc.userdata["vad"] = silero.VAD.load(min_silence_duration=VAD_MIN_SILENCE_DURATION)
+    if ANSWER_CACHE_EMBEDDINGS:
+        proc.userdata["embedder"] = local_embedder()
     logging.info("Prewarm complete: VAD model loaded.")
     
-    proc.userdata["tts"] = cartesia.TTS(model="sonic-english")
-    logging.info("Prewarm complete: Cartesia TTS client initialized.")
+    llm_client = pooled_openai_client(GROQ_BASE_URL, os.getenv("GROQ_API_KEY"))
+    proc.userdata["providers"] = ProviderPool(
+        stt=deepgram.STT(),
+        llm=groq.LLM(model="llama-3.3-70b-versatile", client=llm_client),
+        tts=cartesia.TTS(model="sonic-english"),
+        llm_client=llm_client,
+        keepalive_interval=PROVIDER_KEEPALIVE_INTERVAL,
+    )
+    logging.info("Prewarm complete: Deepgram, Groq and Cartesia clients initialized.")
 
 if __name__ == "__main__":
     logging.info("Starting InputRight (Open Source) Agent Worker...")
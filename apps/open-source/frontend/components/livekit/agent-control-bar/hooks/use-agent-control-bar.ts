@@ -7,6 +7,7 @@ import {
   useRoomContext,
   useTrackToggle,
 } from '@livekit/components-react';
+import { endConversation } from '@/hooks/useConnectionDetails';
 import { usePublishPermissions } from './use-publish-permissions';
 
 export interface ControlBarControls {
@@ -80,6 +81,8 @@ export function useAgentControlBar(props: UseAgentControlBarProps = {}): UseAgen
   });
 
   const handleDisconnect = React.useCallback(async () => {
+    // An explicit hang-up; a dropped connection keeps the id so the agent can resume.
+    endConversation();
     if (room) {
       await room.disconnect();
     }
@@ -7,6 +7,26 @@ import { useCallback, useEffect, useState } from 'react';
    participantToken: string;
  };
 
+ // Kept in sessionStorage so it survives reloads but not new tabs. The agent only
+ // resumes within its grace window, so an old id simply starts a fresh conversation.
+ // Hanging up forgets it (see endConversation), so a deliberate new call starts over.
+ const CONVERSATION_ID_KEY = 'conversationId';
+
+ function getConversationId(): string {
+   let conversationId = sessionStorage.getItem(CONVERSATION_ID_KEY);
+   if (!conversationId) {
+     conversationId = crypto.randomUUID();
+     sessionStorage.setItem(CONVERSATION_ID_KEY, conversationId);
+   }
+   return conversationId;
+ }
+
+ // Called when the visitor hangs up, as opposed to the connection dropping: the next
+ // call gets a new conversation id, so the agent greets them instead of resuming.
+ export function endConversation(): void {
+   sessionStorage.removeItem(CONVERSATION_ID_KEY);
+ }
+
  export default function useConnectionDetails() {
    const [connectionDetails, setConnectionDetails] = useState<ConnectionDetails | null>(null);
 
@@ -20,9 +40,11 @@ import { useCallback, useEffect, useState } from 'react';
          const livekitUrl = "wss://contractor-leads-bot-d8djm77w.livekit.cloud"; // Your LiveKit URL
          // --- END OF HARDCODED VALUES ---
 
-         // 1. Generate a unique identifier for this specific conversation
-         const conversationId = crypto.randomUUID();
-         const roomName = `${businessId}_${conversationId}`; // Updated room name construction
+         // 1. Reuse this tab's conversation id, so the agent can resume the conversation
+         //    after a dropped connection. Each connection still gets its own room.
+         const conversationId = getConversationId();
+         const connectionId = crypto.randomUUID().slice(0, 8);
+         const roomName = `${businessId}_${conversationId}_${connectionId}`;
 
          const resp = await fetch(`${apiUrl}/api/token`, {
            method: 'POST',
@@ -1,3 +1,4 @@
+import dataclasses
 import os
 import uuid
 import uvicorn
@@ -24,6 +25,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Every visitor token carries the same grants except the room, so the grants are built
+# once and only the room is filled in per request.
+VISITOR_GRANTS = api.VideoGrants(
+    room_join=True,
+    can_publish=True,
+    can_subscribe=True,
+    can_publish_data=True,
+)
+
 class TokenRequest(BaseModel):
     business_id: str
     room_name: str
@@ -40,13 +50,7 @@ async def get_token(request: TokenRequest):
     token = api.AccessToken(LIVEKIT_API_KEY, LIVEKIT_API_SECRET) \
         .with_identity(participant_identity) \
         .with_name("Website Visitor") \
-        .with_grants(api.VideoGrants(
-            room_join=True,
-            room=room_name,
-            can_publish=True,
-            can_subscribe=True,
-            can_publish_data=True,
-        )).to_jwt()
+        .with_grants(dataclasses.replace(VISITOR_GRANTS, room=room_name)).to_jwt()
 
     return {"token": token}
 
@@ -55,4 +59,5 @@ async def root():
     return {"message": "Chat To Form (Open Source) Token Server is running."}
 
 if __name__ == "__main__":
+    # Development server. For production use serve.py (multiple workers, uvloop).
     uvicorn.run(app, host="127.0.0.1", port=8002)
@@ -0,0 +1,51 @@
+"""
+Production entrypoint for the token server.
+
+    python serve.py                 # one worker per CPU core, on uvloop + httptools
+    kill -HUP <serve.py pid>        # rolling restart of the workers, e.g. after an upgrade
+
+Workers are restarted one at a time on SIGHUP and each finishes its in-flight requests
+(up to GRACEFUL_TIMEOUT seconds) before exiting. `python main.py` remains the
+single-process development server.
+
+Environment: HOST (127.0.0.1), PORT (8002), WEB_CONCURRENCY (workers, defaults to the
+usable cores), GRACEFUL_TIMEOUT (20), ACCESS_LOG (false).
+"""
+import importlib.util
+import os
+
+import uvicorn
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def default_workers() -> int:
+    # Minting a token is CPU work (HMAC signing), so use one worker per core this
+    # process may actually run on.
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    # At least two, so a rolling restart always leaves a worker accepting connections.
+    return max(2, cores)
+
+
+if __name__ == "__main__":
+    workers = int(os.getenv("WEB_CONCURRENCY") or default_workers())
+    # uvloop has no Windows support; fall back to the default loop and parser there.
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    print(f"Serving with {workers} workers, loop={loop}, http={http}.")
+
+    uvicorn.run(
+        "main:app",
+        host=os.getenv("HOST", "127.0.0.1"),
+        port=int(os.getenv("PORT", "8002")),
+        workers=workers,
+        loop=loop,
+        http=http,
+        proxy_headers=True,
+        access_log=os.getenv("ACCESS_LOG", "false").lower() == "true",
+        timeout_graceful_shutdown=int(os.getenv("GRACEFUL_TIMEOUT", "20")),
+    )
@@ -1,18 +1,212 @@
 import logging
 import json
+import time
 from livekit import agents, rtc
-from livekit.agents import function_tool, get_job_context
+from livekit.agents import function_tool, get_job_context, llm
+
+from .answer_cache import AnswerCache, local_embedder, is_standalone_question
+from .context import SUMMARY_MESSAGE_ID, ContextManager
+from .diagnostics import LoopMonitor, start_loop_monitor
+from .endpointing import AdaptiveEndpointing
+from .extraction import FormState, TranscriptExtractor
+from .hedging import HedgedLLM, HedgeStats, hedged_stream
+from .providers import ProviderPool, pooled_openai_client
+from .resume import SessionStore, session_id_from_room
+from .routing import RoutedLLM, RoutingPolicy, route_turn, inspect_chat_ctx, is_lead_related
+from .tasks import TaskSupervisor
 
 class BusinessAgent(agents.Agent):
-    def __init__(self, instructions: str):
+    def __init__(
+        self,
+        instructions: str,
+        answer_cache: AnswerCache | None = None,
+        context_manager: ContextManager | None = None,
+        prefill_rpc_method: str | None = None,
+        tasks: TaskSupervisor | None = None,
+        resume_state: dict | None = None,
+    ):
         """
         Initializes the BusinessAgent.
         This agent is now generic and receives its full instructions upon creation.
         It does not know how the instructions were created, only that it must follow them.
+        If an answer cache is given, repeated standalone questions are answered from it
+        without calling the LLM; only answers to a visitor's first question are stored. If a context manager is given, the chat context is kept
+        bounded by summarizing older turns.
+        Name, email and phone are extracted from every final transcript into `form_state`,
+        offered to the LLM as pre-filled tool arguments and, if `prefill_rpc_method` is
+        set, pushed to the frontend with that RPC as soon as they are heard.
+        Background work (the pushes) runs under `tasks`, normally the session's supervisor,
+        which the caller closes. Without one, the agent creates its own and closes it in
+        on_exit().
+        `resume_state` is a `snapshot()` from an earlier job for the same visitor session;
+        the conversation and form continue from where it left off.
         """
-        super().__init__(instructions=instructions)
+        super().__init__(
+            instructions=instructions,
+            chat_ctx=llm.ChatContext.from_dict(resume_state["chat_ctx"]) if resume_state else None,
+        )
         # This flag tracks if the form is active on the user's screen
         self._is_form_displayed = False
+        # The fields last sent to the form, kept so they survive context compaction
+        self._form_fields: dict | None = None
+        self._answer_cache = answer_cache
+        self._context_manager = context_manager
+        self.form_state = FormState()
+        self._extractor = TranscriptExtractor()
+        self._prefill_rpc_method = prefill_rpc_method
+        self._owns_tasks = tasks is None
+        self._tasks = tasks or TaskSupervisor(name="agent")
+        if resume_state:
+            self._restore(resume_state)
+
+    async def on_exit(self) -> None:
+        if self._owns_tasks:
+            await self._tasks.aclose()
+
+    def snapshot(self) -> dict:
+        """The state a later job needs to resume this conversation (see SessionStore)."""
+        # Instructions and per-turn hints are rebuilt by the new job; the summary is not.
+        items = [
+            item for item in self.chat_ctx.items
+            if not (item.type == "message" and item.role in ("system", "developer") and item.id != SUMMARY_MESSAGE_ID)
+        ]
+        return {
+            "chat_ctx": llm.ChatContext(items).to_dict(exclude_timestamp=False),
+            "form_state": self.form_state.as_payload(),
+            "form_fields": self._form_fields,
+            "is_form_displayed": self._is_form_displayed,
+            "summary": self._context_manager.summary if self._context_manager is not None else "",
+        }
+
+    def _restore(self, state: dict) -> None:
+        self.form_state.update(state.get("form_state") or {})
+        self._form_fields = state.get("form_fields")
+        self._is_form_displayed = bool(state.get("is_form_displayed"))
+        if self._context_manager is not None:
+            self._context_manager.summary = state.get("summary") or ""
+
+    def _form_state_text(self) -> str | None:
+        if not self._is_form_displayed or not self._form_fields:
+            return None
+        fields = ", ".join(f"{key}={value!r}" for key, value in self._form_fields.items() if value)
+        return f"The verification form is currently displayed to the user with: {fields}."
+
+    async def _push_prefill(self) -> None:
+        room = get_job_context().room
+        visitor_participant = next(iter(room.remote_participants.values()), None)
+        if not visitor_participant:
+            return
+        try:
+            await room.local_participant.perform_rpc(
+                destination_identity=visitor_participant.identity,
+                method=self._prefill_rpc_method,
+                payload=json.dumps(self.form_state.as_payload()),
+            )
+        except Exception as e:
+            logging.warning("Failed to push pre-filled form fields: %s", e, extra={"event": "rpc.prefill_form_failed"})
+
+    async def redisplay_form(self) -> None:
+        """After a resume, shows the verification form again if it was on screen when the visitor dropped."""
+        if not self._is_form_displayed or not self._form_fields:
+            return
+        room = get_job_context().room
+        visitor_participant = next(iter(room.remote_participants.values()), None)
+        if not visitor_participant:
+            return
+        try:
+            await room.local_participant.perform_rpc(
+                destination_identity=visitor_participant.identity,
+                method="display_lead_form",
+                payload=json.dumps(self._form_fields),
+            )
+        except Exception as e:
+            logging.warning("Failed to redisplay the verification form: %s", e, extra={"event": "rpc.redisplay_form_failed"})
+            self._is_form_displayed = False
+
+    def _extract_form_fields(self, turn_ctx: llm.ChatContext, new_message: llm.ChatMessage) -> None:
+        changed = self.form_state.update(self._extractor.feed(new_message.text_content))
+        if changed:
+            logging.info("Extracted form fields from transcript: %s", sorted(changed), extra={"event": "form.extracted"})
+            if self._prefill_rpc_method and not self._is_form_displayed:
+                # If the supervisor is full this push is dropped; the next one sends every field.
+                self._tasks.spawn(self._push_prefill(), name="push_prefill")
+
+        known = self.form_state.describe()
+        if known and not self._is_form_displayed:
+            # The user message is inserted by timestamp after this hook; dating the hint
+            # just before it keeps the user message last, as the answer cache expects.
+            turn_ctx.add_message(
+                role="system",
+                content=(
+                    f"Details heard from the user so far: {known}. Use them as the arguments to "
+                    f"present_verification_form when it is time to call it, instead of asking again."
+                ),
+                created_at=new_message.created_at - 1e-3,
+            )
+
+    async def on_user_turn_completed(self, turn_ctx: llm.ChatContext, new_message: llm.ChatMessage) -> None:
+        if new_message.text_content:
+            self._extract_form_fields(turn_ctx, new_message)
+        if self._context_manager is not None:
+            await self._context_manager.refresh_form_state(self, turn_ctx, self._form_state_text())
+            self._context_manager.maybe_compact(self, self._form_state_text)
+
+    def _cacheable_question(self, chat_ctx: llm.ChatContext) -> str | None:
+        """Returns the user's question if this turn may be served from (or stored in) the answer cache."""
+        if self._answer_cache is None or self._is_form_displayed:
+            return None
+        if not chat_ctx.items or chat_ctx.items[-1].type != "message" or chat_ctx.items[-1].role != "user":
+            return None
+
+        user_text, assistant_text, lead_in_progress = inspect_chat_ctx(chat_ctx)
+        # Lead capture always goes through the LLM, which decides when to show the form.
+        if lead_in_progress or is_lead_related(user_text, assistant_text):
+            return None
+        return user_text if is_standalone_question(user_text) else None
+
+    def _may_store_answer(self, chat_ctx: llm.ChatContext) -> bool:
+        """
+        Whether the answer generated for this turn may be shared with other visitors.
+
+        The LLM sees the whole conversation, so only answers to the visitor's first
+        question, with nothing heard about them yet (no summary, no form, no extracted
+        details), are free of context-dependent or personal content.
+        """
+        if self.form_state.describe() or self._form_fields:
+            return False
+        user_turns = 0
+        for item in chat_ctx.items:
+            if item.type == "message" and item.id == SUMMARY_MESSAGE_ID:
+                return False
+            if item.type == "message" and item.role == "user":
+                user_turns += 1
+        return user_turns == 1
+
+    async def llm_node(self, chat_ctx, tools, model_settings):
+        question = self._cacheable_question(chat_ctx)
+        if question is not None:
+            answer = await self._answer_cache.alookup(question)
+            if answer is not None:
+                logging.info("Answered from the answer cache.", extra={"event": "answer_cache.hit"})
+                yield answer
+                return
+
+        started_at = time.perf_counter()
+        answer_parts = []
+        called_tool = False
+        async for chunk in agents.Agent.default.llm_node(self, chat_ctx, tools, model_settings):
+            if isinstance(chunk, llm.ChatChunk) and chunk.delta is not None:
+                called_tool = called_tool or bool(chunk.delta.tool_calls)
+                answer_parts.append(chunk.delta.content or "")
+            elif isinstance(chunk, str):
+                answer_parts.append(chunk)
+            yield chunk
+
+        if question is not None and not called_tool and self._may_store_answer(chat_ctx):
+            generation_ms = (time.perf_counter() - started_at) * 1000
+            self._tasks.spawn(
+                self._answer_cache.astore(question, "".join(answer_parts), generation_ms), name="answer_cache.store"
+            )
 
     @function_tool()
     async def present_verification_form(self, name: str, inquiry: str, email: str, phone: str | None = None):
@@ -28,7 +222,10 @@ class BusinessAgent(agents.Agent):
             phone (str, optional): The users phone number. This is optional.
        
         """
-        logging.info(f"LLM triggered present_verification_form with: name='{name}', inquiry='{inquiry}', email='{email}', phone='{phone}'")
+        logging.info(
+            "LLM triggered present_verification_form.",
+            extra={"event": "tool.present_verification_form", "fields": {"name": name, "inquiry": inquiry, "email": email, "phone": phone}},
+        )
 
         ctx = get_job_context()
         room = ctx.room
@@ -52,9 +249,11 @@ class BusinessAgent(agents.Agent):
                 method="display_lead_form",
                 payload=json.dumps(payload)
             )
-            logging.info(f"Successfully sent RPC to {visitor_participant.identity}")
+            logging.info("Successfully sent RPC to %s", visitor_participant.identity, extra={"event": "rpc.display_lead_form"})
             self._is_form_displayed = True # Set the flag to True
+            self._form_fields = payload
+            self.form_state.update(payload)
             return "The verification form was successfully displayed to the user."
         except Exception as e:
-            logging.error(f"Failed to send RPC: {e}")
+            logging.error("Failed to send RPC: %s", e)
             return "Error: There was a technical problem displaying the form to the user."
\ No newline at end of file
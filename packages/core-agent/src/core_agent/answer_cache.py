@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable
+
+import numpy as np
+
+# Words that do not change what is being asked ("um, so what are your hours please").
+_FILLER_WORDS = {
+    "um", "uh", "erm", "hmm", "so", "well", "please", "hi", "hello", "hey",
+    "okay", "ok", "actually", "basically",
+}
+# Request phrasing in front of the actual question ("can you tell me what your hours are").
+# Only stripped as a whole leading phrase; the same words elsewhere carry meaning.
+_LEAD_IN_RE = re.compile(r"^((can|could) you (just )?tell me|i (just )?(wanted|want) to know|do you know) ")
+# Openers that refer back to earlier turns; the answer depends on context we don't key on.
+_FOLLOW_UP_RE = re.compile(r"^(and|but|also|what about|how about|that|it|yes|no|yeah|nope|sure)\b")
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_question(text: str) -> str:
+    """Lowercases, strips punctuation and filler words so trivially different phrasings share a key."""
+    words = _PUNCTUATION_RE.sub(" ", text.lower()).split()
+    return _LEAD_IN_RE.sub("", " ".join(word for word in words if word not in _FILLER_WORDS))
+
+
+def is_standalone_question(text: str) -> bool:
+    """Only questions that make sense without the rest of the conversation are cached."""
+    lowered = text.lower().strip()
+    return len(lowered.split()) >= 3 and not _FOLLOW_UP_RE.match(lowered)
+
+
+def knowledge_base_fingerprint(knowledge_base: str | None) -> str:
+    return hashlib.sha256((knowledge_base or "").encode("utf-8")).hexdigest()[:16]
+
+
+def local_embedder() -> Callable[[str], list[float]] | None:
+    """
+    Returns a local sentence-embedding function if `fastembed` is installed, else None.
+    Without an embedder the cache only matches on the normalized question text.
+    """
+    try:
+        from fastembed import TextEmbedding
+    except ImportError:
+        return None
+
+    model = TextEmbedding("BAAI/bge-small-en-v1.5")
+    return lambda text: next(iter(model.embed([text]))).tolist()
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        path: str,
+        business_id: str,
+        knowledge_base: str | None,
+        ttl: float = 24 * 3600,
+        embedder: Callable[[str], list[float]] | None = None,
+        similarity_threshold: float = 0.92,
+        max_entries: int = 500,
+    ):
+        """
+        Per-business cache of answers to standalone visitor questions.
+
+        Entries are stored in a local SQLite file so every job process on the host shares
+        them. They are keyed by business, a fingerprint of the business's knowledge base
+        and the normalized question, so editing the knowledge base invalidates them.
+        With an `embedder`, near-duplicate questions above `similarity_threshold`
+        (cosine) are also served from the cache. Once a business has `max_entries`
+        answers, storing a new one evicts the oldest.
+
+        The constructor, lookup(), store() and close() block on SQLite (and the
+        embedder); from the event loop, use open(), alookup(), astore() and aclose(),
+        which run them in a worker thread.
+        """
+        self.business_id = business_id
+        self.kb_hash = knowledge_base_fingerprint(knowledge_base)
+        self.ttl = ttl
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        # Sum of the LLM generation time recorded for every answer served from cache.
+        self.latency_saved_ms = 0.0
+
+        # One connection, used from worker threads one call at a time.
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        try:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " business_id TEXT NOT NULL, kb_hash TEXT NOT NULL, question_key TEXT NOT NULL,"
+                " answer TEXT NOT NULL, embedding BLOB, generation_ms REAL NOT NULL, created_at REAL NOT NULL,"
+                " PRIMARY KEY (business_id, kb_hash, question_key))"
+            )
+            # Anything cached against an older version of the knowledge base is stale.
+            self._db.execute(
+                "DELETE FROM answers WHERE business_id = ? AND (kb_hash != ? OR created_at < ?)",
+                (business_id, self.kb_hash, time.time() - ttl),
+            )
+        except sqlite3.Error:
+            self._db.close()
+            raise
+        self._vectors: tuple[list[str], np.ndarray] | None = None
+
+    @classmethod
+    async def open(cls, path: str, **kwargs) -> "AnswerCache | None":
+        """
+        Creates the cache in a worker thread. The cache is only an optimization, so if
+        the file cannot be opened (e.g. other job processes keep it locked past the
+        timeout), this logs a warning and returns None instead of raising.
+        """
+        try:
+            return await asyncio.to_thread(cls, path, **kwargs)
+        except sqlite3.Error as e:
+            logging.warning("Answer cache unavailable, continuing without it: %s", e, extra={"event": "answer_cache.unavailable"})
+            return None
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.embedder(text), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _load_vectors(self) -> tuple[list[str], np.ndarray]:
+        if self._vectors is None:
+            rows = self._db.execute(
+                "SELECT question_key, embedding FROM answers"
+                " WHERE business_id = ? AND kb_hash = ? AND embedding IS NOT NULL",
+                (self.business_id, self.kb_hash),
+            ).fetchall()
+            keys = [row[0] for row in rows]
+            matrix = np.array([np.frombuffer(row[1], dtype=np.float32) for row in rows]) if rows else np.empty((0, 0))
+            self._vectors = (keys, matrix)
+        return self._vectors
+
+    def _fetch(self, question_key: str) -> tuple[str, float] | None:
+        return self._db.execute(
+            "SELECT answer, generation_ms FROM answers"
+            " WHERE business_id = ? AND kb_hash = ? AND question_key = ? AND created_at >= ?",
+            (self.business_id, self.kb_hash, question_key, time.time() - self.ttl),
+        ).fetchone()
+
+    def lookup(self, question: str) -> str | None:
+        key = normalize_question(question)
+        with self._lock:
+            try:
+                return self._lookup(key)
+            except sqlite3.Error as e:
+                # A locked or broken cache file only means this turn goes to the LLM.
+                logging.warning("Answer cache lookup failed: %s", e, extra={"event": "answer_cache.error"})
+                self.misses += 1
+                return None
+
+    def _lookup(self, key: str) -> str | None:
+        row = self._fetch(key) if key else None
+
+        if row is None and key and self.embedder is not None:
+            keys, matrix = self._load_vectors()
+            if keys:
+                scores = matrix @ self._embed(key)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity_threshold:
+                    row = self._fetch(keys[best])
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.latency_saved_ms += row[1]
+        return row[0]
+
+    def store(self, question: str, answer: str, generation_ms: float) -> None:
+        key = normalize_question(question)
+        if not key or not answer.strip():
+            return
+
+        with self._lock:
+            embedding = self._embed(key).tobytes() if self.embedder is not None else None
+            try:
+                self._evict()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (self.business_id, self.kb_hash, key, answer, embedding, generation_ms, time.time()),
+                )
+            except sqlite3.OperationalError as e:
+                # Another process holding the write lock is not worth stalling a turn for.
+                logging.warning("Could not store answer in cache: %s", e)
+                return
+            self._vectors = None
+
+    def _evict(self) -> None:
+        """Makes room for one more entry: drops expired answers, then the oldest beyond max_entries."""
+        self._db.execute(
+            "DELETE FROM answers WHERE business_id = ? AND created_at < ?",
+            (self.business_id, time.time() - self.ttl),
+        )
+        count = self._db.execute(
+            "SELECT count(*) FROM answers WHERE business_id = ? AND kb_hash = ?",
+            (self.business_id, self.kb_hash),
+        ).fetchone()[0]
+        if count >= self.max_entries:
+            self._db.execute(
+                "DELETE FROM answers WHERE rowid IN ("
+                " SELECT rowid FROM answers WHERE business_id = ? AND kb_hash = ? ORDER BY created_at LIMIT ?)",
+                (self.business_id, self.kb_hash, count - self.max_entries + 1),
+            )
+
+    async def alookup(self, question: str) -> str | None:
+        return await asyncio.to_thread(self.lookup, question)
+
+    async def astore(self, question: str, answer: str, generation_ms: float) -> None:
+        await asyncio.to_thread(self.store, question, answer, generation_ms)
+
+    def summary(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 3),
+            "latency_saved_ms": round(self.latency_saved_ms, 1),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    async def aclose(self) -> None:
+        await asyncio.to_thread(self.close)
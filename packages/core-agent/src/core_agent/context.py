@@ -0,0 +1,193 @@
+import asyncio
+import logging
+from typing import Callable
+
+from livekit.agents import llm
+
+SUMMARY_MESSAGE_ID = "context_manager.summary"
+FORM_STATE_MESSAGE_ID = "context_manager.form_state"
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a website visitor and a "
+    "business's digital receptionist. Update the existing summary with the new messages. "
+    "Keep every fact the receptionist may need later: what the visitor asked, answers given, "
+    "and any name, email, phone number or inquiry the visitor shared. "
+    "Reply with the updated summary only, in at most {max_words} words."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text.
+    return len(text) // 4 + 1
+
+
+def _item_text(item) -> str:
+    if item.type == "message":
+        return f"{item.role}: {item.text_content or ''}"
+    if item.type == "function_call":
+        return f"assistant called {item.name}({item.arguments})"
+    if item.type == "function_call_output":
+        return f"tool result: {item.output}"
+    return ""
+
+
+def _with_form_state(items: list, form_state: str | None) -> list | None:
+    """`items` with the form state message replaced by `form_state` (or dropped), or None if it is current."""
+    for index, item in enumerate(items):
+        if item.id == FORM_STATE_MESSAGE_ID:
+            if item.text_content == form_state:
+                return None
+            replacement = [llm.ChatMessage(role="system", id=FORM_STATE_MESSAGE_ID, content=[form_state])] if form_state else []
+            return items[:index] + replacement + items[index + 1:]
+    return None
+
+
+def _is_preserved(item) -> bool:
+    """Instructions (and our own summary/form messages, which are rebuilt) are never summarized."""
+    return item.type == "message" and item.role in ("system", "developer")
+
+
+class ContextManager:
+    def __init__(
+        self,
+        summarizer: llm.LLM,
+        keep_turns: int = 8,
+        max_tokens: int = 3000,
+        summary_max_tokens: int = 300,
+        compact_every: int = 4,
+    ):
+        """
+        Keeps a BusinessAgent's chat context bounded for long sessions.
+
+        The system instructions, the current form state and the last `keep_turns` user
+        turns (with everything after them) are kept verbatim. Older turns are folded
+        into a rolling summary by `summarizer`. Compaction runs as a background task
+        after a user turn, so it never delays a reply. It starts once the session has
+        `compact_every` turns more than `keep_turns`, or the verbatim turns exceed
+        `max_tokens`.
+        """
+        self.summarizer = summarizer
+        self.keep_turns = keep_turns
+        self.max_tokens = max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.compact_every = compact_every
+
+        self.summary = ""
+        self._summarized_ids: set[str] = set()
+        self._task: asyncio.Task | None = None
+
+    def _window_start(self, items: list) -> int:
+        """Index of the first item in the verbatim window (the keep_turns-th user message from the end)."""
+        seen = 0
+        for index in range(len(items) - 1, -1, -1):
+            item = items[index]
+            if item.type == "message" and item.role == "user":
+                seen += 1
+                if seen == self.keep_turns:
+                    return index
+        return 0
+
+    def _conversation(self, chat_ctx: llm.ChatContext) -> list:
+        return [
+            item for item in chat_ctx.items
+            if not _is_preserved(item) and item.id not in self._summarized_ids
+        ]
+
+    def needs_compaction(self, chat_ctx: llm.ChatContext) -> bool:
+        conversation = self._conversation(chat_ctx)
+        user_turns = sum(1 for item in conversation if item.type == "message" and item.role == "user")
+        if user_turns >= self.keep_turns + self.compact_every:
+            return True
+        tokens = sum(estimate_tokens(_item_text(item)) for item in conversation)
+        return tokens > self.max_tokens and user_turns > self.keep_turns
+
+    def build(self, chat_ctx: llm.ChatContext, form_state: str | None = None) -> llm.ChatContext:
+        """
+        Returns the bounded context: instructions, summary, form state, then the verbatim
+        window. Items that have already been summarized are dropped.
+        """
+        preserved = [
+            item for item in chat_ctx.items
+            if _is_preserved(item) and item.id not in (SUMMARY_MESSAGE_ID, FORM_STATE_MESSAGE_ID)
+        ]
+        items = list(preserved)
+        if self.summary:
+            items.append(llm.ChatMessage(
+                role="system", id=SUMMARY_MESSAGE_ID,
+                content=[f"Summary of the earlier conversation: {self.summary}"],
+            ))
+        if form_state:
+            items.append(llm.ChatMessage(role="system", id=FORM_STATE_MESSAGE_ID, content=[form_state]))
+        items.extend(self._conversation(chat_ctx))
+        return llm.ChatContext(items)
+
+    async def _summarize(self, old_items: list) -> str:
+        transcript = "\n".join(_item_text(item) for item in old_items)
+        prompt = llm.ChatContext()
+        prompt.add_message(
+            role="system",
+            content=SUMMARY_PROMPT.format(max_words=int(self.summary_max_tokens * 0.75)),
+        )
+        prompt.add_message(
+            role="user",
+            content=f"Existing summary:\n{self.summary or '(none)'}\n\nNew messages:\n{transcript}",
+        )
+
+        parts = []
+        async with self.summarizer.chat(chat_ctx=prompt) as stream:
+            async for chunk in stream:
+                if chunk.delta and chunk.delta.content:
+                    parts.append(chunk.delta.content)
+        # Hard cap in case the model ignores the word limit.
+        return "".join(parts).strip()[: self.summary_max_tokens * 4]
+
+    async def refresh_form_state(self, agent, turn_ctx: llm.ChatContext, form_state: str | None) -> None:
+        """
+        Keeps the form state message written at the last compaction current. It is
+        replaced with `form_state`, or dropped once no form is displayed (e.g. after
+        submission), in both this turn's context and the agent's.
+        """
+        items = _with_form_state(list(turn_ctx.items), form_state)
+        if items is None:
+            return
+        turn_ctx.items[:] = items
+        agent_items = _with_form_state(list(agent.chat_ctx.items), form_state)
+        if agent_items is not None:
+            await agent.update_chat_ctx(llm.ChatContext(agent_items))
+
+    async def _compact(self, agent, form_state: Callable[[], str | None]) -> None:
+        conversation = self._conversation(agent.chat_ctx)
+        start = self._window_start(conversation)
+        old_items = conversation[:start]
+        if not old_items:
+            return
+
+        self.summary = await self._summarize(old_items)
+        self._summarized_ids.update(item.id for item in old_items)
+
+        # Rebuild from the agent's *current* context, so turns that happened while
+        # the summary was being generated are kept.
+        await agent.update_chat_ctx(self.build(agent.chat_ctx, form_state()))
+        logging.info("Compacted chat context: summarized %d items.", len(old_items), extra={"event": "context.compacted"})
+
+    def maybe_compact(self, agent, form_state: Callable[[], str | None] = lambda: None) -> None:
+        """
+        Schedules a background compaction of the agent's context if it is over budget.
+        `form_state` is called when the compacted context is built, so it reflects the
+        form as it is then rather than when the compaction started.
+        """
+        if self._task is not None and not self._task.done():
+            return
+        if not self.needs_compaction(agent.chat_ctx):
+            return
+        self._task = asyncio.create_task(self._compact(agent, form_state))
+        self._task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            # The context simply stays larger until the next attempt.
+            logging.warning("Chat context compaction failed: %s", task.exception(), extra={"event": "context.compaction_failed"})
+
+    async def aclose(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
@@ -0,0 +1,241 @@
+import asyncio
+import json
+import logging
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger("core_agent.diagnostics")
+
+
+def _frame_stack(frame) -> str:
+    return "".join(traceback.format_stack(frame))
+
+
+def _folded(frame) -> str:
+    """Collapses a frame into a `outer;inner;innermost` line, as used by flame graph tools."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class LoopMonitor:
+    def __init__(
+        self,
+        interval: float = 0.05,
+        stall_threshold: float = 0.1,
+        report_interval: float = 60.0,
+        http_port: int | None = None,
+        profile_signal: int | None = getattr(signal, "SIGUSR1", None),
+        profile_seconds: float = 5.0,
+    ):
+        """
+        Watches the event loop of an agent process for stalls.
+
+        A probe task wakes up every `interval` seconds and records how late it was
+        (the loop lag). A watchdog thread checks the probe's heartbeat. When the loop
+        has not come back for `stall_threshold` seconds, it logs the loop thread's
+        stack and the task that is running, while the blocking code is still on the stack.
+
+        A sampling profile of the loop thread can be taken without restarting the
+        process. Send `profile_signal` (SIGUSR1 by default) to log the hottest stacks
+        over `profile_seconds`, or use the optional local HTTP endpoint:
+        `GET /profile?seconds=5` returns folded stacks and `GET /lag` returns JSON stats.
+        """
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.report_interval = report_interval
+        self.http_port = http_port
+        self.profile_signal = profile_signal
+        self.profile_seconds = profile_seconds
+
+        self.lags: list[float] = []
+        self.max_lag = 0.0
+        self.stalls = 0
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._heartbeat = time.monotonic()
+        self._probe_task: asyncio.Task | None = None
+        self._stop = threading.Event()
+        self._watchdog: threading.Thread | None = None
+        self._http_server: ThreadingHTTPServer | None = None
+        self._profiling = threading.Lock()
+
+    # --- Loop lag ---
+
+    async def _probe(self) -> None:
+        last_report = time.monotonic()
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag = max(0.0, now - expected)
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+            if now - last_report >= self.report_interval:
+                logger.info("Event loop lag: %s", self.summary(), extra={"event": "diagnostics.loop_lag"})
+                self.lags.clear()
+                self.max_lag = 0.0
+                last_report = now
+
+    # --- Stall watchdog ---
+
+    def _current_task_name(self) -> str | None:
+        # Reading the running task from another thread is racy but harmless for a log line.
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            return None
+        return f"{task.get_name()} {task.get_coro()!r}"
+
+    def _watch(self) -> None:
+        reported_for = None
+        while not self._stop.wait(self.stall_threshold / 2):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat - self.interval
+            if stalled_for < self.stall_threshold or reported_for == heartbeat:
+                continue
+            # One report per stall, captured while the blocking code is still running.
+            reported_for = heartbeat
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = _frame_stack(frame) if frame is not None else "(no frame)"
+            logger.warning(
+                "Event loop blocked for %.0fms+ (task: %s). Loop thread stack:\n%s",
+                stalled_for * 1000, self._current_task_name(), stack, extra={"event": "diagnostics.loop_stall"},
+            )
+
+    # --- Sampling profiler ---
+
+    def profile(self, seconds: float | None = None, sample_interval: float = 0.005) -> Counter:
+        """
+        Samples the loop thread's stack for `seconds` and returns folded stack counts.
+        Blocks the caller. Samples lean towards points where the loop releases the GIL
+        (its `select` call), so use the output to find hot code, not for exact shares.
+        """
+        seconds = seconds or self.profile_seconds
+        samples: Counter = Counter()
+        with self._profiling:
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    samples[_folded(frame)] += 1
+                time.sleep(sample_interval)
+        return samples
+
+    def _log_profile(self) -> None:
+        samples = self.profile()
+        total = sum(samples.values()) or 1
+        lines = [f"{count / total:6.1%}  {stack}" for stack, count in samples.most_common(15)]
+        logger.info(
+            "Event loop profile (%d samples over %ss):\n%s", total, self.profile_seconds, "\n".join(lines),
+            extra={"event": "diagnostics.profile"},
+        )
+
+    def _on_profile_signal(self) -> None:
+        # Sample from a thread: the loop has to keep running to be profiled.
+        if not self._profiling.locked():
+            threading.Thread(target=self._log_profile, name="loop-profiler", daemon=True).start()
+
+    def _start_http(self) -> None:
+        monitor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/lag":
+                    body, content_type = json.dumps(monitor.summary()).encode(), "application/json"
+                elif url.path == "/profile":
+                    seconds = float(parse_qs(url.query).get("seconds", [monitor.profile_seconds])[0])
+                    samples = monitor.profile(min(seconds, 60.0))
+                    body = "\n".join(f"{stack} {count}" for stack, count in samples.most_common()).encode()
+                    content_type = "text/plain"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args, extra={"event": "diagnostics.http_request"})
+
+        try:
+            # Loopback only: stacks can contain visitor data.
+            self._http_server = ThreadingHTTPServer(("127.0.0.1", self.http_port), Handler)
+        except OSError as e:
+            logger.warning("Diagnostics HTTP endpoint not started on port %s: %s", self.http_port, e)
+            return
+        threading.Thread(target=self._http_server.serve_forever, name="diagnostics-http", daemon=True).start()
+        logger.info("Diagnostics HTTP endpoint on http://127.0.0.1:%d", self._http_server.server_address[1])
+
+    # --- Lifecycle ---
+
+    def start(self) -> None:
+        """Starts monitoring the running event loop. Must be called from the loop's thread."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._probe_task = asyncio.create_task(self._probe(), name="loop-monitor-probe")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+        if self.profile_signal is not None:
+            try:
+                self._loop.add_signal_handler(self.profile_signal, self._on_profile_signal)
+            except (NotImplementedError, RuntimeError, ValueError) as e:
+                logger.warning("Profile signal handler not installed: %s", e)
+        if self.http_port is not None:
+            self._start_http()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+        if self.profile_signal is not None and self._loop is not None and not self._loop.is_closed():
+            self._loop.remove_signal_handler(self.profile_signal)
+        if self._http_server is not None:
+            self._http_server.shutdown()
+            self._http_server.server_close()
+
+    def summary(self) -> dict:
+        lags = sorted(self.lags)
+        return {
+            "samples": len(lags),
+            "p50_ms": round(lags[len(lags) // 2] * 1000, 1) if lags else None,
+            "p99_ms": round(lags[int(len(lags) * 0.99)] * 1000, 1) if lags else None,
+            "max_ms": round(self.max_lag * 1000, 1),
+            "stalls": self.stalls,
+        }
+
+
+_monitor: LoopMonitor | None = None
+
+
+def start_loop_monitor(**kwargs) -> LoopMonitor:
+    """
+    Starts one LoopMonitor per process on the running loop and returns it. Later calls
+    from the same loop return the existing monitor, so it is safe to call from every job.
+    """
+    global _monitor
+    loop = asyncio.get_running_loop()
+    if _monitor is not None and _monitor._loop is loop:
+        return _monitor
+    if _monitor is not None:
+        _monitor.stop()
+    _monitor = LoopMonitor(**kwargs)
+    _monitor.start()
+    return _monitor
@@ -0,0 +1,139 @@
+import inspect
+import logging
+import re
+import time
+
+# Assistant questions that expect a short, direct answer.
+_DIRECT_QUESTION_RE = re.compile(
+    r"\b(what'?s|what is|can i (get|have)|could i (get|have)|may i (get|have))\b.*"
+    r"\b(name|email|e-mail|phone|number|address|postcode|zip)\b.*\?\s*$",
+    re.IGNORECASE,
+)
+
+
+def _accepts_endpointing_delay(session) -> bool:
+    try:
+        parameters = inspect.signature(session.update_options).parameters
+    except (AttributeError, TypeError, ValueError):
+        return False
+    return "min_endpointing_delay" in parameters or any(
+        parameter.kind is inspect.Parameter.VAR_KEYWORD for parameter in parameters.values()
+    )
+
+
+class AdaptiveEndpointing:
+    def __init__(
+        self,
+        session,
+        base_delay: float = 0.5,
+        min_delay: float = 0.25,
+        max_delay: float = 1.2,
+        question_factor: float = 0.6,
+        pause_margin: float = 1.4,
+        smoothing: float = 0.3,
+        cutoff_window: float = 1.5,
+    ):
+        """
+        Tunes the AgentSession's end-of-turn delay to each visitor.
+
+        Pauses between speech segments inside a user turn are measured from VAD user
+        state changes, and the endpointing delay follows a smoothed estimate of them
+        (times `pause_margin`). Fast talkers get a shorter delay and slow talkers a
+        longer one. If the visitor starts speaking again within `cutoff_window`
+        seconds of being cut off, the delay grows. Right after the agent asks a direct
+        question ("what's your email?"), the next turn uses `question_factor` times
+        the delay.
+
+        Needs a livekit-agents whose AgentSession.update_options() takes
+        `min_endpointing_delay` (1.2.7+; the pinned 1.2.5 takes nothing). On older releases
+        attach() logs a warning and leaves the session's fixed delay in place.
+        """
+        self.session = session
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.question_factor = question_factor
+        self.pause_margin = pause_margin
+        self.smoothing = smoothing
+        self.cutoff_window = cutoff_window
+
+        self.delay = base_delay
+        self.pause_estimate: float | None = None
+        self.false_cutoffs = 0
+        self._after_question = False
+        self._applied: float | None = None
+        self._user_stopped_at: float | None = None
+        self._agent_replied_at: float | None = None
+        self.supported = _accepts_endpointing_delay(session)
+
+    def attach(self) -> None:
+        if not self.supported:
+            logging.warning(
+                "Adaptive endpointing is disabled: this livekit-agents AgentSession.update_options() "
+                "does not accept min_endpointing_delay.", extra={"event": "endpointing.unsupported"},
+            )
+            return
+        self.session.on("user_state_changed", self._on_user_state_changed)
+        self.session.on("agent_state_changed", self._on_agent_state_changed)
+        self.session.on("conversation_item_added", self._on_conversation_item_added)
+        self._apply()
+
+    def _clamp(self, value: float) -> float:
+        return max(self.min_delay, min(self.max_delay, value))
+
+    def _apply(self) -> None:
+        if not self.supported:
+            return
+        delay = self._clamp(self.delay * (self.question_factor if self._after_question else 1.0))
+        if self._applied is not None and abs(delay - self._applied) < 0.02:
+            return
+        self.session.update_options(min_endpointing_delay=delay)
+        self._applied = delay
+        logging.debug("Endpointing delay set to %.2fs", delay, extra={"event": "endpointing.delay"})
+
+    def _on_user_state_changed(self, ev) -> None:
+        now = time.monotonic()
+        if ev.new_state == "listening" and ev.old_state == "speaking":
+            self._user_stopped_at = now
+            return
+        if ev.new_state != "speaking":
+            return
+
+        if self._agent_replied_at is not None and now - self._agent_replied_at < self.cutoff_window:
+            # The agent took the turn and the visitor carried on: we cut them off.
+            self.false_cutoffs += 1
+            self.delay = self._clamp(self.delay * 1.25)
+            self._agent_replied_at = None
+        elif self._user_stopped_at is not None and self._agent_replied_at is None:
+            # Resumed within the same turn: that gap is one of the visitor's natural pauses.
+            pause = now - self._user_stopped_at
+            if pause < self.max_delay * 2:
+                if self.pause_estimate is None:
+                    self.pause_estimate = pause
+                else:
+                    self.pause_estimate += self.smoothing * (pause - self.pause_estimate)
+                self.delay = self._clamp(self.pause_estimate * self.pause_margin)
+        self._user_stopped_at = None
+        self._apply()
+
+    def _on_agent_state_changed(self, ev) -> None:
+        if ev.new_state == "thinking":
+            self._agent_replied_at = time.monotonic()
+            self._user_stopped_at = None
+        elif ev.new_state == "listening":
+            self._agent_replied_at = None
+
+    def _on_conversation_item_added(self, ev) -> None:
+        item = ev.item
+        if getattr(item, "role", None) == "assistant":
+            self._after_question = bool(_DIRECT_QUESTION_RE.search(item.text_content or ""))
+        elif getattr(item, "role", None) == "user":
+            self._after_question = False
+        self._apply()
+
+    def summary(self) -> dict:
+        return {
+            "delay": round(self._applied or self.delay, 3),
+            "pause_estimate": round(self.pause_estimate, 3) if self.pause_estimate is not None else None,
+            "false_cutoffs": self.false_cutoffs,
+            "supported": self.supported,
+        }
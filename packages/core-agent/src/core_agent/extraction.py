@@ -0,0 +1,134 @@
+import re
+from dataclasses import asdict, dataclass
+
+_NUMBER_WORDS = {
+    "zero": "0", "oh": "0", "o": "0", "one": "1", "two": "2", "three": "3", "four": "4",
+    "five": "5", "six": "6", "seven": "7", "eight": "8", "nine": "9",
+}
+_REPEAT_WORDS = {"double": 2, "triple": 3}
+# How people read out email addresses, mapped to the characters they mean.
+_SPOKEN_SYMBOLS = [
+    (re.compile(r"\s+(?:at sign|at)\s+"), "@"),
+    (re.compile(r"\s+(?:dot|period|point)\s+"), "."),
+    (re.compile(r"\s+underscore\s+"), "_"),
+    (re.compile(r"\s+(?:dash|hyphen)\s+"), "-"),
+]
+# Runs of single letters/digits separated by spaces: "j o h n" -> "john".
+_SPELLED_RE = re.compile(r"\b(?:[a-z0-9] ){2,}[a-z0-9]\b")
+# The domain must start with a letter, so speech like
+# "the house at 5 dot com" is not taken for an address.
+_EMAIL_RE = re.compile(r"[a-z0-9][a-z0-9._%+-]*@[a-z][a-z0-9-]+(?:\.[a-z0-9-]+)*\.[a-z]{2,}")
+_PHONE_RE = re.compile(r"\+?\d[\d\s().-]{5,}\d")
+# A run of 7 to 9 digits is only taken for a phone number when one of these is in the
+# same window; otherwise it is as likely a street number, order number or postcode.
+_PHONE_CONTEXT_RE = re.compile(r"\b(?:phone|number|call me|call back|cell|mobile|landline|reach me)\b")
+_NAME_RE = re.compile(
+    r"\b(?i:my name is|my name's|name is|this is|i am|i'm)\s+([A-Z][a-z'-]+(?:\s+[A-Z][a-z'-]+)?)"
+)
+# Capitalized words that follow "this is" / "I'm" without being a name ("This is Friday",
+# "I'm Sorry"), mostly days and states of mind.
+_NAME_STOPWORDS = {
+    "Just", "Looking", "Calling", "Interested", "Not", "Here", "Trying", "Wondering",
+    "Sorry", "Sure", "Fine", "Good", "Great", "Okay", "Ok", "Happy", "Glad", "Afraid", "Still",
+    "Also", "Going", "Having", "Thinking", "Hoping", "Asking", "Really", "Very", "So", "Only",
+    "Actually", "Back", "Ready", "Available", "Free", "Busy", "Done", "New", "Right", "Correct",
+    "The", "A", "An", "It", "That", "What", "About", "In", "On", "At", "From", "With", "Yes", "No",
+    "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday",
+    "Today", "Tomorrow", "Tonight",
+}
+
+
+@dataclass
+class FormState:
+    """The lead details known so far in a session, before the LLM calls present_verification_form."""
+    name: str | None = None
+    email: str | None = None
+    phone: str | None = None
+    inquiry: str | None = None
+
+    def update(self, fields: dict) -> dict:
+        """Applies the non-empty fields and returns the ones that actually changed."""
+        changed = {}
+        for key, value in fields.items():
+            if value and getattr(self, key, None) != value:
+                setattr(self, key, value)
+                changed[key] = value
+        return changed
+
+    def as_payload(self) -> dict:
+        return asdict(self)
+
+    def describe(self) -> str | None:
+        known = ", ".join(f"{key}={value!r}" for key, value in asdict(self).items() if value)
+        return known or None
+
+
+def _spoken_digits(text: str) -> str:
+    """Turns "five five five double one two" into "555112" inside runs of number words."""
+    words = text.split(" ")
+    out = []
+    index = 0
+    while index < len(words):
+        word = words[index]
+        repeat = _REPEAT_WORDS.get(word)
+        if repeat and index + 1 < len(words) and words[index + 1] in _NUMBER_WORDS:
+            out.append(_NUMBER_WORDS[words[index + 1]] * repeat)
+            index += 2
+            continue
+        # "o" and "oh" only count as zero next to other digits ("oh seven seven ...").
+        next_word = words[index + 1] if index + 1 < len(words) else ""
+        next_is_digit = next_word in _REPEAT_WORDS or (next_word in _NUMBER_WORDS and next_word not in ("o", "oh"))
+        if word in _NUMBER_WORDS and (word not in ("o", "oh") or (out and out[-1].isdigit()) or next_is_digit):
+            out.append(_NUMBER_WORDS[word])
+        else:
+            out.append(word)
+        index += 1
+    return " ".join(out)
+
+
+def normalize_spoken(text: str) -> str:
+    """Lowercases a transcript and rewrites spoken emails/numbers into their written form."""
+    text = " ".join(text.lower().replace(",", " ").split())
+    text = _spoken_digits(text)
+    text = _SPELLED_RE.sub(lambda match: match.group(0).replace(" ", ""), text)
+    for pattern, symbol in _SPOKEN_SYMBOLS:
+        text = pattern.sub(symbol, text)
+    return text
+
+
+class TranscriptExtractor:
+    def __init__(self, window: int = 2):
+        """
+        Pulls name, email and phone out of final STT transcripts as they arrive.
+
+        Spoken addresses often span two transcripts ("my email is j o h n" / "at gmail
+        dot com"), so the last `window` transcripts are parsed together. Each call only
+        touches that bounded buffer, so its cost does not grow with the session.
+        """
+        self.window = window
+        self._recent: list[str] = []
+
+    def feed(self, transcript: str) -> dict:
+        """Returns the fields found in the latest transcripts (possibly empty)."""
+        self._recent = (self._recent + [transcript])[-self.window:]
+        raw = " ".join(self._recent)
+        normalized = normalize_spoken(raw)
+
+        fields = {}
+        emails = _EMAIL_RE.findall(normalized.replace(" @", "@").replace("@ ", "@"))
+        if emails:
+            fields["email"] = emails[-1].rstrip(".")
+
+        phone_context = _PHONE_CONTEXT_RE.search(normalized) is not None
+        for candidate in reversed(_PHONE_RE.findall(normalized)):
+            digits = re.sub(r"\D", "", candidate)
+            if 10 <= len(digits) <= 15 or (phone_context and 7 <= len(digits) <= 9):
+                fields["phone"] = ("+" if candidate.startswith("+") else "") + digits
+                break
+
+        # Names rely on capitalization, so they are matched on the raw transcript.
+        for match in _NAME_RE.finditer(raw):
+            name = match.group(1)
+            if name.split()[0].removesuffix("'s") not in _NAME_STOPWORDS:
+                fields["name"] = name
+        return fields
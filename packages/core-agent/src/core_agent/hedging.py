@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable
+
+from livekit.agents import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions, llm
+
+# Keeps references to the background tasks that watch losing streams, so they are
+# not garbage collected before they finish.
+_loser_tasks: set[asyncio.Task] = set()
+
+
+@dataclass
+class HedgeStats:
+    """Counters for a HedgedLLM, shared by every stream it creates."""
+    requests: int = 0
+    hedged: int = 0
+    secondary_wins: int = 0
+    # First-token latency of the stream that won, per request (ms).
+    ttft_ms: list[float] = field(default_factory=list)
+    # For hedged requests where the loser's first token was observed, how much later
+    # it arrived than the winner's (ms). Only collected when `measure_loser` is positive.
+    latency_saved_ms: list[float] = field(default_factory=list)
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedged / self.requests if self.requests else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "requests": self.requests,
+            "hedge_rate": round(self.hedge_rate, 3),
+            "secondary_wins": self.secondary_wins,
+            "latency_saved_ms_total": round(sum(self.latency_saved_ms), 1),
+        }
+
+
+@dataclass
+class _Contender:
+    name: str
+    stream: Any
+    iterator: AsyncIterator
+    first: asyncio.Task
+
+
+async def _next(iterator: AsyncIterator) -> tuple[bool, Any]:
+    try:
+        return True, await iterator.__anext__()
+    except StopAsyncIteration:
+        return False, None
+
+
+def _start(name: str, stream) -> _Contender:
+    iterator = stream.__aiter__()
+    first = asyncio.create_task(_next(iterator))
+    return _Contender(name=name, stream=stream, iterator=iterator, first=first)
+
+
+async def _close(contender: _Contender) -> None:
+    contender.first.cancel()
+    aclose = getattr(contender.stream, "aclose", None)
+    if aclose is not None:
+        try:
+            await aclose()
+        except Exception as e:
+            logging.debug("Error closing losing %s stream: %s", contender.name, e)
+
+
+async def _observe_loser(contender: _Contender, started_at: float, winner_ttft: float, timeout: float, stats: HedgeStats):
+    """Waits (off the critical path) for the loser's first token to measure the latency saved."""
+    try:
+        await asyncio.wait_for(asyncio.shield(contender.first), timeout=timeout)
+        stats.latency_saved_ms.append((time.perf_counter() - started_at - winner_ttft) * 1000)
+    except Exception:
+        pass
+    finally:
+        await _close(contender)
+
+
+async def hedged_stream(
+    primary: Any,
+    secondary_factory: Callable[[], Any],
+    budget: float,
+    stats: HedgeStats,
+    measure_loser: float = 2.0,
+) -> AsyncIterator:
+    """
+    Yields the items of whichever stream produces its first item first.
+
+    `primary` is started immediately. If it has not produced anything within `budget`
+    seconds (or fails before producing anything), `secondary_factory()` is called to
+    start a second stream and both race. The loser is closed as soon as a winner is
+    known, unless `measure_loser` is positive, in which case it is given that many
+    seconds (in the background, never forwarded) to produce a first item so the latency
+    saved can be recorded. Set it to 0 to close losers right away.
+
+    Works with any async iterable, so it can be exercised offline with fake streams.
+    """
+    stats.requests += 1
+    started_at = time.perf_counter()
+    contenders = [_start("primary", primary)]
+
+    done, _ = await asyncio.wait({contenders[0].first}, timeout=budget)
+    if not done or contenders[0].first.exception() is not None:
+        stats.hedged += 1
+        logging.info("LLM hedge fired after %.0fms", (time.perf_counter() - started_at) * 1000, extra={"event": "llm.hedge_fired"})
+        contenders.append(_start("secondary", secondary_factory()))
+
+    winner: _Contender | None = None
+    errors: list[BaseException] = []
+    pending = {c.first for c in contenders}
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for contender in contenders:
+                if contender.first not in done or winner is not None:
+                    continue
+                error = contender.first.exception()
+                if error is None:
+                    winner = contender
+                else:
+                    errors.append(error)
+    except BaseException:
+        for contender in contenders:
+            await _close(contender)
+        raise
+
+    if winner is None:
+        # Both failed before producing anything; close both streams before reporting it.
+        for contender in contenders:
+            await _close(contender)
+        raise errors[0]
+
+    winner_ttft = time.perf_counter() - started_at
+    stats.ttft_ms.append(winner_ttft * 1000)
+    if winner.name == "secondary":
+        stats.secondary_wins += 1
+
+    for loser in contenders:
+        if loser is winner:
+            continue
+        if measure_loser > 0 and not loser.first.done():
+            task = asyncio.create_task(_observe_loser(loser, started_at, winner_ttft, measure_loser, stats))
+            _loser_tasks.add(task)
+            task.add_done_callback(_loser_tasks.discard)
+        else:
+            await _close(loser)
+
+    try:
+        has_item, item = winner.first.result()
+        if not has_item:
+            return
+        yield item
+        async for item in winner.iterator:
+            yield item
+    finally:
+        await _close(winner)
+
+
+class HedgedLLM(llm.LLM):
+    def __init__(
+        self,
+        primary: llm.LLM,
+        secondary: llm.LLM,
+        budget: float = 1.0,
+        measure_loser: float = 2.0,
+    ):
+        """
+        An LLM that can be passed to AgentSession in place of `primary`.
+
+        If the primary's first token has not arrived within `budget` seconds, the same
+        request is sent to `secondary` and the first stream to produce a token is used.
+        Hedge rate and latency saved are collected in `self.stats`; the latter needs the
+        losing stream to run on for up to `measure_loser` seconds after the winner is known.
+        """
+        super().__init__()
+        self.primary = primary
+        self.secondary = secondary
+        self.budget = budget
+        self.measure_loser = measure_loser
+        self.stats = HedgeStats()
+
+    @property
+    def model(self) -> str:
+        return self.primary.model
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: list | None = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        **kwargs,
+    ) -> "HedgedLLMStream":
+        return HedgedLLMStream(
+            self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options, chat_kwargs=kwargs
+        )
+
+    def prewarm(self) -> None:
+        self.primary.prewarm()
+        self.secondary.prewarm()
+
+    async def aclose(self) -> None:
+        await self.primary.aclose()
+        await self.secondary.aclose()
+
+
+class HedgedLLMStream(llm.LLMStream):
+    def __init__(self, hedged_llm: HedgedLLM, *, chat_ctx, tools, conn_options, chat_kwargs: dict):
+        super().__init__(hedged_llm, chat_ctx=chat_ctx, tools=tools, conn_options=conn_options)
+        self._hedged_llm = hedged_llm
+        self._chat_kwargs = chat_kwargs
+
+    def _chat(self, target: llm.LLM) -> llm.LLMStream:
+        return target.chat(
+            chat_ctx=self._chat_ctx,
+            tools=self._tools,
+            conn_options=self._conn_options,
+            **self._chat_kwargs,
+        )
+
+    async def _run(self) -> None:
+        hedged = self._hedged_llm
+        chunks = hedged_stream(
+            self._chat(hedged.primary),
+            lambda: self._chat(hedged.secondary),
+            budget=hedged.budget,
+            stats=hedged.stats,
+            measure_loser=hedged.measure_loser,
+        )
+        try:
+            async for chunk in chunks:
+                self._event_ch.send_nowait(chunk)
+        finally:
+            await chunks.aclose()
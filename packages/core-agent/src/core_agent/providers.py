@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from livekit.agents import utils
+
+if TYPE_CHECKING:
+    import openai
+
+# Hosts the livekit plugins talk to. A request to each of them at job start warms
+# DNS and opens a TLS connection in the shared aiohttp session the plugins use.
+DEFAULT_WARMUP_URLS = {
+    "deepgram": "https://api.deepgram.com",
+    "cartesia": "https://api.cartesia.ai",
+}
+
+
+def pooled_openai_client(
+    base_url: str,
+    api_key: str | None,
+    keepalive_expiry: float = 120.0,
+    max_keepalive_connections: int = 4,
+) -> "openai.AsyncClient":
+    """
+    Builds an OpenAI-compatible client (used by the Groq plugin) whose HTTP pool
+    keeps idle connections open long enough to survive the gaps between turns.
+    `max_keepalive_connections` should cover the requests the caller runs at once
+    (a session has at most a few: reply, hedge, summary); beyond it, connections are
+    closed after use and the next request pays for a new handshake.
+    """
+    # Imported here, not at module level, so importing core_agent in the worker's
+    # supervisor process does not pay for them; only prewarm() calls this.
+    import httpx
+    import openai
+
+    return openai.AsyncClient(
+        api_key=api_key,
+        base_url=base_url,
+        http_client=httpx.AsyncClient(
+            timeout=httpx.Timeout(connect=10.0, read=30.0, write=10.0, pool=5.0),
+            limits=httpx.Limits(max_keepalive_connections=max_keepalive_connections, keepalive_expiry=keepalive_expiry),
+        ),
+    )
+
+
+class ProviderPool:
+    def __init__(
+        self,
+        stt,
+        llm,
+        tts,
+        llm_client: "openai.AsyncClient | None" = None,
+        warmup_urls: dict[str, str] | None = None,
+        keepalive_interval: float = 30.0,
+    ):
+        """
+        Holds the STT, LLM and TTS clients for a job process.
+
+        The clients are created once in prewarm(), before a job is assigned. When the
+        job starts, warm_up() opens the provider connections concurrently with the rest
+        of the setup, so the visitor's first utterance does not pay for DNS and TLS.
+        A keep-alive loop then stops those connections from going cold during pauses.
+        """
+        self.stt = stt
+        self.llm = llm
+        self.tts = tts
+        self.llm_client = llm_client
+        self.warmup_urls = DEFAULT_WARMUP_URLS if warmup_urls is None else warmup_urls
+        self.keepalive_interval = keepalive_interval
+        # Milliseconds spent on the warm-up request for each provider in this job.
+        self.handshake_ms: dict[str, float] = {}
+        self._keepalive_task: asyncio.Task | None = None
+
+    async def _timed(self, name: str, request, record: bool) -> None:
+        started_at = time.perf_counter()
+        try:
+            await request
+        except Exception as e:
+            # A failed warm-up only means the first real request pays the handshake.
+            logging.warning("Warm-up request to %s failed: %s", name, e, extra={"event": "providers.warmup_failed"})
+            return
+        if record:
+            self.handshake_ms[name] = (time.perf_counter() - started_at) * 1000
+
+    async def _ping_all(self, record: bool = False) -> None:
+        http_session = utils.http_context.http_session()
+
+        async def _head(url: str):
+            async with http_session.head(url) as response:
+                await response.read()
+
+        requests = [self._timed(name, _head(url), record) for name, url in self.warmup_urls.items()]
+        if self.llm_client is not None:
+            requests.append(self._timed("llm", self.llm_client.models.list(), record))
+        await asyncio.gather(*requests)
+
+    async def warm_up(self, timeout: float = 2.0) -> dict[str, float]:
+        """
+        Opens connections to every provider and returns the time each one took.
+        Must be called from inside a job, where the shared HTTP session is available.
+
+        Gives up after `timeout` seconds: a provider that slow gains nothing from being
+        warmed, and its first real request pays the handshake instead. Providers that
+        did not answer in time are missing from the result.
+        """
+        for client in (self.stt, self.llm, self.tts):
+            prewarm = getattr(client, "prewarm", None)
+            if prewarm is not None:
+                prewarm()
+
+        try:
+            await asyncio.wait_for(self._ping_all(record=True), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(
+                "Provider warm-up did not finish within %.1fs; warmed: %s",
+                timeout, sorted(self.handshake_ms), extra={"event": "providers.warmup_timeout"},
+            )
+        return dict(self.handshake_ms)
+
+    def start_keepalive(self) -> None:
+        """Re-pings the providers every `keepalive_interval` seconds until aclose()."""
+        if self._keepalive_task is None and self.keepalive_interval > 0:
+            self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+
+    async def _keepalive_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            await self._ping_all()
+
+    async def aclose(self) -> None:
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            try:
+                await self._keepalive_task
+            except asyncio.CancelledError:
+                pass
+            self._keepalive_task = None
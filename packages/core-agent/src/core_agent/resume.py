@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+
+def session_id_from_room(room_name: str) -> str | None:
+    """
+    Room names are "<business_id>_<session_id>_<connection>". The resume key is the room
+    name without the connection part: it survives reconnects, and since the session id
+    is chosen by the browser, scoping it to the business keeps one business's page from
+    picking up another business's conversation.
+    """
+    parts = room_name.split("_")
+    return room_name.rsplit("_", 1)[0] if len(parts) >= 3 else None
+
+
+class SessionStore:
+    def __init__(self, path: str, grace_period: float = 120.0, claim_lease: float = 30.0):
+        """
+        Short-lived local store of session state, keyed by session_id_from_room().
+
+        When a visitor drops off, the job saves the agent's state (chat context, form
+        fields). If the visitor reconnects within `grace_period` seconds, the new job
+        (usually in another process on the same host, hence SQLite rather than memory)
+        claims that state and continues the conversation instead of starting over.
+        Saved state holds the visitor's transcript, so expired rows are deleted on
+        every save and claim, not only when the next store is opened.
+
+        A claim only hides the state from other jobs for `claim_lease` seconds. The job
+        discards it once its session has started, or releases it if setup fails, so a
+        job that dies before starting does not lose the visitor's conversation.
+
+        The constructor and the methods block on SQLite; from the event loop, use
+        open() and the a-prefixed methods, which run them in a worker thread.
+        """
+        self.grace_period = grace_period
+        self.claim_lease = claim_lease
+        # One connection, used from worker threads one call at a time.
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        try:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS resumable_sessions ("
+                " session_id TEXT PRIMARY KEY, state TEXT NOT NULL, saved_at REAL NOT NULL, claimed_at REAL)"
+            )
+            self._purge_expired()
+        except sqlite3.Error:
+            self._db.close()
+            raise
+
+    @classmethod
+    async def open(cls, path: str, **kwargs) -> "SessionStore | None":
+        """
+        Creates the store in a worker thread. Resuming is a convenience, so if the file
+        cannot be opened (e.g. other job processes keep it locked past the timeout), this
+        logs a warning and returns None: the session starts fresh instead of failing.
+        """
+        try:
+            return await asyncio.to_thread(cls, path, **kwargs)
+        except sqlite3.Error as e:
+            logging.warning("Session store unavailable, sessions will not resume: %s", e, extra={"event": "resume.unavailable"})
+            return None
+
+    def _purge_expired(self) -> None:
+        self._db.execute("DELETE FROM resumable_sessions WHERE saved_at < ?", (time.time() - self.grace_period,))
+
+    def save(self, session_id: str, state: dict) -> None:
+        with self._lock:
+            try:
+                self._purge_expired()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO resumable_sessions VALUES (?, ?, ?, NULL)",
+                    (session_id, json.dumps(state), time.time()),
+                )
+            except sqlite3.Error as e:
+                logging.warning("Could not save session %s for resume: %s", session_id, e)
+
+    def claim(self, session_id: str) -> dict | None:
+        """Returns the saved state if it is within the grace period and not claimed by another job."""
+        now = time.time()
+        with self._lock:
+            try:
+                # One transaction, so two jobs for the same session cannot both resume it.
+                self._db.execute("BEGIN IMMEDIATE")
+                self._purge_expired()
+                row = self._db.execute(
+                    "SELECT state FROM resumable_sessions"
+                    " WHERE session_id = ? AND (claimed_at IS NULL OR claimed_at < ?)",
+                    (session_id, now - self.claim_lease),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE resumable_sessions SET claimed_at = ? WHERE session_id = ?", (now, session_id))
+                self._db.execute("COMMIT")
+            except sqlite3.Error as e:
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+                logging.warning("Could not load session %s for resume: %s", session_id, e)
+                return None
+        return json.loads(row[0]) if row is not None else None
+
+    def release(self, session_id: str) -> None:
+        """Gives up a claim without resuming, so the visitor's next attempt can."""
+        with self._lock:
+            try:
+                self._db.execute("UPDATE resumable_sessions SET claimed_at = NULL WHERE session_id = ?", (session_id,))
+            except sqlite3.Error as e:
+                logging.warning("Could not release session %s: %s", session_id, e)
+
+    def discard(self, session_id: str) -> None:
+        with self._lock:
+            try:
+                self._db.execute("DELETE FROM resumable_sessions WHERE session_id = ?", (session_id,))
+            except sqlite3.Error as e:
+                # Left behind, it expires after the grace period.
+                logging.warning("Could not discard session %s: %s", session_id, e)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    async def asave(self, session_id: str, state: dict) -> None:
+        await asyncio.to_thread(self.save, session_id, state)
+
+    async def aclaim(self, session_id: str) -> dict | None:
+        return await asyncio.to_thread(self.claim, session_id)
+
+    async def arelease(self, session_id: str) -> None:
+        await asyncio.to_thread(self.release, session_id)
+
+    async def adiscard(self, session_id: str) -> None:
+        await asyncio.to_thread(self.discard, session_id)
+
+    async def aclose(self) -> None:
+        await asyncio.to_thread(self.close)
@@ -0,0 +1,154 @@
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass, fields
+
+from livekit.agents import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions, llm
+
+# Words that suggest the visitor wants to be contacted, which is where the large
+# model has to decide whether to call `present_verification_form`.
+LEAD_KEYWORDS = (
+    "quote", "estimate", "callback", "call back", "call me", "contact", "reach me",
+    "book", "appointment", "schedule", "visit", "come out", "email", "e-mail",
+    "phone", "number", "my name", "name is", "address", "change", "update", "form",
+)
+
+# Phrasing that usually means the answer needs more than a lookup in the KB.
+REASONING_KEYWORDS = (
+    "why", "compare", "difference", "which is better", "should i", "recommend",
+    "explain", "what if", "and also", "how much would", "depends",
+)
+
+# Questions the assistant asks while collecting lead details. If the last assistant
+# turn asked one of these, the visitor's reply belongs to the lead flow.
+_COLLECTING_RE = re.compile(r"\b(your (name|email|phone|number|address)|what'?s the best)\b", re.IGNORECASE)
+_DIGITS_OR_EMAIL_RE = re.compile(r"@|\d{3,}|\bat\b.*\bdot\b", re.IGNORECASE)
+
+
+@dataclass
+class RoutingPolicy:
+    """Per-business settings for the model cascade. Unknown keys are ignored."""
+    enabled: bool = False
+    small_model: str = "llama-3.1-8b-instant"
+    # User turns longer than this many words always go to the large model.
+    max_simple_words: int = 14
+    lead_keywords: tuple[str, ...] = LEAD_KEYWORDS
+    reasoning_keywords: tuple[str, ...] = REASONING_KEYWORDS
+
+    @classmethod
+    def from_dict(cls, data: dict | None) -> "RoutingPolicy":
+        if not data:
+            return cls()
+        known = {f.name for f in fields(cls)}
+        values = {k: v for k, v in data.items() if k in known}
+        for key in ("lead_keywords", "reasoning_keywords"):
+            if key in values:
+                values[key] = tuple(values[key])
+        return cls(**values)
+
+
+def is_lead_related(user_text: str, last_assistant_text: str, lead_keywords: tuple[str, ...] = LEAD_KEYWORDS) -> bool:
+    """True if a user turn may be part of lead capture and so must reach the LLM with tools."""
+    text = user_text.lower()
+    if _COLLECTING_RE.search(last_assistant_text or ""):
+        return True
+    if _DIGITS_OR_EMAIL_RE.search(text):
+        return True
+    return any(keyword in text for keyword in lead_keywords)
+
+
+def route_turn(user_text: str, last_assistant_text: str, lead_in_progress: bool, policy: RoutingPolicy) -> str:
+    """
+    Decides which model should answer a user turn. Returns "small" or "large".
+
+    Anything that might lead to `present_verification_form` (lead keywords, an email
+    or phone number, a reply to a question asking for contact details, or a form
+    already on screen) and anything that looks like multi-step reasoning is sent
+    to the large model. Short, single questions go to the small one.
+    """
+    if not policy.enabled or lead_in_progress:
+        return "large"
+
+    text = user_text.lower().strip()
+    if not text:
+        return "large"
+    if is_lead_related(text, last_assistant_text, policy.lead_keywords):
+        return "large"
+    if any(keyword in text for keyword in policy.reasoning_keywords):
+        return "large"
+    if len(text.split()) > policy.max_simple_words or text.count("?") > 1:
+        return "large"
+    return "small"
+
+
+def inspect_chat_ctx(chat_ctx: llm.ChatContext) -> tuple[str, str, bool]:
+    """Returns (last user text, last assistant text, lead in progress) for a chat context."""
+    user_text = ""
+    assistant_text = ""
+    lead_in_progress = False
+    for item in chat_ctx.items:
+        if item.type == "function_call" and item.name == "present_verification_form":
+            lead_in_progress = True
+        elif item.type == "message" and item.role == "user":
+            user_text = item.text_content or ""
+        elif item.type == "message" and item.role == "assistant":
+            assistant_text = item.text_content or ""
+
+    # The turn right after a tool call is always answered by the large model.
+    if chat_ctx.items and chat_ctx.items[-1].type == "function_call_output":
+        lead_in_progress = True
+    return user_text, assistant_text, lead_in_progress
+
+
+class RoutedLLM(llm.LLM):
+    def __init__(self, small: llm.LLM, large: llm.LLM, policy: RoutingPolicy, owned: tuple[llm.LLM, ...] = ()):
+        """
+        An LLM that sends each turn to either `small` or `large` according to `policy`.
+        Usage per route is counted in `self.routes`.
+
+        `small` and `large` are usually shared with other jobs in the process, so
+        aclose() only closes the ones listed in `owned`. It always detaches this
+        router from both, and should be called when the job ends.
+        """
+        super().__init__()
+        self.small = small
+        self.large = large
+        self.policy = policy
+        self.routes: Counter = Counter()
+        self._owned = owned
+
+        # The chosen LLM's streams report to that LLM, so forward its metrics to
+        # whoever is listening on this one (the AgentSession).
+        for target in (small, large):
+            target.on("metrics_collected", self._forward_metrics)
+
+    def _forward_metrics(self, metrics) -> None:
+        self.emit("metrics_collected", metrics)
+
+    @property
+    def model(self) -> str:
+        return self.large.model
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: list | None = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        **kwargs,
+    ) -> llm.LLMStream:
+        route = route_turn(*inspect_chat_ctx(chat_ctx), policy=self.policy)
+        self.routes[route] += 1
+        logging.debug("Routing turn to the %s model", route)
+        target = self.small if route == "small" else self.large
+        return target.chat(chat_ctx=chat_ctx, tools=tools, conn_options=conn_options, **kwargs)
+
+    def prewarm(self) -> None:
+        self.small.prewarm()
+        self.large.prewarm()
+
+    async def aclose(self) -> None:
+        for target in (self.small, self.large):
+            target.off("metrics_collected", self._forward_metrics)
+        for target in self._owned:
+            await target.aclose()
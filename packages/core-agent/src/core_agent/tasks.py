@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Coroutine
+
+
+class TaskSupervisor:
+    def __init__(self, name: str = "session", max_in_flight: int = 8, drain_timeout: float = 5.0):
+        """
+        Owns the background tasks a session starts (RPC-triggered work, pushes to the frontend).
+
+        Every task is referenced until it finishes, so it cannot be garbage-collected
+        mid-flight, and its exception is logged instead of being lost. At most
+        `max_in_flight` tasks run at once: `spawn()` refuses new work when full and
+        `submit()` waits for a free slot. `aclose()` stops new work, gives running tasks
+        `drain_timeout` seconds to finish and cancels the rest, so nothing outlives the
+        session.
+        """
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.drain_timeout = drain_timeout
+
+        self.spawned = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.peak_in_flight = 0
+        # Recent task durations, for the summary.
+        self.durations: deque[float] = deque(maxlen=1000)
+
+        self._tasks: dict[asyncio.Task, float] = {}
+        self._slot_freed = asyncio.Event()
+        self._closed = False
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def spawn(self, coro: Coroutine, name: str | None = None) -> asyncio.Task | None:
+        """Starts `coro` if a slot is free. Returns None (and closes the coroutine) if not."""
+        if self._closed or len(self._tasks) >= self.max_in_flight:
+            coro.close()
+            self.rejected += 1
+            logging.warning(
+                "Task supervisor '%s' rejected %s (closed: %s, in flight: %d).",
+                self.name, name or "task", self._closed, len(self._tasks), extra={"event": "tasks.rejected"},
+            )
+            return None
+
+        task = asyncio.create_task(coro, name=name)
+        self._tasks[task] = time.perf_counter()
+        self.spawned += 1
+        self.peak_in_flight = max(self.peak_in_flight, len(self._tasks))
+        task.add_done_callback(self._on_done)
+        return task
+
+    async def submit(self, coro: Coroutine, name: str | None = None, timeout: float | None = None) -> asyncio.Task | None:
+        """Waits up to `timeout` seconds for a free slot, then starts `coro`. Returns None if none freed up."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._closed and len(self._tasks) >= self.max_in_flight:
+            self._slot_freed.clear()
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._slot_freed.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+        return self.spawn(coro, name=name)
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        started_at = self._tasks.pop(task)
+        self.durations.append(time.perf_counter() - started_at)
+        self._slot_freed.set()
+
+        if task.cancelled():
+            self.cancelled += 1
+        elif task.exception() is not None:
+            self.failed += 1
+            logging.error("Background task %s failed", task.get_name(), exc_info=task.exception(), extra={"event": "tasks.failed"})
+        else:
+            self.completed += 1
+
+    async def aclose(self, drain_timeout: float | None = None) -> None:
+        """Refuses new tasks, waits for running ones up to the drain timeout, then cancels the rest."""
+        self._closed = True
+        self._slot_freed.set()
+        if not self._tasks:
+            return
+
+        drain_timeout = self.drain_timeout if drain_timeout is None else drain_timeout
+        _, pending = await asyncio.wait(list(self._tasks), timeout=drain_timeout)
+        if pending:
+            logging.warning(
+                "Task supervisor '%s' cancelling %d tasks still running after %ss.", self.name, len(pending), drain_timeout,
+                extra={"event": "tasks.cancelled"},
+            )
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def summary(self) -> dict:
+        durations = sorted(self.durations)
+        return {
+            "spawned": self.spawned,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "peak_in_flight": self.peak_in_flight,
+            "p50_ms": round(durations[len(durations) // 2] * 1000, 1) if durations else None,
+            "max_ms": round(durations[-1] * 1000, 1) if durations else None,
+        }
@@ -0,0 +1,286 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else on a record was passed with `extra=`.
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Values under these keys, in `extra=` fields at any depth, are never written out.
+PII_KEYS = frozenset({"name", "contact_name", "email", "phone", "phone_number", "address", "inquiry", "payload"})
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+# Runs of 7 to 15 digits, optionally starting with "+" or "(", with spaces, dashes, dots
+# or brackets between them. _is_phone() decides which of these are phone numbers.
+PHONE_RE = re.compile(r"(?<![\w.:+-])\+?\(?\d(?:[\s().-]{0,2}\d){6,14}(?![\w:-]|\.\d)")
+
+# Log arguments of these types cannot change after the log call.
+_IMMUTABLE_ARGS = (str, int, float, bool, bytes, type(None))
+
+# Per-type sampling state is dropped wholesale past this many message types, so call
+# sites that still log f-strings (a new "type" per call) cannot grow it without bound.
+MAX_TRACKED_TYPES = 1000
+
+
+def _is_phone(candidate: str) -> bool:
+    """
+    Separated numbers ("(555) 010-4477", "555.010.4477", "+1 555 010 4477") need 10 to 15
+    digits. Unseparated runs need a "+" (8 to 15 digits), or 10 to 12 digits not starting
+    with 1, which leaves epoch seconds and milliseconds and long numeric IDs alone. A
+    single dot and no other separator is a decimal number, not a phone number.
+    """
+    digits = sum(char.isdigit() for char in candidate)
+    separators = {char for char in candidate.lstrip("+") if not char.isdigit()}
+    if not separators:
+        if candidate.startswith("+"):
+            return 8 <= digits <= 15
+        return 10 <= digits <= 12 and not candidate.startswith("1")
+    if separators == {"."} and candidate.count(".") == 1:
+        return False
+    return 10 <= digits <= 15
+
+
+def redact_text(text: str) -> str:
+    text = EMAIL_RE.sub("[email]", text)
+    return PHONE_RE.sub(lambda match: "[phone]" if _is_phone(match.group(0)) else match.group(0), text)
+
+
+def redact_value(value, key: str | None = None):
+    if key is not None and key.lower() in PII_KEYS:
+        return "[redacted]"
+    if isinstance(value, str):
+        return redact_text(value)
+    if isinstance(value, dict):
+        return {k: redact_value(v, str(k)) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact_value(v) for v in value]
+    return value
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """Parses "rpc.submit_lead_form=1,tool.present_verification_form=0.25" into a dict."""
+    rates = {}
+    for item in spec.split(","):
+        if item.strip():
+            key, _, rate = item.partition("=")
+            rates[key.strip()] = float(rate)
+    return rates
+
+
+class _TypeState:
+    __slots__ = ("seen", "tokens", "refilled_at", "suppressed")
+
+    def __init__(self, tokens: float):
+        self.seen = 0
+        self.tokens = tokens
+        self.refilled_at = time.monotonic()
+        self.suppressed = 0
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, sample_rates: dict[str, float] | None = None, rate_limit: float | None = None):
+        """
+        Thins out high-volume INFO and DEBUG messages before they are queued.
+
+        A record's message type is its `event` extra if it has one, otherwise its format
+        string (the same for every call from one place, as long as the call passes its
+        arguments lazily rather than as an f-string). `sample_rates` keeps that fraction
+        of a type (the first record, then 1 in round(1 / rate)); `rate_limit` caps every
+        type at that many records per second, with a burst of one second's worth.
+        Warnings and errors always pass. The number of records dropped since the last one
+        that passed is attached to it as `suppressed`.
+        """
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.rate_limit = rate_limit
+        self._types: dict[str, _TypeState] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = getattr(record, "event", None) or str(record.msg)
+        rate = self.sample_rates.get(key)
+        if rate is None and self.rate_limit is None:
+            return True
+
+        with self._lock:
+            state = self._types.get(key)
+            if state is None:
+                if len(self._types) >= MAX_TRACKED_TYPES:
+                    self._types.clear()
+                state = self._types[key] = _TypeState(max(1.0, self.rate_limit or 0.0))
+
+            keep = True
+            if rate is not None:
+                every = round(1 / rate) if rate > 0 else 0
+                keep = every > 0 and state.seen % every == 0
+            state.seen += 1
+
+            if keep and self.rate_limit is not None:
+                now = time.monotonic()
+                state.tokens = min(max(1.0, self.rate_limit), state.tokens + (now - state.refilled_at) * self.rate_limit)
+                state.refilled_at = now
+                if state.tokens >= 1:
+                    state.tokens -= 1
+                else:
+                    keep = False
+
+            if not keep:
+                state.suppressed += 1
+                return False
+            if state.suppressed:
+                record.suppressed = state.suppressed
+                state.suppressed = 0
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the same keys as livekit-agents' production log format."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"level": record.levelname, "name": record.name, "message": record.getMessage()}
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        entry["timestamp"] = datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat()
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike the stdlib QueueHandler, the message is normally not formatted here but on
+        # the listener thread. A mutable argument (a dict, a list, an object) could change
+        # before the listener gets to it, so records with one are rendered now instead. A
+        # single dict argument ends up as `record.args` itself, so it always counts.
+        args = record.args
+        if args and (isinstance(args, dict) or not all(isinstance(value, _IMMUTABLE_ARGS) for value in args)):
+            try:
+                record.msg = record.getMessage()
+                record.args = None
+            except Exception:
+                pass  # Left for the listener, which reports the formatting error.
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # Never block the caller on a backed-up sink: drop, and say so on the next record.
+        if self.dropped:
+            record.queue_dropped = self.dropped
+        try:
+            self.queue.put_nowait(record)
+            self.dropped = 0
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def __init__(self, log_queue: queue.Queue, handlers: list[logging.Handler], redact: bool):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.redact = redact
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render and redact the message once, here, so every handler sees the same plain string.
+        try:
+            message = record.getMessage()
+        except Exception as e:
+            message = f"{record.msg!r} (could not format arguments {record.args!r}: {e})"
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        if self.redact:
+            message = redact_text(message)
+            if record.exc_text:
+                record.exc_text = redact_text(record.exc_text)
+            record.exc_info = None
+            for key, value in list(vars(record).items()):
+                if key not in _RECORD_ATTRS:
+                    setattr(record, key, redact_value(value, key))
+        record.msg = message
+        record.args = None
+        return record
+
+    def stop(self) -> None:
+        # Flushes what is queued. Safe to call again (it also runs at exit).
+        if self._thread is not None:
+            super().stop()
+
+    def enqueue_sentinel(self) -> None:
+        # Wait for room rather than fail if the queue is full at shutdown.
+        self.queue.put(self._sentinel)
+
+
+_listener: _Listener | None = None
+
+
+def setup_logging(
+    level: str | None = None,
+    json_output: bool | None = None,
+    sample_rates: dict[str, float] | None = None,
+    rate_limit: float | None = None,
+    redact: bool | None = None,
+    stream=None,
+    max_queued: int = 10000,
+) -> logging.handlers.QueueListener:
+    """
+    Moves log I/O off the calling thread (for the agents, the event loop).
+
+    The root logger's current handlers (in an agent job process, livekit's forwarder to
+    the worker) are moved behind a QueueListener thread and replaced by a queue handler
+    that only applies `SamplingFilter` and enqueues the record. Formatting, redaction and
+    writing all happen on the listener thread. If root has no handlers, one writing to
+    `stream` (stderr) is created, as JSON lines unless `json_output` is false.
+
+    Arguments left as None come from the environment: LOG_LEVEL (INFO), LOG_FORMAT
+    ("json" or "text"), LOG_SAMPLE ("event=rate,..."), LOG_RATE_LIMIT (records per
+    second per message type) and LOG_REDACT ("true"). Later calls in the same process
+    return the running listener.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    if json_output is None:
+        json_output = os.getenv("LOG_FORMAT", "json").lower() == "json"
+    if sample_rates is None:
+        sample_rates = parse_sample_rates(os.getenv("LOG_SAMPLE", ""))
+    if rate_limit is None and os.getenv("LOG_RATE_LIMIT"):
+        rate_limit = float(os.getenv("LOG_RATE_LIMIT"))
+    if redact is None:
+        redact = os.getenv("LOG_REDACT", "true").lower() == "true"
+
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    if not handlers:
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(JsonFormatter() if json_output else logging.Formatter(TEXT_FORMAT))
+        handlers = [handler]
+    for handler in handlers:
+        root.removeHandler(handler)
+
+    log_queue = queue.Queue(maxsize=max_queued)
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rates, rate_limit))
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    _listener = _Listener(log_queue, handlers, redact)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener